@@ -0,0 +1,128 @@
+# minke.boilerplate
+# Filters paragraphs that are repeated across the documents of a feed.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: boilerplate.py [] benjamin@bengfort.com $
+
+"""
+Filters paragraphs that are repeated across the documents of a feed.
+
+Readability removes most of the navigation of a page, but many documents of
+the same feed still share identical paragraphs: bylines, subscription
+prompts, copyright notices and the like. A first pass over the corpus
+extracts the paragraphs of the raw HTML (without readability, so that the
+pass is cheap) and counts the number of documents of each feed that contain
+every paragraph. Paragraphs are identified by a fingerprint, the stable hash
+of the feed and the normalized text of the paragraph, and the fingerprints
+are collected in NumPy arrays, so the pass needs about 12 bytes for every
+paragraph of the corpus rather than a dictionary of paragraphs. Paragraphs
+contained in more than a fraction of the documents of their feed (and in at
+least a minimum number of documents, so that small feeds are left alone)
+are boilerplate, and are dropped from the paragraphs of the corpus reader.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import re
+import numpy as np
+
+from collections import Counter
+from minke.utils.sketches import stable_hash, stable_hashes
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+WHITESPACE = re.compile(r'\s+', re.UNICODE)
+
+
+##########################################################################
+## Boilerplate Filter
+##########################################################################
+
+class BoilerplateFilter(object):
+    """
+    Learns the boilerplate paragraphs of every feed from a corpus with fit
+    and then filters them from the paragraphs of documents of those feeds.
+    """
+
+    def __init__(self, fraction=0.5, min_docs=3):
+        if not 0.0 < fraction <= 1.0:
+            raise ValueError("Boilerplate fraction must be between 0 and 1")
+
+        self.fraction = fraction
+        self.min_docs = min_docs
+
+        # The fingerprints of the boilerplate paragraphs and their feeds
+        self.fingerprints = set()
+        self.feeds = Counter()
+
+    @staticmethod
+    def normalize(paragraph):
+        return WHITESPACE.sub(u' ', paragraph).strip().lower()
+
+    def fingerprint(self, feed, paragraph):
+        """
+        Returns the fingerprint of the paragraph in the documents of the feed.
+        """
+        return stable_hash(u"{}\x00{}".format(feed or u'', self.normalize(paragraph)))
+
+    def fit(self, corpus, fileids=None, categories=None):
+        """
+        Counts the documents of each feed that contain every paragraph of the
+        raw HTML of the fileids of the corpus, and keeps the fingerprints of
+        those contained in more than the fraction of the documents of the feed.
+        """
+        docs, index = Counter(), {}
+        feeds, chunks = [], []
+
+        for feed, paragraphs in corpus.feed_paras(fileids, categories, readability=False):
+            docs[feed] += 1
+            index.setdefault(feed, len(index))
+
+            # Each paragraph is counted once per document
+            fingerprints = np.unique(stable_hashes([
+                u"{}\x00{}".format(feed or u'', text)
+                for text in set(self.normalize(p) for p in paragraphs) if text
+            ]))
+            chunks.append(fingerprints)
+            feeds.append(np.full(len(fingerprints), index[feed], dtype=np.int32))
+
+        self.fingerprints, self.feeds = set(), Counter()
+        if not chunks:
+            return self
+
+        fingerprints, first, counts = np.unique(
+            np.concatenate(chunks), return_index=True, return_counts=True
+        )
+        feeds = np.concatenate(feeds)[first]
+
+        # The number of documents a paragraph must be in to be boilerplate
+        names = sorted(index, key=index.get)
+        limits = np.array([self.fraction * docs[feed] for feed in names])
+        mask = (counts >= self.min_docs) & (counts > limits[feeds])
+
+        self.fingerprints = set(int(fingerprint) for fingerprint in fingerprints[mask])
+        self.feeds = Counter(names[idx] for idx in feeds[mask])
+
+        return self
+
+    def filter(self, feed, paragraphs):
+        """
+        Returns the paragraphs that are not boilerplate of the feed.
+        """
+        if not self.fingerprints:
+            return list(paragraphs)
+
+        return [
+            paragraph for paragraph in paragraphs
+            if self.fingerprint(feed, paragraph) not in self.fingerprints
+        ]
+
+    def __len__(self):
+        return len(self.fingerprints)
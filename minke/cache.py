@@ -0,0 +1,320 @@
+# minke.cache
+# Content-addressed caches of readability cleaned HTML and tagged sentences.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: cache.py [] benjamin@bengfort.com $
+
+"""
+Content-addressed caches of readability cleaned HTML and tagged sentences.
+
+Readability is the most expensive step of reading the raw corpus, but the
+content of a document rarely changes after it has been ingested. The cache
+stores the cleaned summary in a SQLite database keyed by the hash of the raw
+content and the readability settings, so a changed document or a change to
+the settings is simply a cache miss. The database is capped in size and the
+least recently used entries are evicted when the cap is exceeded.
+
+The feeds of the corpus also repeat the same sentences constantly (bylines,
+"Read more" links, subscription footers), so the preprocessor can memoize
+the tokenized and tagged sentences in a bounded, in-memory LRU cache keyed
+by the hash of the sentence text. The sentence cache is local to a process.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import readability
+
+from collections import OrderedDict
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+CACHE_SIZE = 1073741824 # Default maximum size of the cached data in bytes
+TOUCH_SIZE = 512        # Number of hits whose access times are written at once
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS readability ("
+    "  key TEXT PRIMARY KEY,"
+    "  html BLOB NOT NULL,"
+    "  size INTEGER NOT NULL,"
+    "  accessed REAL NOT NULL"
+    ")",
+    "CREATE INDEX IF NOT EXISTS readability_accessed ON readability (accessed)",
+)
+
+
+##########################################################################
+## Readability Cache
+##########################################################################
+
+class ReadabilityCache(object):
+    """
+    Caches cleaned HTML in the SQLite database at path, compressed with zlib.
+    The connection is opened lazily in each process, so a reader with a cache
+    can be pickled and sent to a multiprocessing pool; SQLite serializes the
+    writes of concurrent processes.
+    """
+
+    def __init__(self, path, capacity=CACHE_SIZE):
+        self.path = path
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = None
+        self._pid  = None
+        self._size = None
+
+        # Access times of hits that have not yet been written to the database
+        self._touched = {}
+
+    @property
+    def conn(self):
+        """
+        Returns the connection for the current process, creating the database
+        and its schema if this is the first access.
+        """
+        if self._conn is None or self._pid != os.getpid():
+            dirname = os.path.dirname(os.path.abspath(self.path))
+            if not os.path.exists(dirname):
+                os.makedirs(dirname)
+
+            self._conn = sqlite3.connect(self.path, timeout=60)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+            self._conn.commit()
+
+            self._pid  = os.getpid()
+            self._size = None
+            self._touched = {}
+
+        return self._conn
+
+    @staticmethod
+    def key(content, settings=None):
+        """
+        Returns the cache key of the raw content cleaned with the given
+        readability settings and the installed readability version.
+        """
+        settings = json.dumps(settings or {}, sort_keys=True)
+        version  = getattr(readability, '__version__', '')
+
+        digest = hashlib.sha1()
+        digest.update("{}\x00{}\x00".format(version, settings).encode('utf-8'))
+        digest.update(content.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cleaned HTML stored under key, or None if it is not in the
+        cache. Hits update the access time used for LRU eviction; the access
+        times are buffered and written in a single transaction every
+        TOUCH_SIZE hits (and before eviction) rather than on every hit.
+        """
+        row = self.conn.execute(
+            "SELECT html FROM readability WHERE key=?", (key,)
+        ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touched[key] = time.time()
+        if len(self._touched) >= TOUCH_SIZE:
+            self.flush()
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def flush(self):
+        """
+        Writes the buffered access times of cache hits to the database.
+        """
+        if not self._touched:
+            return
+
+        touched = [(accessed, key) for key, accessed in self._touched.items()]
+        self._touched = {}
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE readability SET accessed=? WHERE key=?", touched
+            )
+
+    def set(self, key, html):
+        """
+        Stores the cleaned HTML under key, evicting the least recently used
+        entries if the cache has grown beyond its capacity.
+        """
+        data = sqlite3.Binary(zlib.compress(html.encode('utf-8')))
+        size = self.size()
+
+        with self.conn:
+            # Replacing an entry frees the space of the previous data
+            row = self.conn.execute(
+                "SELECT size FROM readability WHERE key=?", (key,)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO readability VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time())
+            )
+
+        self._size = size - (row[0] if row else 0) + len(data)
+        if self._size > self.capacity:
+            self.evict()
+
+    def size(self):
+        """
+        Returns the total size of the cached data in bytes.
+        """
+        if self._size is None:
+            self._size = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM readability"
+            ).fetchone()[0]
+        return self._size
+
+    def evict(self, target=None):
+        """
+        Deletes the least recently used entries until the cached data is no
+        larger than the target, by default 90% of the capacity so that every
+        insert past the cap does not trigger another eviction.
+        """
+        if target is None:
+            target = int(self.capacity * 0.9)
+
+        # Write pending access times so recently hit entries are kept
+        self.flush()
+
+        # Recount the size since other processes may have written to the cache
+        self._size = None
+        excess = self.size() - target
+        if excess <= 0:
+            return 0
+
+        keys = []
+        rows = self.conn.execute(
+            "SELECT key, size FROM readability ORDER BY accessed ASC"
+        )
+        for key, size in rows:
+            if excess <= 0:
+                break
+            keys.append((key,))
+            excess -= size
+        rows.close()
+
+        with self.conn:
+            self.conn.executemany("DELETE FROM readability WHERE key=?", keys)
+
+        self._size = None
+        return len(keys)
+
+    def clear(self):
+        """
+        Deletes every entry in the cache.
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM readability")
+        self._size = 0
+
+    def close(self):
+        if self._conn is not None:
+            if self._pid == os.getpid():
+                self.flush()
+            self._conn.close()
+        self._conn = None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM readability").fetchone()[0]
+
+    def __contains__(self, key):
+        return self.conn.execute(
+            "SELECT 1 FROM readability WHERE key=?", (key,)
+        ).fetchone() is not None
+
+    def __getstate__(self):
+        """
+        Connections cannot be pickled; they are reopened in the new process.
+        """
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid']  = None
+        state['_touched'] = {}
+        return state
+
+
+##########################################################################
+## Sentence Cache
+##########################################################################
+
+class SentenceCache(object):
+    """
+    Memoizes the (token, tag) tuples of up to capacity sentences in memory,
+    keyed by the SHA1 digest of the sentence text and evicting the least
+    recently used sentence when full. Each process (i.e. each worker of the
+    parallel preprocessors) holds its own cache; pickling the cache drops
+    its contents, so workers start with an empty cache.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    @staticmethod
+    def key(sentence):
+        return hashlib.sha1(sentence.encode('utf-8')).digest()
+
+    def get(self, sentence):
+        """
+        Returns a copy of the tagged sentence or None if it is not cached,
+        marking it as the most recently used.
+        """
+        key = self.key(sentence)
+        tagged = self._data.pop(key, None)
+        if tagged is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._data[key] = tagged
+        return list(tagged)
+
+    def set(self, sentence, tagged):
+        """
+        Caches the tagged sentence, evicting the least recently used.
+        """
+        key = self.key(sentence)
+        self._data.pop(key, None)
+        self._data[key] = tuple(tagged)
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, sentence):
+        return self.key(sentence) in self._data
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_data'] = OrderedDict()
+        state['hits'] = 0
+        state['misses'] = 0
+        return state
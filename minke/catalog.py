@@ -0,0 +1,271 @@
+# minke.catalog
+# A SQLite catalog of document metadata for filtering the corpus.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: catalog.py [] benjamin@bengfort.com $
+
+"""
+A SQLite catalog of document metadata for filtering the corpus.
+
+Selecting documents by feed, publication date, or title otherwise requires
+opening every JSON file in the corpus. The catalog stores the title, feed id,
+publication date, category, size, and content hash of every document in a
+SQLite database (by default in the root of the corpus), so that filters can
+be resolved into fileids before any document is opened. The catalog is built
+incrementally: only documents whose size or modification time has changed
+since they were last cataloged are read again.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import codecs
+import sqlite3
+import hashlib
+import numpy as np
+
+from datetime import datetime
+from dateutil.parser import parse as parse_date
+from dateutil.tz import tzutc
+
+from six import string_types
+from collections import OrderedDict
+from minke.projection import FieldProjector
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+CATALOG = ".catalog.sqlite"
+EPOCH   = datetime(1970, 1, 1, tzinfo=tzutc())
+
+# The catalog columns, their SQL types and the numpy types used for export.
+COLUMNS = OrderedDict([
+    ('fileid',   ('TEXT PRIMARY KEY', object)),
+    ('category', ('TEXT', object)),
+    ('title',    ('TEXT', object)),
+    ('feed',     ('TEXT', object)),
+    ('pubdate',  ('INTEGER', np.int64)), # milliseconds since the epoch
+    ('size',     ('INTEGER', np.int64)),
+    ('mtime',    ('REAL', np.float64)),
+    ('hash',     ('TEXT', object)),      # sha1 of the JSON text of the content
+])
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS documents ({})".format(
+        ", ".join("{} {}".format(name, dtype[0]) for name, dtype in COLUMNS.items())
+    ),
+    "CREATE INDEX IF NOT EXISTS documents_feed ON documents (feed)",
+    "CREATE INDEX IF NOT EXISTS documents_pubdate ON documents (pubdate)",
+    "CREATE INDEX IF NOT EXISTS documents_category ON documents (category)",
+)
+
+# The JSON fields projected from each document to build the catalog; the
+# content is projected as raw JSON text to be hashed without decoding it.
+FIELDS = ('title', 'feed.$oid', 'pubdate.$date', 'content')
+RAW    = ('content',)
+
+
+##########################################################################
+## Helper Functions
+##########################################################################
+
+def timestamp(value):
+    """
+    Converts a date to milliseconds since the epoch; the value may be a
+    datetime, a date string, or a number that is already in milliseconds.
+    Naive datetimes are assumed to be in UTC.
+    """
+    if value is None:
+        return None
+
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    if isinstance(value, string_types):
+        value = parse_date(value)
+
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=tzutc())
+
+    return int((value - EPOCH).total_seconds() * 1000)
+
+
+##########################################################################
+## Metadata Catalog
+##########################################################################
+
+class MetadataCatalog(object):
+    """
+    A SQLite database of the metadata of every document in a raw corpus. The
+    connection is opened lazily in each process so that readers with a
+    catalog can be pickled.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._pid  = None
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(path)
+
+    @property
+    def conn(self):
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=60)
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def build(self, corpus, fileids=None, rebuild=False):
+        """
+        Catalogs the documents of the corpus reader, reading only documents
+        that are new or whose size or modification time have changed, and
+        removing documents that are no longer in the corpus. Returns the
+        number of documents that were (re)cataloged and removed.
+        """
+        if rebuild:
+            with self.conn:
+                self.conn.execute("DELETE FROM documents")
+
+        # Load the stat of every cataloged document to detect changes
+        known = {
+            fileid: (size, mtime) for fileid, size, mtime in
+            self.conn.execute("SELECT fileid, size, mtime FROM documents")
+        }
+
+        projector = FieldProjector(FIELDS, raw=RAW)
+        if fileids is None:
+            fileids = corpus.fileids()
+
+        rows = []
+        for path, enc, fileid in corpus.abspaths(fileids, True, True):
+            stat = os.stat(path)
+            if known.get(fileid) == (stat.st_size, stat.st_mtime):
+                continue
+
+            with codecs.open(path, 'r', encoding=enc) as f:
+                found = projector.project(f)
+
+            content = found.get('content') or u''
+            category = corpus.categories([fileid])
+            rows.append((
+                fileid,
+                category[0] if category else None,
+                found.get('title'),
+                found.get('feed.$oid'),
+                timestamp(found.get('pubdate.$date')),
+                stat.st_size,
+                stat.st_mtime,
+                hashlib.sha1(content.encode('utf-8')).hexdigest(),
+            ))
+
+        # Remove any documents that are no longer in the corpus
+        removed = [
+            (fileid,) for fileid in set(known) - set(corpus.fileids())
+        ]
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO documents VALUES ({})".format(
+                    ", ".join("?" * len(COLUMNS))
+                ), rows
+            )
+            self.conn.executemany("DELETE FROM documents WHERE fileid=?", removed)
+
+        return len(rows), len(removed)
+
+    def _where(self, feed=None, start=None, end=None, categories=None, title=None):
+        """
+        Builds the where clause and parameters for the filters.
+        """
+        clauses, params = [], []
+
+        for column, values in (('feed', feed), ('category', categories)):
+            if values is None:
+                continue
+            if isinstance(values, string_types):
+                values = [values]
+            values = list(values)
+            clauses.append("{} IN ({})".format(column, ", ".join("?" * len(values))))
+            params.extend(values)
+
+        if start is not None:
+            clauses.append("pubdate >= ?")
+            params.append(timestamp(start))
+
+        if end is not None:
+            clauses.append("pubdate < ?")
+            params.append(timestamp(end))
+
+        if title is not None:
+            clauses.append("title LIKE ?")
+            params.append(u"%{}%".format(title))
+
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def select(self, feed=None, start=None, end=None, categories=None, title=None):
+        """
+        Returns the sorted fileids of the documents that match every filter:
+        one or more feed ids, publication dates in [start, end), one or more
+        categories, and a title containing a substring.
+        """
+        where, params = self._where(feed, start, end, categories, title)
+        return [
+            row[0] for row in self.conn.execute(
+                "SELECT fileid FROM documents" + where + " ORDER BY fileid", params
+            )
+        ]
+
+    def columns(self, fields=None, **filters):
+        """
+        Exports the metadata of the documents that match the filters as an
+        ordered dictionary of numpy arrays, one per column, which can be
+        passed directly to ``pandas.DataFrame``. Missing pubdates are -1.
+        """
+        fields = list(fields or COLUMNS.keys())
+        where, params = self._where(**filters)
+
+        query = "SELECT {} FROM documents{} ORDER BY fileid".format(
+            ", ".join(fields), where
+        )
+        rows = self.conn.execute(query, params).fetchall()
+
+        output = OrderedDict()
+        for idx, field in enumerate(fields):
+            dtype = COLUMNS[field][1]
+            values = [row[idx] for row in rows]
+            if dtype is not object:
+                values = [-1 if value is None else value for value in values]
+            output[field] = np.array(values, dtype=dtype)
+        return output
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def __contains__(self, fileid):
+        return self.conn.execute(
+            "SELECT 1 FROM documents WHERE fileid=?", (fileid,)
+        ).fetchone() is not None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid']  = None
+        return state
@@ -0,0 +1,385 @@
+# minke.columnar
+# A memory-mapped columnar store for part of speech tagged corpora.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: columnar.py [] benjamin@bengfort.com $
+
+"""
+A memory-mapped columnar store for part of speech tagged corpora.
+
+The pickled corpus stores each document as nested lists of (token, tag)
+tuples, which must be unpickled and rebuilt as Python objects on every read.
+The columnar store instead keeps a global vocabulary and tag table, and stores
+the entire corpus as flat integer arrays: the token and tag ids of every word,
+the offset of the first token of every sentence, the offset of the first
+sentence of every paragraph, and the offset of the first paragraph of every
+document. The arrays are opened with ``numpy.memmap`` so they can be sliced
+without copying and counted with vectorized operations.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import pickle
+import numpy as np
+
+from six import string_types
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+COLUMNAR_META = "columnar.meta"
+VERSION       = 1
+MAX_TAG       = np.iinfo(np.uint8).max # largest tagset id that fits a tag
+
+# The name and data type of each column stored on disk.
+COLUMNS = (
+    ('tokens', np.uint32), # vocabulary id of every token
+    ('tags',   np.uint8),  # tagset id of every token
+    ('sents',  np.int64),  # offset of the first token in each sentence
+    ('paras',  np.int64),  # offset of the first sentence in each paragraph
+    ('docs',   np.int64),  # offset of the first paragraph in each document
+)
+
+
+##########################################################################
+## Columnar Writer
+##########################################################################
+
+class ColumnarWriter(object):
+    """
+    Appends tagged documents to the columns in the root directory. Columns
+    are appended to directly and the metadata (vocabulary, tagset, fileids,
+    and the length of every column) is saved when the writer is closed. Any
+    data in the columns beyond the lengths recorded in the metadata (e.g.
+    from a crash before the writer was closed) is truncated on open.
+
+    Writing a fileid that already exists appends a new copy of the document
+    and points the fileid at it; the old copy is simply no longer referenced.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.meta = ColumnarReader.load_meta(root)
+
+        # Lookup tables for the vocabulary and tagset ids
+        self._vocab = {
+            token: idx for idx, token in enumerate(self.meta['vocab'])
+        }
+        self._tagset = {
+            tag: idx for idx, tag in enumerate(self.meta['tagset'])
+        }
+
+        # Open each column for appending after truncating to the metadata.
+        self._handles = {}
+        for name, dtype in COLUMNS:
+            path = os.path.join(root, name + '.col')
+            size = self.meta['lengths'][name] * np.dtype(dtype).itemsize
+
+            handle = open(path, 'ab')
+            handle.truncate(size)
+            self._handles[name] = handle
+
+    def write(self, fileid, document):
+        """
+        Appends a document of paragraphs of sentences of (token, tag) tuples
+        to the columns and records the fileid of the new document.
+        """
+        lengths = self.meta['lengths']
+        tokens, tags, sents, paras = [], [], [], []
+        marks = len(self.meta['vocab']), len(self.meta['tagset'])
+
+        try:
+            for paragraph in document:
+                paras.append(lengths['sents'] + len(sents))
+                for sentence in paragraph:
+                    sents.append(lengths['tokens'] + len(tokens))
+                    for token, tag in sentence:
+                        if tag not in self._tagset and len(self._tagset) > MAX_TAG:
+                            raise ValueError(
+                                "Columnar store supports at most 256 tags"
+                            )
+                        tokens.append(self._lookup(self._vocab, 'vocab', token))
+                        tags.append(self._lookup(self._tagset, 'tagset', tag))
+        except Exception:
+            self._rollback(*marks)
+            raise
+
+        self._append('docs', [lengths['paras']])
+        self._append('paras', paras)
+        self._append('sents', sents)
+        self._append('tokens', tokens)
+        self._append('tags', tags)
+
+        self.meta['index'][fileid] = len(self.meta['fileids'])
+        self.meta['fileids'].append(fileid)
+        return fileid
+
+    def close(self):
+        """
+        Flushes the columns and atomically saves the metadata.
+        """
+        for handle in self._handles.values():
+            handle.close()
+        self._handles = {}
+
+        path = os.path.join(self.root, COLUMNAR_META)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(self.meta, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(path + '.tmp', path)
+
+    def _lookup(self, table, name, value):
+        """
+        Returns the id of the value, adding it to the table if it is new.
+        """
+        if value not in table:
+            table[value] = len(self.meta[name])
+            self.meta[name].append(value)
+        return table[value]
+
+    def _rollback(self, vocab, tagset):
+        """
+        Removes the tokens and tags added by a document that failed to write,
+        so that the metadata only refers to documents in the columns.
+        """
+        for table, name, mark in (
+            (self._vocab, 'vocab', vocab), (self._tagset, 'tagset', tagset)
+        ):
+            for value in self.meta[name][mark:]:
+                del table[value]
+            del self.meta[name][mark:]
+
+    def _append(self, name, values):
+        """
+        Appends the values to the named column and updates its length.
+        """
+        dtype = dict(COLUMNS)[name]
+        np.asarray(values, dtype=dtype).tofile(self._handles[name])
+        self.meta['lengths'][name] += len(values)
+
+    def __contains__(self, fileid):
+        return fileid in self.meta['index']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, tb):
+        self.close()
+
+
+##########################################################################
+## Columnar Reader
+##########################################################################
+
+class ColumnarReader(object):
+    """
+    Opens the columns of the store as read-only memory maps. The ``arrays``
+    method returns zero-copy views of the columns for a single document,
+    while ``document`` decodes the ids back into nested lists of (token, tag)
+    tuples in the same structure as the pickled corpus.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.meta = self.load_meta(root)
+        self.vocab  = self.meta['vocab']
+        self.tagset = self.meta['tagset']
+
+        for name, dtype in COLUMNS:
+            setattr(self, name, self._memmap(name, dtype))
+
+    @staticmethod
+    def exists(root):
+        """
+        Returns True if the root directory contains a columnar store.
+        """
+        return os.path.exists(os.path.join(root, COLUMNAR_META))
+
+    @staticmethod
+    def load_meta(root):
+        """
+        Loads the metadata of the store or returns empty metadata.
+        """
+        try:
+            with open(os.path.join(root, COLUMNAR_META), 'rb') as f:
+                meta = pickle.load(f)
+            if meta.get('version') == VERSION:
+                return meta
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            pass
+
+        return {
+            'version': VERSION,
+            'vocab': [],
+            'tagset': [],
+            'fileids': [],
+            'index': {},
+            'lengths': {name: 0 for name, _ in COLUMNS},
+        }
+
+    def _memmap(self, name, dtype):
+        """
+        Memory maps the column, truncated to its length in the metadata.
+        Empty columns cannot be memory mapped so an empty array is returned.
+        """
+        length = self.meta['lengths'][name]
+        if length == 0:
+            return np.zeros(0, dtype=dtype)
+
+        path = os.path.join(self.root, name + '.col')
+        return np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+
+    def fileids(self):
+        """
+        Returns the sorted list of fileids contained in the store.
+        """
+        return sorted(self.meta['index'])
+
+    def _bounds(self, column, idx, total):
+        """
+        Returns the start and end offsets stored in the column at idx, where
+        the end of the last item is the total length of the child column.
+        """
+        start = int(column[idx])
+        end = int(column[idx+1]) if idx + 1 < len(column) else total
+        return start, end
+
+    def spans(self, fileid):
+        """
+        Returns the paragraph, sentence, and token spans of the document.
+        """
+        lengths = self.meta['lengths']
+        doc = self.meta['index'][fileid]
+
+        paras = self._bounds(self.docs, doc, lengths['paras'])
+        if paras[0] == paras[1]:
+            sents = (0, 0)
+        else:
+            sents = (
+                self._bounds(self.paras, paras[0], lengths['sents'])[0],
+                self._bounds(self.paras, paras[1] - 1, lengths['sents'])[1],
+            )
+
+        if sents[0] == sents[1]:
+            tokens = (0, 0)
+        else:
+            tokens = (
+                self._bounds(self.sents, sents[0], lengths['tokens'])[0],
+                self._bounds(self.sents, sents[1] - 1, lengths['tokens'])[1],
+            )
+
+        return paras, sents, tokens
+
+    def arrays(self, fileid):
+        """
+        Returns zero-copy views of the token ids, tag ids, sentence offsets
+        and paragraph offsets of the document. Offsets are absolute into the
+        token and sentence columns respectively.
+        """
+        (p0, p1), (s0, s1), (t0, t1) = self.spans(fileid)
+        return (
+            self.tokens[t0:t1], self.tags[t0:t1],
+            self.sents[s0:s1], self.paras[p0:p1],
+        )
+
+    def document(self, fileid):
+        """
+        Decodes the document into a list of paragraphs, which are lists of
+        sentences, which are lists of (token, tag) tuples.
+        """
+        (p0, p1), (s0, s1), (t0, t1) = self.spans(fileid)
+
+        words = [self.vocab[idx] for idx in self.tokens[t0:t1].tolist()]
+        tags  = [self.tagset[idx] for idx in self.tags[t0:t1].tolist()]
+        sents = self.sents[s0:s1].tolist() + [t1]
+        paras = self.paras[p0:p1].tolist() + [s1]
+
+        document = []
+        for pdx in range(len(paras) - 1):
+            paragraph = []
+            for sdx in range(paras[pdx] - s0, paras[pdx+1] - s0):
+                start, end = sents[sdx] - t0, sents[sdx+1] - t0
+                paragraph.append(list(zip(words[start:end], tags[start:end])))
+            document.append(paragraph)
+
+        return document
+
+    def documents(self, fileids=None):
+        """
+        Decodes and yields every document, or the specified documents.
+        """
+        if fileids is None:
+            fileids = self.fileids()
+        elif isinstance(fileids, string_types):
+            fileids = [fileids]
+
+        for fileid in fileids:
+            yield self.document(fileid)
+
+    def token_ids(self, fileids=None, chunk=1000):
+        """
+        Yields arrays of token ids for the specified documents, batching the
+        spans of contiguous documents to reduce the number of copies. If no
+        fileids are specified, the whole token column is yielded unless it
+        contains documents that have been replaced by a newer copy.
+        """
+        if fileids is None:
+            if len(self.meta['index']) == len(self.meta['fileids']):
+                yield self.tokens
+                return
+            fileids = self.fileids()
+
+        if isinstance(fileids, string_types):
+            fileids = [fileids]
+
+        spans = [self.spans(fileid)[2] for fileid in fileids]
+        for idx in range(0, len(spans), chunk):
+            yield np.concatenate([
+                self.tokens[start:end] for start, end in spans[idx:idx+chunk]
+            ] or [np.zeros(0, dtype=np.uint32)])
+
+    def counts(self, fileids=None):
+        """
+        Returns the number of paragraphs, sentences, and tokens in the given
+        documents using only the offset columns.
+        """
+        if fileids is None:
+            lengths = self.meta['lengths']
+            if len(self.meta['index']) == len(self.meta['fileids']):
+                return lengths['paras'], lengths['sents'], lengths['tokens']
+            fileids = self.fileids()
+
+        if isinstance(fileids, string_types):
+            fileids = [fileids]
+
+        paras, sents, tokens = 0, 0, 0
+        for fileid in fileids:
+            (p0, p1), (s0, s1), (t0, t1) = self.spans(fileid)
+            paras  += p1 - p0
+            sents  += s1 - s0
+            tokens += t1 - t0
+        return paras, sents, tokens
+
+    def frequencies(self, fileids=None):
+        """
+        Returns an array of the frequency of every vocabulary id in the given
+        documents, computed with a vectorized bincount over the token ids.
+        """
+        freqs = np.zeros(len(self.vocab), dtype=np.int64)
+        for ids in self.token_ids(fileids):
+            freqs += np.bincount(ids, minlength=len(self.vocab))
+        return freqs
+
+    def tag_mask(self, tags):
+        """
+        Returns a boolean array over the tagset that is True for the given
+        tags; index it with a tag id column to select tokens by tag.
+        """
+        tags = set(tags)
+        return np.array([tag in tags for tag in self.tagset], dtype=bool)
@@ -52,10 +52,43 @@ class PreprocessingConfiguration(Configuration):
     Settings for preprocessing a corpus to another location
     """
 
-    tasks       = mp.cpu_count() # Number of tasks to run in parallel
-    parallel    = False # Parallelize the preprocessing with multiprocessing
-    overwrite   = False # Overwrite existing files with new data
-    skip_exists = True  # Skip any filenames that already exist in the target
+    tasks        = mp.cpu_count() # Number of tasks to run in parallel
+    parallel     = False # Parallelize the preprocessing with multiprocessing
+    chunksize    = 16    # Maximum number of documents sent to a worker at a time
+    chunk_bytes  = 1048576 # Size in bytes of documents sent to a worker at a time
+    schedule     = "largest" # Submit the "largest" documents first or "ordered"
+    max_tasks    = None  # Number of chunks a worker processes before it is replaced
+    memory_limit = None  # Peak resident memory in bytes after which a worker is replaced
+    window       = None  # Maximum documents in flight (default 4 chunks per task)
+    pipeline     = False # Overlap reading, parsing, tagging and writing in stages
+    parse_tasks  = max(1, mp.cpu_count() // 2) # Processes parsing HTML in the pipeline
+    tag_tasks    = max(1, mp.cpu_count() // 2) # Processes tagging in the pipeline
+    queue_size   = None  # Maximum documents queued before a stage (default 2 per worker)
+    batch        = True  # Tag all of the sentences of a document in one call
+    tagger       = "perceptron" # Tag with the nltk "perceptron" or "vectorized" backend
+    sentence_cache = None # Number of tagged sentences memoized per process (None disables)
+    boilerplate  = None  # Drop paragraphs in more than this fraction of a feed's documents
+    boilerplate_docs = 3 # Minimum number of documents a boilerplate paragraph is in
+    dedup        = False # Only process one representative of duplicate documents
+    dedup_threshold = 0.8 # Minimum estimated Jaccard similarity of near duplicates
+    language     = None  # Only tag documents identified as this language, e.g. "en"
+    incremental  = False # Only process documents that are new or have changed
+    time_limit   = None  # Seconds a document may take before it is quarantined
+    size_limit   = None  # Size in bytes above which a document is quarantined
+    partition    = "hash" # Assign documents to shards by "hash" or balanced by "size"
+    overwrite    = False # Overwrite existing files with new data
+    skip_exists  = True  # Skip any filenames that already exist in the target
+    sharded      = False # Write documents to large segments instead of pickles
+    segment_size = 268435456 # Size in bytes to roll over to a new segment
+
+
+class CorpusConfiguration(Configuration):
+    """
+    Settings for reading the raw corpus
+    """
+
+    cache        = None  # Path to the readability cache database (None disables)
+    cache_size   = 1073741824 # Maximum size in bytes of the readability cache
 
 
 ##########################################################################
@@ -78,6 +111,9 @@ class MinkeConfiguration(Configuration):
     # Notification parameters
     notify     = NotifyConfiguration()
 
+    # Corpus reader parameters
+    corpus     = CorpusConfiguration()
+
     # Preprocessing parameters
     preprocess = PreprocessingConfiguration()
 
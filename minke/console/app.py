@@ -34,6 +34,8 @@ COMMANDS    = [
     SampleCommand,
     DescribeCommand,
     PreprocessCommand,
+    CatalogCommand,
+    MergeCommand,
 ]
 
 ##########################################################################
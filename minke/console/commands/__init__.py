@@ -18,5 +18,7 @@ Commands for the Minke CLI utility
 ##########################################################################
 
 from .sample import SampleCommand
+from .catalog import CatalogCommand
 from .describe import DescribeCommand
 from .preprocess import PreprocessCommand
+from .merge import MergeCommand
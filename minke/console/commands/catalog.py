@@ -0,0 +1,87 @@
+# minke.console.commands.catalog
+# Command to build the metadata catalog of a corpus.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: catalog.py [] benjamin@bengfort.com $
+
+"""
+Command to build the metadata catalog of a corpus.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import csv
+
+from commis import Command
+from collections import OrderedDict
+from minke.utils.timer import Timer
+from minke.corpus import BaleenCorpusReader
+
+
+##########################################################################
+## Command
+##########################################################################
+
+class CatalogCommand(Command):
+
+    name = "catalog"
+    help = "build a metadata catalog to filter the documents of a corpus"
+    args = OrderedDict([
+        (('-r', '--rebuild'), {
+            'action': 'store_true',
+            'default': False,
+            'help': 'rebuild the catalog rather than updating changed documents',
+        }),
+        (('-o', '--output'), {
+            'default': None,
+            'metavar': 'PATH',
+            'help': 'path to the catalog, by default in the corpus root',
+        }),
+        (('-e', '--export'), {
+            'default': None,
+            'metavar': 'CSV',
+            'help': 'export the catalog metadata to a CSV file',
+        }),
+        ('corpus', {
+            'nargs': 1,
+            'help': 'the path to the corpus to catalog',
+        }),
+    ])
+
+    def handle(self, args):
+        """
+        Handle the catalog command.
+        """
+        corpus = BaleenCorpusReader(args.corpus[0], catalog=args.output)
+
+        with Timer() as timer:
+            updated, removed = corpus.catalog.build(corpus, rebuild=args.rebuild)
+
+        output = [
+            "Cataloged {} documents ({} updated, {} removed) in {}".format(
+                len(corpus.catalog), updated, removed, timer
+            )
+        ]
+
+        if args.export:
+            count = self.export(corpus.catalog, args.export)
+            output.append("Exported {} rows to {}".format(count, args.export))
+
+        return "\n".join(output)
+
+    def export(self, catalog, path):
+        """
+        Writes the columns of the catalog to a CSV file.
+        """
+        columns = catalog.columns()
+        with open(path, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(columns.keys()))
+            writer.writerows(zip(*[
+                values.tolist() for values in columns.values()
+            ]))
+        return len(columns['fileid'])
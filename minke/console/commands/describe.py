@@ -21,7 +21,10 @@ import os
 
 from commis import Command
 from operator import itemgetter
+from collections import OrderedDict
 from minke.corpus import BaleenCorpusReader
+from minke.corpus import BaleenPickledCorpusReader
+from minke.language import SAMPLES
 from minke.utils.humanize import filesize
 
 
@@ -33,19 +36,62 @@ class DescribeCommand(Command):
 
     name = "describe"
     help = "describe corpus properties for monitoring"
-    args = {
-        'corpus': {
+    args = OrderedDict([
+        (('-s', '--scan'), {
+            'action': 'store_true',
+            'default': False,
+            'help': 'scan the documents to count paragraphs, sentences, and words',
+        }),
+        (('-w', '--workers'), {
+            'type': int,
+            'default': 1,
+            'metavar': 'CPUs',
+            'help': 'if scanning, the number of processes to scan with',
+        }),
+        (('-a', '--approximate'), {
+            'action': 'store_true',
+            'default': False,
+            'help': 'if scanning, estimate the vocabulary in fixed memory',
+        }),
+        (('-S', '--sample'), {
+            'type': float,
+            'default': None,
+            'metavar': 'FRAC',
+            'help': 'if scanning, estimate from a fraction of each category',
+        }),
+        (('-l', '--language'), {
+            'choices': sorted(SAMPLES),
+            'default': None,
+            'help': 'if scanning, skip documents not identified as this language',
+        }),
+        (('-P', '--pickled'), {
+            'action': 'store_true',
+            'default': False,
+            'help': 'describe a preprocessed (pickled) corpus',
+        }),
+        ('corpus', {
             'nargs': 1,
             'help': 'the path to the corpus to describe',
-        }
-    }
+        }),
+    ])
 
     def handle(self, args):
         """
         Handle the describe command.
         """
-        self.corpus = BaleenCorpusReader(args.corpus[0])
-        return self.disk_usage()
+        if args.pickled:
+            self.corpus = BaleenPickledCorpusReader(args.corpus[0])
+        else:
+            self.corpus = BaleenCorpusReader(args.corpus[0])
+
+        output = [self.disk_usage()]
+        if args.scan:
+            output.append(self.corpus.describes(
+                workers=args.workers, approximate=args.approximate,
+                sample=args.sample, language=args.language,
+            ))
+
+        return "\n\n".join(output)
 
     def disk_usage(self):
         """
@@ -57,13 +103,13 @@ class DescribeCommand(Command):
         output.append(
             "{} documents in {} categories ({})".format(
                 len(self.corpus.fileids()), len(self.corpus.categories()),
-                filesize(sum(s[1] for s in self.corpus.sizes()))
+                filesize(sum(self.corpus.sizes()))
             )
         )
 
         # Per category usage statement
         for cat in self.corpus.categories():
-            csize = sum(size[1] for size in self.corpus.sizes(categories=cat))
+            csize = sum(self.corpus.sizes(categories=cat))
             output.append(
                 "  - {}: {} ({})".format(
                     cat, len(self.corpus.fileids(categories=cat)), filesize(csize)
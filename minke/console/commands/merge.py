@@ -0,0 +1,51 @@
+# minke.console.commands.merge
+# Command to merge the shards of a preprocessed corpus into one target.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: merge.py [] benjamin@bengfort.com $
+
+"""
+Command to merge the shards of a preprocessed corpus into one target.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+from commis import Command
+from collections import OrderedDict
+from minke.utils.timer import Timer
+from minke.partition import merge
+
+
+##########################################################################
+## Command
+##########################################################################
+
+class MergeCommand(Command):
+
+    name = "merge"
+    help = "merge the shards of a preprocessed corpus into a single target"
+    args = OrderedDict([
+        ('target', {
+            'nargs': 1,
+            'help': 'the target to merge the shard manifests and outputs into',
+        }),
+        ('shards', {
+            'nargs': '*',
+            'help': 'other targets that shards were preprocessed into',
+        }),
+    ])
+
+    def handle(self, args):
+        """
+        Handle the merge command.
+        """
+        with Timer() as timer:
+            copied, merged = merge(args.target[0], args.shards)
+
+        return "Merged the manifests of {:,} outputs and copied {:,} files in {}".format(
+            merged, copied, timer
+        )
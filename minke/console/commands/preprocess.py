@@ -17,14 +17,30 @@ A management command to engage the preprocessing in a meaningful way.
 ## Imports
 ##########################################################################
 
+import os
+
 from commis import Command
+from commis.exceptions import ConsoleError
 from minke.config import settings
 from collections import OrderedDict
 from minke.utils.timer import Timer
+from minke.utils.humanize import filesize, timedelta
+from minke.estimate import estimate
+from minke.language import SAMPLES
 from minke.preprocess import Preprocessor
 from minke.preprocess import ProgressPreprocessor
+from minke.preprocess import ShardedPreprocessor
+from minke.preprocess import ProgressShardedPreprocessor
+from minke.preprocess import ColumnarPreprocessor
+from minke.preprocess import ProgressColumnarPreprocessor
 from minke.preprocess import ParallelPreprocessor
 from minke.preprocess import ProgressParallelPreprocessor
+from minke.preprocess import ParallelShardedPreprocessor
+from minke.preprocess import ProgressParallelShardedPreprocessor
+from minke.preprocess import ParallelColumnarPreprocessor
+from minke.preprocess import ProgressParallelColumnarPreprocessor
+from minke.preprocess import PipelinePreprocessor
+from minke.preprocess import ProgressPipelinePreprocessor
 from minke.corpus import BaleenCorpusReader
 
 
@@ -48,6 +64,96 @@ class PreprocessCommand(Command):
             "metavar": "CPUs",
             "help": "if parallel, specify the number of processes",
         }),
+        (('-c', '--chunksize'), {
+            "type": int,
+            "default": settings.preprocess.chunksize,
+            "metavar": "DOCS",
+            "help": "if parallel, the maximum number of documents sent to a process at a time",
+        }),
+        ('--max-tasks', {
+            'type': int,
+            'default': settings.preprocess.max_tasks,
+            'metavar': 'CHUNKS',
+            'help': 'if parallel, replace each worker after this many chunks',
+        }),
+        ('--memory-limit', {
+            'type': int,
+            'default': settings.preprocess.memory_limit,
+            'metavar': 'BYTES',
+            'help': 'if parallel, replace a worker whose peak memory passes this limit',
+        }),
+        ('--time-limit', {
+            'type': float,
+            'default': settings.preprocess.time_limit,
+            'metavar': 'SECS',
+            'help': 'quarantine a document that takes longer than this to process',
+        }),
+        ('--size-limit', {
+            'type': int,
+            'default': settings.preprocess.size_limit,
+            'metavar': 'BYTES',
+            'help': 'quarantine a document that is larger than this on disk',
+        }),
+        ('--tagger', {
+            'choices': ['perceptron', 'vectorized'],
+            'default': settings.preprocess.tagger,
+            'help': 'tag with the nltk perceptron or the vectorized backend',
+        }),
+        ('--sentence-cache', {
+            'type': int,
+            'default': settings.preprocess.sentence_cache,
+            'metavar': 'SENTS',
+            'help': 'memoize this many tagged sentences in each process',
+        }),
+        ('--boilerplate', {
+            'type': float,
+            'default': settings.preprocess.boilerplate,
+            'metavar': 'FRAC',
+            'help': "drop paragraphs in more than this fraction of a feed's documents",
+        }),
+        ('--dedup', {
+            'action': 'store_true',
+            'default': settings.preprocess.dedup,
+            'help': 'only process one representative of exact and near duplicates',
+        }),
+        ('--language', {
+            'choices': sorted(SAMPLES),
+            'default': settings.preprocess.language,
+            'help': 'skip documents that are not identified as this language',
+        }),
+        ('--pipeline', {
+            'action': 'store_true',
+            'default': settings.preprocess.pipeline,
+            'help': 'overlap reading, parsing, tagging and writing in a staged pipeline',
+        }),
+        ('--parse-tasks', {
+            'type': int,
+            'default': settings.preprocess.parse_tasks,
+            'metavar': 'CPUs',
+            'help': 'if pipeline, the number of processes parsing HTML',
+        }),
+        ('--tag-tasks', {
+            'type': int,
+            'default': settings.preprocess.tag_tasks,
+            'metavar': 'CPUs',
+            'help': 'if pipeline, the number of processes tagging sentences',
+        }),
+        ('--schedule', {
+            'choices': ['largest', 'ordered'],
+            'default': settings.preprocess.schedule,
+            'help': 'if parallel, submit the largest documents first or in corpus order',
+        }),
+        ('--estimate', {
+            'action': 'store_true',
+            'default': False,
+            'help': 'estimate the runtime and target size from a sample without writing',
+        }),
+        ('--sample', {
+            'type': float,
+            'default': 0.01,
+            'metavar': 'FRAC',
+            'help': 'if estimating, the fraction of each category to process',
+        }),
         (('-s', '--silent'), {
             "action": "store_true",
             "default": False,
@@ -58,6 +164,36 @@ class PreprocessCommand(Command):
             'default': settings.preprocess.overwrite,
             'help': 'overwrite any existing files in the target',
         }),
+        ('--sharded', {
+            'action': 'store_true',
+            'default': settings.preprocess.sharded,
+            'help': 'write documents into large segment files in the target',
+        }),
+        ('--columnar', {
+            'action': 'store_true',
+            'default': False,
+            'help': 'write documents into a memory-mapped columnar store',
+        }),
+        ('--incremental', {
+            'action': 'store_true',
+            'default': settings.preprocess.incremental,
+            'help': 'only process documents that are new or changed since the last run',
+        }),
+        ('--resume', {
+            'action': 'store_true',
+            'default': False,
+            'help': 'resume the job in the target, retrying failed documents',
+        }),
+        ('--shard', {
+            'default': None,
+            'metavar': 'i/N',
+            'help': 'only process the i-th of N disjoint slices of the corpus',
+        }),
+        ('--partition', {
+            'choices': ['hash', 'size'],
+            'default': settings.preprocess.partition,
+            'help': 'assign documents to shards by stable hash or balanced by size',
+        }),
         ('--no-skip', {
             'action': 'store_false',
             'dest': 'skip_exists',
@@ -82,13 +218,81 @@ class PreprocessCommand(Command):
         kwargs = {
             'overwrite': args.overwrite,
             'skip_exists': args.skip_exists,
+            'incremental': args.incremental,
+            'resume': args.resume,
+            'shard': args.shard,
+            'partition': args.partition,
+            'time_limit': args.time_limit,
+            'size_limit': args.size_limit,
+            'tagger': args.tagger,
+            'sentence_cache': args.sentence_cache,
+            'boilerplate': args.boilerplate,
+            'dedup': args.dedup,
+            'language': args.language,
         }
 
         # Select class and modiffy parameters for specific classes.
+        if args.sharded and args.columnar:
+            raise ConsoleError("Specify sharded or columnar output, not both")
+
+        if args.incremental and (args.sharded or args.columnar):
+            raise ConsoleError("Incremental preprocessing does not support sharded or columnar output")
+
+        if args.pipeline and (args.sharded or args.columnar or args.parallel):
+            raise ConsoleError("The pipeline writes one pickle per document and is already parallel")
+
+        if args.pipeline and (args.time_limit or args.size_limit):
+            raise ConsoleError("The pipeline does not support time or size limits")
+
+        if args.pipeline and args.language:
+            raise ConsoleError("The pipeline does not support the language filter")
+
+        if args.pipeline:
+            # Add the pipeline specific arguments
+            kwargs['parse_tasks'] = args.parse_tasks
+            kwargs['tag_tasks'] = args.tag_tasks
+
         if args.parallel:
             # Add the parallel specific arguments
             kwargs['tasks'] = args.tasks
+            kwargs['chunksize'] = args.chunksize
+            kwargs['schedule'] = args.schedule
+            kwargs['max_tasks'] = args.max_tasks
+            kwargs['memory_limit'] = args.memory_limit
+
+        # Select class based on output format, parallelism, and progress bar.
+        if args.columnar:
+            if args.parallel:
+                if args.silent:
+                    Transformer = ParallelColumnarPreprocessor
+                else:
+                    Transformer = ProgressParallelColumnarPreprocessor
+            else:
+                if args.silent:
+                    Transformer = ColumnarPreprocessor
+                else:
+                    Transformer = ProgressColumnarPreprocessor
 
+        elif args.sharded:
+            if args.parallel:
+                if args.silent:
+                    Transformer = ParallelShardedPreprocessor
+                else:
+                    Transformer = ProgressParallelShardedPreprocessor
+            else:
+                if args.silent:
+                    Transformer = ShardedPreprocessor
+                else:
+                    Transformer = ProgressShardedPreprocessor
+
+        elif args.pipeline:
+            # Select class based on progress bar required or not.
+            if args.silent:
+                Transformer = PipelinePreprocessor
+            else:
+                Transformer = ProgressPipelinePreprocessor
+
+        elif args.parallel:
             # Select class based on progress bar required or not.
             if args.silent:
                 Transformer = ParallelPreprocessor
@@ -101,16 +305,141 @@ class PreprocessCommand(Command):
             else:
                 Transformer = ProgressPreprocessor
 
+        if args.estimate:
+            return self.estimate(args, kwargs)
+
         # Time and execute the transformation
         with Timer() as timer:
             corpus = BaleenCorpusReader(args.corpus[0])
-            transformer = Transformer(corpus, args.target[0], **kwargs)
+            try:
+                transformer = Transformer(corpus, args.target[0], **kwargs)
+            except ValueError as e:
+                raise ConsoleError(str(e))
 
             docs, skips = 0, 0
             for doc in transformer.transform():
                 if doc is None: skips += 1
                 else: docs += 1
 
-        return "Preprocessed {:,} documents, skipped {:,} in {}".format(
+        output = "Preprocessed {:,} documents, skipped {:,} in {}".format(
             docs, skips, timer
         )
+
+        if args.resume:
+            output += " (resumed job has {:,} completed documents)".format(
+                len(transformer.journal.completed)
+            )
+
+        # Report the throughput of every stage of the pipeline
+        if args.pipeline:
+            output += "\n" + "\n".join(
+                "  {stage:<6} {processed:>8,} docs {throughput:>8.1f} docs/sec "
+                "{utilization:>6.1%} busy".format(**stage)
+                for stage in transformer.stats()
+            )
+
+        # Report the workers that were replaced for using too much memory
+        if getattr(transformer, 'recycled', 0):
+            output += "\nReplaced {:,} workers over the memory limit, peak {:,} bytes".format(
+                transformer.recycled, max(transformer.peaks.values())
+            )
+
+        # Report the boilerplate paragraphs that were dropped
+        if corpus.boilerplate is not None:
+            output += "\nDropped {:,} boilerplate paragraphs of {:,} feeds".format(
+                len(corpus.boilerplate), len(corpus.boilerplate.feeds)
+            )
+
+        # Report the duplicate documents that were not processed
+        if transformer.duplicates is not None:
+            output += "\nFound {:,} exact and {:,} near duplicates in {:,} clusters".format(
+                transformer.duplicates.exact, transformer.duplicates.near,
+                len(transformer.duplicates.clusters())
+            )
+
+        # Report the documents rejected by the language filter by category
+        rejected = transformer.rejected()
+        if rejected:
+            output += "\nRejected {:,} documents not identified as '{}':\n".format(
+                sum(rejected.values()), args.language
+            )
+            output += "\n".join(
+                "  {:<20} {:>8,} docs".format(str(category), count)
+                for category, count in sorted(rejected.items(), key=str)
+            )
+            output += "\n  see {} in the target".format(
+                os.path.basename(transformer.languages.path)
+            )
+
+        # Report how often repeated sentences were found in the cache
+        hits, misses = transformer.cache_stats()
+        if hits + misses:
+            output += "\nSentence cache: {:,} hits of {:,} sentences ({:0.1%})".format(
+                hits, hits + misses, float(hits) / (hits + misses)
+            )
+
+        # Report the quarantined documents to help tune the limits
+        quarantined = transformer.quarantined()
+        if quarantined:
+            output += "\nQuarantined {:,} documents:\n".format(
+                sum(reason['documents'] for reason in quarantined.values())
+            )
+            output += "\n".join(
+                "  {reason:<6} {documents:>8,} docs, median {median_elapsed:0.2f}s "
+                "max {max_elapsed:0.2f}s, median {median_size:,} bytes "
+                "max {max_size:,} bytes".format(reason=name, **reason)
+                for name, reason in sorted(quarantined.items())
+            )
+            output += "\n  see {} in the target".format(
+                os.path.basename(transformer.quarantine.path)
+            )
+
+        # Report any documents that failed in the worker processes
+        errors = getattr(transformer, 'errors', [])
+        if errors:
+            output += "\n{:,} documents failed:\n".format(len(errors))
+            output += "\n".join(
+                "  - {}: {}".format(fileid, error.strip().splitlines()[-1])
+                for fileid, error in errors
+            )
+
+        return output
+
+    def estimate(self, args, kwargs):
+        """
+        Processes a sample of the corpus without writing to the target and
+        reports the extrapolated runtime and size of the target.
+        """
+        tasks = args.tasks if (args.parallel or args.pipeline) else 1
+
+        with Timer() as timer:
+            corpus = BaleenCorpusReader(args.corpus[0])
+            try:
+                transformer = Preprocessor(corpus, args.target[0], **kwargs)
+                result = estimate(transformer, fraction=args.sample, tasks=tasks)
+            except ValueError as e:
+                raise ConsoleError(str(e))
+
+        output = [
+            "Estimated from {:,} of {:,} documents ({}) in {}".format(
+                result['sampled'], result['files'], filesize(result['bytes']), timer
+            ),
+        ]
+
+        for stage, seconds in result['stages'].items():
+            output.append("  {:<8} {:>10.1f} ms/MiB {:>12,.1f} CPU seconds".format(
+                stage, result['per_byte'][stage] * 1048576 * 1000, seconds
+            ))
+
+        output.append("Runtime: {} with {:,} tasks ({:,.1f} CPU seconds)".format(
+            timedelta(seconds=result['runtime']) or "under a second",
+            result['tasks'], result['cpu'],
+        ))
+        output.append("Target size: {} ({:0.2f}x the input)".format(
+            filesize(result['target_size']), result['ratio']
+        ))
+
+        if result['errors']:
+            output.append("{:,} sampled documents failed".format(result['errors']))
+
+        return "\n".join(output)
@@ -19,15 +19,31 @@ Corpus reader and parser object for accessing data on disk.
 
 import os
 import bs4
+import math
 import time
 import json
 import nltk
 import codecs
 import pickle
+import random
+import warnings
 import nltk.data
+import multiprocessing as mp
 
 from six import string_types
-
+from minke.config import settings
+from minke.exceptions import MinkeWarning
+from minke.shards import ShardReader
+from minke.cache import ReadabilityCache
+from minke.catalog import MetadataCatalog, CATALOG
+from minke.columnar import ColumnarReader
+from minke.manifest import CorpusManifest
+from minke.projection import FieldProjector
+from minke.language import LanguageIdentifier
+from minke.utils.sketches import VocabularySketch
+from minke.utils.statistics import stratified_total
+
+from lxml import etree
 from nltk.tokenize import WordPunctTokenizer
 from nltk.corpus.reader.api import CorpusReader
 from nltk.corpus.reader.api import CategorizedCorpusReader
@@ -42,6 +58,78 @@ DOC_PATTERN = r'(?!\.)[a-z_\s]+/[a-f0-9]+\.json'
 PKL_PATTERN = r'(?!\.)[a-z_\s]+/[a-f0-9]+\.pickle'
 CAT_PATTERN = r'([a-z_\s]+)/.*'
 
+BATCH_SIZE  = 8192 # Number of tokens added to the vocabulary at a time
+REJECTED    = 'rejected' # Key of the rejected documents of a category in counts
+
+
+# Compiled XPath expressions that select paragraph tags, by tag list.
+_PARAGRAPH_XPATHS = {}
+_TEXT_XPATH = etree.XPath("string()", smart_strings=False)
+
+
+##########################################################################
+## HTML Helpers
+##########################################################################
+
+def paragraph_xpath(tags):
+    """
+    Returns a compiled XPath expression that selects every element with one
+    of the given tags in document order, including nested elements, which is
+    the same selection as BeautifulSoup's ``find_all(tags)``. Expressions are
+    compiled once per process and are not stored on the reader since they
+    cannot be pickled.
+    """
+    tags = tuple(tags)
+    if tags not in _PARAGRAPH_XPATHS:
+        _PARAGRAPH_XPATHS[tags] = etree.XPath(
+            "//*[{}]".format(" or ".join("self::{}".format(tag) for tag in tags))
+        )
+    return _PARAGRAPH_XPATHS[tags]
+
+
+##########################################################################
+## Multiprocessing Helpers
+##########################################################################
+
+def _partial_describe(args):
+    """
+    Computes the partial description of a corpus for a partition of fileids
+    in a worker process. Defined at the module level so it can be pickled.
+    """
+    corpus, fileids, approximate, language = args
+    return corpus.partial_describe(
+        fileids, approximate=approximate, language=language
+    )
+
+
+def _partial_sample(args):
+    """
+    Computes the per-document counts and merged vocabulary sketch of a
+    partition of sampled fileids in a worker process.
+    """
+    corpus, fileids = args
+    return corpus.partial_sample(fileids)
+
+
+def _merge(vocab, other):
+    """
+    Merges a partial vocabulary into another, either as a frequency
+    distribution or as a ``VocabularySketch``.
+    """
+    if isinstance(vocab, VocabularySketch):
+        return vocab.merge(other)
+    vocab.update(other)
+    return vocab
+
+
+def _ratio(numerator, denominator):
+    """
+    Divides the counts for describe, returning zero for an empty selection.
+    """
+    if not denominator:
+        return 0.0
+    return float(numerator) / float(denominator)
+
 
 ##########################################################################
 ## BaleenCorpusReader
@@ -58,27 +146,160 @@ class BaleenCorpusReader(CategorizedCorpusReader, CorpusReader):
         'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'h7', 'p', 'li'
     ]
 
+    # Keyword arguments to the readability Document (part of the cache key)
+    READABILITY = {}
+
     def __init__(self, root, fileids=DOC_PATTERN, tags=None,
                  word_tokenizer=WordPunctTokenizer(),
                  sent_tokenizer=nltk.data.LazyLoader(
                     'tokenizers/punkt/english.pickle'),
-                 encoding='utf8', **kwargs):
+                 encoding='utf8', manifest=True, cache=None, parser='lxml',
+                 catalog=None, boilerplate=None, **kwargs):
         """
         Initialize the corpus reader.  Categorization arguments
         (``cat_pattern``, ``cat_map``, and ``cat_file``) are passed to
         the ``CategorizedCorpusReader`` constructor.  The remaining arguments
         are passed to the ``CorpusReader`` constructor.
+
+        If manifest is True (or a path), the fileids and categories are loaded
+        from a ``CorpusManifest`` rather than by walking the corpus root.
+
+        The cache is a ``ReadabilityCache`` or the path to one; by default the
+        path in the corpus settings is used. Pass False to disable caching.
+
+        The parser determines how paragraphs are extracted from the HTML,
+        either 'lxml' (a single lxml parse and XPath selection) or 'bs4' (the
+        original BeautifulSoup extraction, kept for compatibility).
+
+        The catalog is the path to the ``MetadataCatalog`` used by ``select``,
+        by default ``.catalog.sqlite`` in the root of the corpus.
+
+        The boilerplate is a fitted ``BoilerplateFilter`` whose paragraphs are
+        dropped from the paragraphs of the documents of each feed.
         """
+        if parser not in ('lxml', 'bs4'):
+            raise ValueError("Unknown HTML parser '{}'".format(parser))
+
         # Add the default category pattern if not passed into the class.
         if not any(key.startswith('cat_') for key in kwargs.keys()):
             kwargs['cat_pattern'] = CAT_PATTERN
 
+        fileids = self._init_manifest(root, fileids, manifest, kwargs)
         CategorizedCorpusReader.__init__(self, kwargs)
         CorpusReader.__init__(self, root, fileids, encoding)
 
         self._word_tokenizer = word_tokenizer
         self._sent_tokenizer = sent_tokenizer
         self._good_tags = tags or self.TAGS
+        self._parser = parser
+        self.boilerplate = boilerplate
+
+        # Open the readability cache if one is configured
+        if cache is None:
+            cache = settings.corpus.cache
+        if isinstance(cache, string_types):
+            cache = ReadabilityCache(cache, settings.corpus.cache_size)
+        self._cache = cache if isinstance(cache, ReadabilityCache) else None
+
+        # The metadata catalog is opened on demand by select
+        self._catalog = MetadataCatalog(
+            catalog or os.path.join(getattr(root, 'path', root), CATALOG)
+        )
+
+    def _init_manifest(self, root, fileids, manifest, kwargs):
+        """
+        Opens the corpus manifest if one is requested and the fileids and
+        categories are specified by patterns, returning the list of fileids
+        from the manifest, otherwise returns the fileids unmodified.
+        """
+        self._manifest = None
+
+        if not manifest or not isinstance(fileids, string_types):
+            return fileids
+
+        if 'cat_pattern' not in kwargs:
+            return fileids
+
+        path = manifest if isinstance(manifest, string_types) else None
+        self._manifest = CorpusManifest.open(
+            getattr(root, 'path', root), fileids, kwargs['cat_pattern'], path
+        )
+        return self._manifest.fileids()
+
+    def __getstate__(self):
+        """
+        An nltk ``LazyLoader`` that has not been loaded cannot be unpickled,
+        so the default sentence tokenizer is pickled as the path of its
+        resource and lazily loaded again in the process that unpickles it.
+        """
+        state = self.__dict__.copy()
+        tokenizer = state.get('_sent_tokenizer')
+        if isinstance(tokenizer, nltk.data.LazyLoader):
+            # Read the path from the instance dict, getattr would load it
+            attrs = vars(tokenizer)
+            state['_sent_tokenizer'] = None
+            state['_sent_resource'] = attrs.get(
+                '_path', attrs.get('_LazyLoader__path')
+            )
+        return state
+
+    def __setstate__(self, state):
+        resource = state.pop('_sent_resource', None)
+        self.__dict__.update(state)
+        if resource is not None:
+            self._sent_tokenizer = nltk.data.LazyLoader(resource)
+
+    def fileids(self, categories=None):
+        """
+        Returns the fileids of the corpus or of the given categories, looked
+        up directly from the manifest if the reader has one.
+        """
+        if self._manifest is None:
+            return CategorizedCorpusReader.fileids(self, categories)
+        return self._manifest.fileids(categories)
+
+    def categories(self, fileids=None):
+        """
+        Returns the categories of the corpus or of the given fileids, looked
+        up directly from the manifest if the reader has one.
+        """
+        if self._manifest is None:
+            return CategorizedCorpusReader.categories(self, fileids)
+        return self._manifest.categories(fileids)
+
+    def abspath(self, fileid):
+        """
+        Returns the absolute path to the fileid. Unlike the nltk path pointers
+        the manifest computes the path without checking that it exists.
+        """
+        if self._manifest is None:
+            return CorpusReader.abspath(self, fileid)
+        return self._manifest.abspath(fileid)
+
+    def abspaths(self, fileids=None, include_encoding=False, include_fileid=False):
+        """
+        Returns the absolute paths for all fileids in the corpus or the given
+        fileids, optionally with their encodings and fileids as tuples.
+        """
+        if self._manifest is None:
+            return CorpusReader.abspaths(
+                self, fileids, include_encoding, include_fileid
+            )
+
+        if fileids is None:
+            fileids = self._fileids
+        elif isinstance(fileids, string_types):
+            fileids = [fileids]
+
+        paths = [self._manifest.abspath(fileid) for fileid in fileids]
+
+        if include_encoding and include_fileid:
+            return list(zip(paths, [self.encoding(f) for f in fileids], fileids))
+        elif include_fileid:
+            return list(zip(paths, fileids))
+        elif include_encoding:
+            return list(zip(paths, [self.encoding(f) for f in fileids]))
+        return paths
 
     def feeds(self):
         """
@@ -87,6 +308,32 @@ class BaleenCorpusReader(CategorizedCorpusReader, CorpusReader):
         data = self.open('feeds.json')
         return json.load(data)
 
+    @property
+    def catalog(self):
+        """
+        The ``MetadataCatalog`` of the corpus, built with ``sei catalog``.
+        """
+        return self._catalog
+
+    def select(self, feed=None, start=None, end=None, categories=None, title=None):
+        """
+        Returns the fileids of the documents that match the filters, which
+        are resolved against the metadata catalog without opening any files.
+        Feed ids and categories may be a string or a list, start and end
+        bound the publication date (inclusive and exclusive respectively)
+        and may be datetimes or date strings, and title is a substring. The
+        fileids can then be passed to any of the other reader methods:
+
+            corpus.paras(fileids=corpus.select(feed='5713ae', start='2016-05-01'))
+        """
+        if not self._catalog.exists(self._catalog.path):
+            raise ValueError(
+                "No metadata catalog at '{}', build one with sei catalog".format(
+                    self._catalog.path
+                )
+            )
+        return self._catalog.select(feed, start, end, categories, title)
+
     def _resolve(self, fileids, categories):
         """
         Returns a list of fileids or categories depending on what is passed
@@ -136,20 +383,28 @@ class BaleenCorpusReader(CategorizedCorpusReader, CorpusReader):
 
             corpus.fields('summary')
 
-        Note: there is not yet support for nested fields.
+        Nested fields are specified as dotted paths, e.g. ``feed.$oid``. The
+        documents are not completely decoded; a ``FieldProjector`` decodes
+        only the requested fields and stops reading once they are found.
         """
         if isinstance(fields, string_types):
             fields = [fields,]
 
-        if len(fields) == 1:
-            for doc in self.docs(fileids, categories):
-                if fields[0] in doc:
-                    yield doc[fields[0]]
+        # Resolve the fileids and the categories
+        fileids = self._resolve(fileids, categories)
+        projector = FieldProjector(fields)
 
-        else:
-            for doc in self.docs(fileids, categories):
+        for path, enc, fileid in self.abspaths(fileids, True, True):
+            with codecs.open(path, 'r', encoding=enc) as f:
+                found = projector.project(f)
+
+            if len(fields) == 1:
+                if fields[0] in found:
+                    yield found[fields[0]]
+
+            else:
                 yield {
-                    key: doc.get(key, None)
+                    key: found.get(key, None)
                     for key in fields
                 }
 
@@ -159,35 +414,138 @@ class BaleenCorpusReader(CategorizedCorpusReader, CorpusReader):
         the corpus, ensuring that it exists. Note, this simply returns the
         HTML strings, it doesn't perform any parsing of the HTML.
 
-        If readability is True, clean HTML is returned.
+        If readability is True, clean HTML is returned, using the readability
+        cache if the reader has one.
         """
         ## Returns a generator of documents.
         html = self.fields('content', fileids, categories)
         if readability:
             for doc in html:
                 try:
-                    yield Paper(doc).summary()
+                    yield self._clean(doc)
                 except Unparseable as e:
-                    print("Could not parse HTML: {}".format(e))
+                    warnings.warn(
+                        "Could not parse HTML: {}".format(e), MinkeWarning
+                    )
         else:
             for doc in html:
                 yield doc
 
+    @property
+    def cache(self):
+        """
+        The ``ReadabilityCache`` of cleaned HTML, or None if disabled.
+        """
+        return self._cache
+
+    def _clean(self, content):
+        """
+        Returns the readability summary of the raw HTML content, looking it up
+        in the cache by the hash of the content and the readability settings
+        before running readability, and storing the summary on a miss.
+        """
+        if self._cache is None:
+            return Paper(content, **self.READABILITY).summary()
+
+        key  = self._cache.key(content, self.READABILITY)
+        html = self._cache.get(key)
+        if html is None:
+            html = Paper(content, **self.READABILITY).summary()
+            self._cache.set(key, html)
+        return html
+
     def paras(self, fileids=None, categories=None):
         """
-        Uses BeautifulSoup to parse the paragraphs from the HTML.
-        Currently, this just sends raw text, it does not do any segmentation
-        or tokenization as the standard NLTK CorpusReader objects do.
+        Parses the paragraphs from the HTML with lxml (or BeautifulSoup if
+        the reader's parser is 'bs4'). Currently, this just sends raw text,
+        it does not do any segmentation or tokenization as the standard NLTK
+        CorpusReader objects do. If the reader has a boilerplate filter, the
+        boilerplate paragraphs of the feed of each document are dropped.
         """
+        if self.boilerplate is not None:
+            for feed, paragraphs in self.feed_paras(fileids, categories):
+                for paragraph in self.boilerplate.filter(feed, paragraphs):
+                    yield paragraph
+            return
+
+        extract = self._bs4_paras if self._parser == 'bs4' else self._lxml_paras
         for html in self.html(fileids, categories):
-            soup = bs4.BeautifulSoup(html, 'lxml')
-            for element in soup.find_all(self._good_tags):
-                yield element.text
+            for paragraph in extract(html):
+                yield paragraph
+
+    def feed_paras(self, fileids=None, categories=None, readability=True):
+        """
+        Returns the feed id and the list of paragraphs of every document,
+        without filtering boilerplate. If readability is False the paragraphs
+        are extracted from the raw HTML, which is much faster.
+        """
+        fields = ['feed.$oid', 'content']
+        for doc in self.fields(fields, fileids, categories):
+            if doc['content'] is None:
+                yield doc['feed.$oid'], []
+                continue
+            yield doc['feed.$oid'], self._parse(doc['content'], readability)
+
+    def parse(self, content, feed=None):
+        """
+        Returns the paragraphs of the raw HTML content of a single document,
+        cleaned with readability, as paras does for the documents in the
+        corpus (including dropping the boilerplate of the feed); used to parse
+        documents that have already been read.
+        """
+        paragraphs = self._parse(content)
+        if self.boilerplate is not None:
+            return self.boilerplate.filter(feed, paragraphs)
+        return paragraphs
+
+    def _parse(self, content, readability=True):
+        """
+        Extracts the paragraphs of the raw HTML content, optionally cleaned
+        with readability first.
+        """
+        extract = self._bs4_paras if self._parser == 'bs4' else self._lxml_paras
+        try:
+            html = self._clean(content) if readability else content
+        except Unparseable as e:
+            warnings.warn("Could not parse HTML: {}".format(e), MinkeWarning)
+            return []
+        return extract(html)
+
+    def _lxml_paras(self, html):
+        """
+        Parses the HTML once with the lxml HTML parser and selects the text of
+        the paragraph tags with a compiled XPath expression.
+        """
+        if not html.strip():
+            return []
+
+        try:
+            tree = etree.fromstring(html, etree.HTMLParser())
+        except ValueError:
+            # Unicode strings with an encoding declaration must be bytes
+            tree = etree.fromstring(
+                html.encode('utf-8'), etree.HTMLParser(encoding='utf-8')
+            )
+
+        if tree is None:
+            return []
+
+        return [
+            _TEXT_XPATH(element)
+            for element in paragraph_xpath(self._good_tags)(tree)
+        ]
+
+    def _bs4_paras(self, html):
+        """
+        Uses BeautifulSoup to parse the paragraphs from the HTML.
+        """
+        soup = bs4.BeautifulSoup(html, 'lxml')
+        return [element.text for element in soup.find_all(self._good_tags)]
 
     def sents(self, fileids=None, categories=None):
         """
         Uses the built in sentence tokenizer to extract sentences from the
-        paragraphs. Note that this method uses BeautifulSoup to parse HTML.
+        paragraphs parsed from the HTML.
         """
         for paragraph in self.paras(fileids, categories):
             for sentence in self._sent_tokenizer.tokenize(paragraph):
@@ -195,8 +553,8 @@ class BaleenCorpusReader(CategorizedCorpusReader, CorpusReader):
 
     def words(self, fileids=None, categories=None):
         """
-        Uses the built in word tokenizer to extract tokens from sentences.
-        Note that this method uses BeautifulSoup to parse HTML content.
+        Uses the built in word tokenizer to extract tokens from sentences
+        that are segmented from the paragraphs parsed from the HTML.
         """
         for sentence in self.sents(fileids, categories):
             for token in self._word_tokenizer.tokenize(sentence):
@@ -210,54 +568,295 @@ class BaleenCorpusReader(CategorizedCorpusReader, CorpusReader):
         # Resolve the fileids and the categories
         fileids = self._resolve(fileids, categories)
 
+        # Use the sizes recorded by the manifest if available
+        if self._manifest is not None:
+            if fileids is None:
+                fileids = self._fileids
+            elif isinstance(fileids, string_types):
+                fileids = [fileids]
+
+            for fileid in fileids:
+                yield self._manifest.size(fileid)
+            return
+
         # Create a generator, getting every path and computing filesize
         for path, enc, fileid in self.abspaths(fileids, True, True):
             yield os.path.getsize(path)
 
-    def describe(self, fileids=None, categories=None):
+    def partial_describe(self, fileids=None, categories=None, approximate=False,
+                         vocab=None, language=None):
         """
-        Performs a single pass of the corpus and returns a dictionary with a
-        variety of metrics concerning the state of the corpus.
+        Performs a single pass over the specified documents and returns the
+        partial counts of paragraphs, sentences, and words along with the
+        frequency distribution of the vocabulary. Partial results from
+        disjoint sets of fileids can be merged by adding them together.
+
+        If approximate is True the vocabulary is counted in a fixed memory
+        ``VocabularySketch`` rather than a frequency distribution. An existing
+        vocabulary can be passed in to be updated rather than creating one.
+
+        If a language is set, documents that are not identified as the
+        language are not counted; instead the rejected documents of every
+        category are counted with the key ('rejected', category).
         """
         # Structures to perform counting.
         counts  = nltk.FreqDist()
-        tokens  = nltk.FreqDist()
-        started = time.time()
-
-        # Perform single pass over paragraphs, tokenize and count
-        for para in self.paras(fileids, categories):
+        tokens  = vocab
+        if tokens is None:
+            tokens = VocabularySketch() if approximate else nltk.FreqDist()
+
+        paragraphs = self.paras(fileids, categories)
+        if language is not None:
+            paragraphs = self._identified(fileids, categories, language, counts)
+
+        # Perform single pass over paragraphs, tokenize and count; words are
+        # added to the vocabulary in batches since sketches update in bulk.
+        batch = []
+        for para in paragraphs:
             counts['paras'] += 1
 
             for sent in self._sent_tokenizer.tokenize(para):
                 counts['sents'] += 1
 
-                for word in self._word_tokenizer.tokenize(sent):
-                    counts['words'] += 1
-                    tokens[word] += 1
+                words = self._word_tokenizer.tokenize(sent)
+                counts['words'] += len(words)
+                batch.extend(words)
+
+            if len(batch) >= BATCH_SIZE:
+                tokens.update(batch)
+                batch = []
+
+        tokens.update(batch)
+        return counts, tokens
+
+    def _identified(self, fileids, categories, language, counts):
+        """
+        Returns a generator of the cleaned paragraphs of the documents that
+        are identified as the language (or are too short to identify), and
+        counts the rejected documents of each category in counts.
+        """
+        identifier = LanguageIdentifier()
+        fileids = self._resolve(fileids, categories)
+        if fileids is None:
+            fileids = self.fileids()
+        elif isinstance(fileids, string_types):
+            fileids = [fileids]
+
+        for fileid in fileids:
+            paragraphs = list(self.paras(fileids=fileid))
+            found, _ = identifier.identify(paragraphs)
+            if found is not None and found != language:
+                cats = self.categories([fileid])
+                counts[(REJECTED, cats[0] if cats else None)] += 1
+                continue
+
+            for paragraph in paragraphs:
+                yield paragraph
+
+    def partial_sample(self, fileids):
+        """
+        Returns a list of (fileid, paras, sents, words) counts for each of the
+        specified documents along with a vocabulary sketch of all of them, so
+        that the variance between documents can be used to estimate totals.
+        """
+        rows   = []
+        tokens = VocabularySketch()
+
+        for fileid in fileids:
+            counts, _ = self.partial_describe([fileid], vocab=tokens)
+            rows.append((fileid, counts['paras'], counts['sents'], counts['words']))
+
+        return rows, tokens
+
+    def describe(self, fileids=None, categories=None, workers=1,
+                 approximate=False, sample=None, confidence=0.95, seed=None,
+                 language=None):
+        """
+        Performs a single pass of the corpus and returns a dictionary with a
+        variety of metrics concerning the state of the corpus.
+
+        If workers is greater than one, the fileids are partitioned across a
+        process pool, each worker computes a ``partial_describe`` and the
+        partial counts and vocabularies are merged into the final result.
+
+        If approximate is True, the vocabulary is estimated in fixed memory
+        with a ``VocabularySketch`` and the most common tokens are added to
+        the result. If sample is a fraction between 0 and 1, only that
+        fraction of the documents of each category are scanned (implying
+        approximate); the totals are then estimated from the sample and
+        reported with their confidence intervals. Note that the vocabulary and
+        most common tokens are those of the sampled documents only.
+
+        If a language is set (e.g. 'en'), documents that are not identified
+        as that language are skipped and the number rejected in every
+        category is added to the result; it cannot be combined with sample.
+        """
+        started = time.time()
+
+        # Resolve the fileids to partition across workers; note that an empty
+        # selection (e.g. a filter that matched nothing) is not the corpus.
+        resolved = self._resolve(fileids, categories)
+        if resolved is None:
+            resolved = self.fileids()
+        elif isinstance(resolved, string_types):
+            resolved = [resolved]
+
+        if sample is not None:
+            if language is not None:
+                raise ValueError("Cannot filter languages of a sampled description")
+            return self._sampled_describe(
+                resolved, workers, sample, confidence, seed, started
+            )
+
+        if not resolved:
+            counts = nltk.FreqDist()
+            tokens = VocabularySketch() if approximate else nltk.FreqDist()
+        elif workers > 1:
+            counts, tokens = self._parallel_describe(
+                resolved, workers, approximate, language
+            )
+        else:
+            counts, tokens = self.partial_describe(
+                resolved, approximate=approximate, language=language
+            )
 
         # Compute the number of files and categories in the corpus
-        n_fileids = len(self._resolve(fileids, categories) or self.fileids())
-        n_topics  = len(self.categories(self._resolve(fileids, categories)))
+        n_fileids = len(resolved)
+        n_topics  = len(self.categories(resolved))
 
         # Return data structure with information
-        return {
+        stats = {
             'files':  n_fileids,
             'topics': n_topics,
             'paras':  counts['paras'],
             'sents':  counts['sents'],
             'words':  counts['words'],
             'vocab':  len(tokens),
-            'lexdiv': float(counts['words']) / float(len(tokens)),
-            'ppdoc':  float(counts['paras']) / float(n_fileids),
-            'sppar':  float(counts['sents']) / float(counts['paras']),
+            'lexdiv': _ratio(counts['words'], len(tokens)),
+            'ppdoc':  _ratio(counts['paras'], n_fileids),
+            'sppar':  _ratio(counts['sents'], counts['paras']),
             'secs':   time.time() - started,
         }
 
-    def describes(self, fileids=None, categories=None):
+        if approximate:
+            stats['common'] = tokens.most_common(10)
+
+        if language is not None:
+            stats['language'] = language
+            stats['rejected'] = {
+                key[1]: count for key, count in counts.items()
+                if isinstance(key, tuple) and key[0] == REJECTED
+            }
+
+        return stats
+
+    def _parallel_describe(self, fileids, workers, approximate=False, language=None):
+        """
+        Maps ``partial_describe`` over interleaved partitions of the fileids
+        with a process pool and reduces the partial results as they arrive.
+        Several partitions per worker are used to balance skewed file sizes.
+        """
+        counts  = nltk.FreqDist()
+        tokens  = VocabularySketch() if approximate else nltk.FreqDist()
+
+        n_parts = min(len(fileids), workers * 4)
+        tasks   = [
+            (self, fileids[idx::n_parts], approximate, language)
+            for idx in range(n_parts)
+        ]
+
+        pool = mp.Pool(processes=workers)
+        try:
+            for pcounts, ptokens in pool.imap_unordered(_partial_describe, tasks):
+                counts.update(pcounts)
+                _merge(tokens, ptokens)
+        finally:
+            pool.close()
+            pool.join()
+
+        return counts, tokens
+
+    def _sampled_describe(self, fileids, workers, sample, confidence, seed, started):
         """
-        Returns a string representation of the describe command.
+        Draws a stratified random sample of the fileids, using the categories
+        as strata so that every category is represented, scans the sampled
+        documents and estimates the corpus totals from the sample.
         """
-        return (
+        if not 0.0 < sample <= 1.0:
+            raise ValueError("Sample must be a fraction between 0 and 1")
+
+        # Group the fileids into strata by their first category
+        strata = {}
+        for fileid in fileids:
+            cats = self.categories([fileid])
+            strata.setdefault(cats[0] if cats else None, []).append(fileid)
+
+        # Sample at least two documents per stratum to estimate its variance
+        rng = random.Random(seed)
+        sampled = []
+        for key in sorted(strata, key=str):
+            population = strata[key]
+            n_sample = min(len(population), max(2, int(math.ceil(sample * len(population)))))
+            sampled.extend(rng.sample(population, n_sample))
+
+        # Scan the sampled documents, in parallel if requested
+        if workers > 1 and sampled:
+            rows, tokens = [], VocabularySketch()
+            n_parts = min(len(sampled), workers * 4)
+            tasks = [(self, sampled[idx::n_parts]) for idx in range(n_parts)]
+
+            pool = mp.Pool(processes=workers)
+            try:
+                for prows, ptokens in pool.imap_unordered(_partial_sample, tasks):
+                    rows.extend(prows)
+                    tokens.merge(ptokens)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            rows, tokens = self.partial_sample(sampled)
+
+        # Estimate the total of each count with its confidence interval
+        scanned = {row[0]: row[1:] for row in rows}
+        estimates, intervals = {}, {}
+        for idx, name in enumerate(('paras', 'sents', 'words')):
+            total, low, high = stratified_total([
+                (len(population), [
+                    scanned[fileid][idx] for fileid in population if fileid in scanned
+                ])
+                for population in strata.values()
+            ], confidence)
+
+            estimates[name] = int(round(total))
+            intervals[name] = (max(0, int(round(low))), int(round(high)))
+
+        n_fileids = len(fileids)
+        vocab = len(tokens)
+
+        return {
+            'files':  n_fileids,
+            'topics': len(self.categories(fileids)),
+            'paras':  estimates['paras'],
+            'sents':  estimates['sents'],
+            'words':  estimates['words'],
+            'vocab':  vocab,
+            'lexdiv': _ratio(estimates['words'], vocab),
+            'ppdoc':  _ratio(estimates['paras'], n_fileids),
+            'sppar':  _ratio(estimates['sents'], estimates['paras']),
+            'secs':   time.time() - started,
+            'common': tokens.most_common(10),
+            'sampled': len(sampled),
+            'confidence': confidence,
+            'intervals': intervals,
+        }
+
+    def describes(self, fileids=None, categories=None, workers=1, **kwargs):
+        """
+        Returns a string representation of the describe command. Additional
+        keyword arguments (approximate, sample, etc.) are passed to describe.
+        """
+        stats = self.describe(fileids, categories, workers, **kwargs)
+        output = (
             "Baleen corpus contains {files} files in {topics} categories.\n"
             "Structured as:\n"
             "    {paras} paragraphs ({ppdoc:0.3f} mean paragraphs per file)\n"
@@ -265,7 +864,35 @@ class BaleenCorpusReader(CategorizedCorpusReader, CorpusReader):
             "Word count of {words} with a vocabulary of {vocab} "
             "({lexdiv:0.3f} lexical diversity).\n"
             "Corpus scan took {secs:0.3f} seconds."
-        ).format(**self.describe(fileids, categories))
+        ).format(**stats)
+
+        if 'sampled' in stats:
+            output += (
+                "\nEstimated from a stratified sample of {} files with {:0.0f}% "
+                "confidence intervals:\n"
+            ).format(stats['sampled'], stats['confidence'] * 100)
+            output += "\n".join(
+                "    {}: {} to {}".format(name, *stats['intervals'][name])
+                for name in ('paras', 'sents', 'words')
+            )
+
+        if 'rejected' in stats:
+            output += "\nSkipped {} files not identified as '{}'".format(
+                sum(stats['rejected'].values()), stats['language']
+            )
+            if stats['rejected']:
+                output += ":\n    " + ", ".join(
+                    "{} ({})".format(category, count)
+                    for category, count in sorted(stats['rejected'].items(), key=str)
+                )
+
+        if 'common' in stats:
+            output += "\nApproximate vocabulary; most common tokens:\n    "
+            output += ", ".join(
+                "{} ({})".format(token, count) for token, count in stats['common']
+            )
+
+        return output
 
 
 ##########################################################################
@@ -280,34 +907,74 @@ class BaleenPickledCorpusReader(BaleenCorpusReader):
     should be much faster reading and parsing data from disk.
     """
 
-    def __init__(self, root, fileids=PKL_PATTERN, **kwargs):
+    def __init__(self, root, fileids=PKL_PATTERN, manifest=True, **kwargs):
         """
         Initialize the corpus reader.  Categorization arguments
         (``cat_pattern``, ``cat_map``, and ``cat_file``) are passed to
         the ``CategorizedCorpusReader`` constructor.  The remaining arguments
         are passed to the ``CorpusReader`` constructor.
+
+        If the root contains a sharded store written by the
+        ``ShardedPreprocessor`` then the fileids are read from its index.
         """
         # Add the default category pattern if not passed into the class.
         if not any(key.startswith('cat_') for key in kwargs.keys()):
             kwargs['cat_pattern'] = CAT_PATTERN
 
+        # Use the index of the sharded store if one exists in the root.
+        self._shards = None
+        if ShardReader.exists(getattr(root, 'path', root)):
+            self._shards = ShardReader(getattr(root, 'path', root))
+            fileids = self._shards.fileids()
+
+        fileids = self._init_manifest(root, fileids, manifest, kwargs)
         CategorizedCorpusReader.__init__(self, kwargs)
         CorpusReader.__init__(self, root, fileids)
 
+        # Preprocessed corpora have no raw HTML to cache or JSON to catalog
+        self._cache = None
+        self._catalog = None
+
     def docs(self, fileids=None, categories=None):
         """
         Returns the document loaded from a pickled object for every file in
         the corpus. Similar to the BaleenCorpusReader, this uses a generator
-        to acheive memory safe iteration.
+        to acheive memory safe iteration. Documents in a sharded store are
+        yielded in the order they are stored rather than by fileid.
         """
         # Resolve the fileids and the categories
         fileids = self._resolve(fileids, categories)
 
+        # Stream documents from the segments of a sharded store.
+        if self._shards is not None:
+            for doc in self._shards.documents(fileids):
+                yield doc
+            return
+
         # Create a generator, loading one document into memory at a time.
         for path, enc, fileid in self.abspaths(fileids, True, True):
             with open(path, 'rb') as f:
                 yield pickle.load(f)
 
+    def sizes(self, fileids=None, categories=None):
+        """
+        Returns the size on disk of each pickled document, which for a
+        sharded store is the length of the document in its segment.
+        """
+        if self._shards is None:
+            for size in super(BaleenPickledCorpusReader, self).sizes(fileids, categories):
+                yield size
+            return
+
+        fileids = self._resolve(fileids, categories)
+        if fileids is None:
+            fileids = self._fileids
+        elif isinstance(fileids, string_types):
+            fileids = [fileids]
+
+        for fileid in fileids:
+            yield self._shards.size(fileid)
+
     def fields(self, fields, fileids=None, categories=None):
         """
         The preprocessed pickles do not contain raw JSON to extract fields.
@@ -324,6 +991,14 @@ class BaleenPickledCorpusReader(BaleenCorpusReader):
             "Preprocessed corpus does not contain HTML data."
         )
 
+    def select(self, feed=None, start=None, end=None, categories=None, title=None):
+        """
+        The metadata catalog is built from the raw JSON documents.
+        """
+        raise TypeError(
+            "Preprocessed corpus does not have a metadata catalog."
+        )
+
     def paras(self, fileids=None, categories=None):
         """
         Returns a generator of paragraphs where each paragraph is a list of
@@ -350,42 +1025,151 @@ class BaleenPickledCorpusReader(BaleenCorpusReader):
             for token in sentence:
                 yield token
 
-    def describe(self, fileids=None, categories=None):
+    def partial_describe(self, fileids=None, categories=None, approximate=False,
+                         vocab=None, language=None):
         """
-        Performs a single pass of the corpus and returns a dictionary with a
-        variety of metrics concerning the state of the corpus.
+        Performs a single pass over the specified documents and returns the
+        partial counts and vocabulary from the already tagged tokens.
         """
+        if language is not None:
+            raise TypeError(
+                "Preprocessed corpus is already tagged; filter languages when preprocessing."
+            )
+
         # Structures to perform counting.
         counts  = nltk.FreqDist()
-        tokens  = nltk.FreqDist()
-        started = time.time()
+        tokens  = vocab
+        if tokens is None:
+            tokens = VocabularySketch() if approximate else nltk.FreqDist()
 
-        # Perform single pass over paragraphs, tokenize and count
+        # Perform single pass over paragraphs and count in batches
+        batch = []
         for para in self.paras(fileids, categories):
             counts['paras'] += 1
 
             for sent in para:
                 counts['sents'] += 1
+                counts['words'] += len(sent)
+                batch.extend(word for word, tag in sent)
+
+            if len(batch) >= BATCH_SIZE:
+                tokens.update(batch)
+                batch = []
+
+        tokens.update(batch)
+        return counts, tokens
+
+
+##########################################################################
+## BaleenColumnarCorpusReader
+##########################################################################
+
+class BaleenColumnarCorpusReader(BaleenPickledCorpusReader):
+    """
+    A corpus reader for the memory-mapped columnar store created by the
+    `ColumnarPreprocessor`. The reader yields the same nested lists of
+    (token, tag) tuples as the pickled reader, but also provides zero-copy
+    access to the underlying integer arrays so that counting can be done
+    with vectorized operations rather than by unpickling every document.
+    """
 
-                for word, tag in sent:
-                    counts['words'] += 1
-                    tokens[word] += 1
+    def __init__(self, root, **kwargs):
+        """
+        Initialize the corpus reader.  Categorization arguments
+        (``cat_pattern``, ``cat_map``, and ``cat_file``) are passed to
+        the ``CategorizedCorpusReader`` constructor.  The fileids are read
+        from the metadata of the columnar store.
+        """
+        # Add the default category pattern if not passed into the class.
+        if not any(key.startswith('cat_') for key in kwargs.keys()):
+            kwargs['cat_pattern'] = CAT_PATTERN
+
+        self._shards = None
+        self._manifest = None
+        self._cache = None
+        self._catalog = None
+        self._columns = ColumnarReader(getattr(root, 'path', root))
+
+        CategorizedCorpusReader.__init__(self, kwargs)
+        CorpusReader.__init__(self, root, self._columns.fileids())
+
+    @property
+    def columns(self):
+        """
+        The ``ColumnarReader`` with the memory-mapped arrays of the corpus.
+        """
+        return self._columns
+
+    def _fileids_list(self, fileids, categories):
+        """
+        Resolves the fileids and categories into a list of fileids.
+        """
+        fileids = self._resolve(fileids, categories)
+        if fileids is None:
+            return self._fileids
+        if isinstance(fileids, string_types):
+            return [fileids]
+        return fileids
+
+    def docs(self, fileids=None, categories=None):
+        """
+        Decodes the documents from the columnar store into lists of
+        paragraphs of sentences of (token, tag) tuples.
+        """
+        fileids = self._fileids_list(fileids, categories)
+        for doc in self._columns.documents(fileids):
+            yield doc
+
+    def arrays(self, fileids=None, categories=None):
+        """
+        Returns a generator of zero-copy (tokens, tags, sents, paras) arrays
+        for every document. Use ``columns.vocab`` and ``columns.tagset`` to
+        decode the token and tag ids.
+        """
+        for fileid in self._fileids_list(fileids, categories):
+            yield self._columns.arrays(fileid)
+
+    def sizes(self, fileids=None, categories=None):
+        """
+        Returns the number of bytes each document occupies in the columns.
+        """
+        for fileid in self._fileids_list(fileids, categories):
+            (p0, p1), (s0, s1), (t0, t1) = self._columns.spans(fileid)
+            yield 8 + 8 * (p1 - p0) + 8 * (s1 - s0) + 5 * (t1 - t0)
+
+    def describe(self, fileids=None, categories=None, workers=1, **kwargs):
+        """
+        Computes the same metrics as the pickled reader, but counts from the
+        offset columns and computes the vocabulary with a bincount over the
+        token ids rather than by decoding every document. Since the counts
+        are vectorized and exact, the workers argument and the approximation
+        arguments (approximate, sample, etc.) are accepted but not used.
+        """
+        started = time.time()
+
+        # Compute the counts and the vocabulary from the columns
+        resolved = self._resolve(fileids, categories)
+        if isinstance(resolved, string_types):
+            resolved = [resolved]
+
+        paras, sents, words = self._columns.counts(resolved)
+        vocab = int((self._columns.frequencies(resolved) > 0).sum())
 
         # Compute the number of files and categories in the corpus
-        n_fileids = len(self._resolve(fileids, categories) or self.fileids())
-        n_topics  = len(self.categories(self._resolve(fileids, categories)))
+        n_fileids = len(self.fileids() if resolved is None else resolved)
+        n_topics  = len(self.categories(resolved))
 
         # Return data structure with information
         return {
             'files':  n_fileids,
             'topics': n_topics,
-            'paras':  counts['paras'],
-            'sents':  counts['sents'],
-            'words':  counts['words'],
-            'vocab':  len(tokens),
-            'lexdiv': float(counts['words']) / float(len(tokens)),
-            'ppdoc':  float(counts['paras']) / float(n_fileids),
-            'sppar':  float(counts['sents']) / float(counts['paras']),
+            'paras':  paras,
+            'sents':  sents,
+            'words':  words,
+            'vocab':  vocab,
+            'lexdiv': _ratio(words, vocab),
+            'ppdoc':  _ratio(paras, n_fileids),
+            'sppar':  _ratio(sents, paras),
             'secs':   time.time() - started,
         }
 
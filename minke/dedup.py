@@ -0,0 +1,278 @@
+# minke.dedup
+# Detects exact and near duplicate documents in the corpus.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: dedup.py [] benjamin@bengfort.com $
+
+"""
+Detects exact and near duplicate documents in the corpus.
+
+The Baleen export contains the same article under several feeds as well as
+slightly edited re-posts of it. Exact duplicates are found by the stable
+hash of the normalized text of their paragraphs. Near duplicates are found
+with MinHash and locality sensitive hashing: every document is reduced to
+the set of word shingles of its paragraphs (shingles do not cross paragraph
+boundaries), the MinHash signature of the set estimates the Jaccard
+similarity between documents, and the signature is cut into bands whose
+hashes collide for similar documents. Documents that collide in a band are
+compared by their signatures and clustered if their estimated similarity is
+above the threshold; each document in a band bucket is only compared to the
+first document of the bucket, so the work is linear in the corpus.
+
+Only the exact hash and band hashes of every document (8 bytes each) are
+held in memory; the signatures are written to a temporary memory mapped
+file and read back for the comparisons, so about 136 bytes per document are
+needed with the default 16 bands, or 45 MB for 331k documents. Paragraphs are
+extracted from the raw HTML (without readability) so the pass is cheap.
+
+The clusters are returned as a map of every duplicate to the representative
+of its cluster (the first of its documents in fileid order), keyed by fileid
+without the extension so that the map applies to both the raw and the
+preprocessed corpus. The map is saved as JSON in the preprocessed target.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import json
+import tempfile
+import numpy as np
+
+from collections import defaultdict
+from minke.boilerplate import BoilerplateFilter
+from minke.utils.sketches import stable_hash, stable_hashes
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+DUPLICATES = ".duplicates.json"
+MERSENNE   = np.uint64((1 << 61) - 1)
+MAX_HASH   = np.uint64((1 << 32) - 1)
+
+
+def stem(fileid):
+    """
+    Returns the fileid without its extension.
+    """
+    return os.path.splitext(fileid)[0]
+
+
+##########################################################################
+## Deduplicator
+##########################################################################
+
+class Deduplicator(object):
+    """
+    Clusters the exact and near duplicate documents of a corpus with fit,
+    then selects one representative of every cluster from a list of fileids
+    with representatives. The threshold is the minimum estimated Jaccard
+    similarity of the shingles of near duplicates; the permutations of the
+    signature must be divisible by the number of bands.
+    """
+
+    def __init__(self, threshold=0.8, shingle=5, permutations=128, bands=16, seed=42):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("Duplicate threshold must be between 0 and 1")
+
+        if permutations % bands:
+            raise ValueError("MinHash permutations must be divisible by the bands")
+
+        self.threshold = threshold
+        self.shingle = shingle
+        self.permutations = permutations
+        self.bands = bands
+
+        # The universal hash functions that simulate the permutations
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 1 << 31, size=permutations).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=permutations).astype(np.uint64)
+
+        # Every duplicate (by fileid stem) mapped to its representative
+        self.duplicates = {}
+        self.exact = 0
+        self.near = 0
+
+    def shingles(self, paragraphs):
+        """
+        Returns the set of word shingles of the paragraphs; paragraphs shorter
+        than a shingle are a single shingle.
+        """
+        shingles = set()
+        for paragraph in paragraphs:
+            words = BoilerplateFilter.normalize(paragraph).split()
+            span = max(1, len(words) - self.shingle + 1)
+            for idx in range(span):
+                shingles.add(u" ".join(words[idx:idx+self.shingle]))
+        shingles.discard(u"")
+        return shingles
+
+    def signature(self, shingles):
+        """
+        Returns the MinHash signature of the set of shingles as an array of
+        unsigned 32-bit integers, the minimum of every permutation.
+        """
+        hashes = (stable_hashes(list(shingles)) & MAX_HASH)[:, None]
+        permuted = ((hashes * self.a + self.b) % MERSENNE) & MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def fit(self, corpus, fileids=None, categories=None):
+        """
+        Clusters the duplicate documents of the fileids of the corpus. If the
+        corpus has a boilerplate filter it is applied to the paragraphs first
+        so that documents are not similar because of their shared boilerplate.
+        """
+        fileids = corpus._resolve(fileids, categories) or corpus.fileids()
+        fileids = sorted(fileids)
+        n_docs = len(fileids)
+        rows = self.permutations // self.bands
+
+        # Documents without text are neither hashed nor clustered
+        hashes = np.zeros(n_docs, dtype=np.uint64)
+        bands = np.zeros((n_docs, self.bands), dtype=np.uint64)
+        empty = np.zeros(n_docs, dtype=bool)
+
+        with tempfile.TemporaryFile() as f:
+            signatures = np.memmap(
+                f, dtype=np.uint32, mode='w+', shape=(max(1, n_docs), self.permutations)
+            )
+
+            docs = corpus.feed_paras(fileids, readability=False)
+            for idx, (feed, paragraphs) in enumerate(docs):
+                if corpus.boilerplate is not None:
+                    paragraphs = corpus.boilerplate.filter(feed, paragraphs)
+
+                shingles = self.shingles(paragraphs)
+                if not shingles:
+                    empty[idx] = True
+                    continue
+
+                hashes[idx] = stable_hash(u"\n".join(
+                    BoilerplateFilter.normalize(paragraph) for paragraph in paragraphs
+                ))
+
+                signatures[idx] = self.signature(shingles)
+                for band in range(self.bands):
+                    bands[idx, band] = stable_hash(
+                        signatures[idx, band*rows:(band+1)*rows].tobytes()
+                    )
+
+            self.cluster(fileids, hashes, bands, signatures, empty)
+            del signatures
+
+        return self
+
+    def cluster(self, fileids, hashes, bands, signatures, empty):
+        """
+        Unions documents with the same exact hash and then documents that
+        collide in a band and whose signatures are similar, mapping every
+        duplicate to the first document of its cluster.
+        """
+        parent = np.arange(len(fileids), dtype=np.int64)
+
+        def find(idx):
+            while parent[idx] != idx:
+                parent[idx] = parent[parent[idx]]
+                idx = parent[idx]
+            return idx
+
+        def union(idx, jdx):
+            idx, jdx = find(idx), find(jdx)
+            if idx == jdx:
+                return False
+            parent[max(idx, jdx)] = min(idx, jdx)
+            return True
+
+        def buckets(keys):
+            """
+            Yields the arrays of indices of the documents with the same key.
+            """
+            members = np.flatnonzero(~empty)
+            order = members[np.argsort(keys[members], kind='mergesort')]
+            bounds = np.flatnonzero(np.diff(keys[order])) + 1
+            for bucket in np.split(order, bounds):
+                if len(bucket) > 1:
+                    yield bucket
+
+        self.exact = 0
+        for bucket in buckets(hashes):
+            for idx in bucket[1:]:
+                self.exact += union(bucket[0], idx)
+
+        self.near = 0
+        for band in range(self.bands):
+            for bucket in buckets(bands[:, band]):
+                first = np.asarray(signatures[bucket[0]])
+                for idx in bucket[1:]:
+                    if find(bucket[0]) == find(idx):
+                        continue
+
+                    similarity = np.mean(first == signatures[idx])
+                    if similarity >= self.threshold:
+                        self.near += union(bucket[0], idx)
+
+        self.duplicates = {
+            stem(fileid): stem(fileids[find(idx)])
+            for idx, fileid in enumerate(fileids) if find(idx) != idx
+        }
+
+    def representative(self, fileid):
+        """
+        Returns the stem of the representative of the cluster of the fileid.
+        """
+        return self.duplicates.get(stem(fileid), stem(fileid))
+
+    def representatives(self, fileids):
+        """
+        Returns the fileids that are not duplicates of another document.
+        """
+        return [
+            fileid for fileid in fileids if stem(fileid) not in self.duplicates
+        ]
+
+    def clusters(self):
+        """
+        Returns a dictionary of the stem of every representative to the list
+        of the stems of its duplicates.
+        """
+        clusters = defaultdict(list)
+        for duplicate, representative in sorted(self.duplicates.items()):
+            clusters[representative].append(duplicate)
+        return dict(clusters)
+
+    def save(self, path):
+        """
+        Writes the duplicate map and the parameters to a JSON file.
+        """
+        with open(path, 'w') as f:
+            json.dump({
+                'threshold': self.threshold,
+                'shingle': self.shingle,
+                'permutations': self.permutations,
+                'bands': self.bands,
+                'exact': self.exact,
+                'near': self.near,
+                'duplicates': self.duplicates,
+            }, f, indent=2, sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a duplicate map saved to a JSON file.
+        """
+        with open(path, 'r') as f:
+            data = json.load(f)
+
+        dedup = cls(data['threshold'], data['shingle'], data['permutations'], data['bands'])
+        dedup.duplicates = data['duplicates']
+        dedup.exact = data['exact']
+        dedup.near = data['near']
+        return dedup
+
+    def __len__(self):
+        return len(self.duplicates)
@@ -0,0 +1,181 @@
+# minke.estimate
+# Estimates the cost of preprocessing a corpus from a sample of documents.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: estimate.py [] benjamin@bengfort.com $
+
+"""
+Estimates the cost of preprocessing a corpus from a sample of documents.
+
+Before a full run of ``sei preprocess`` a stratified random sample of the
+documents of each category is processed (without writing anything to the
+target), measuring the CPU time of each stage of preprocessing and the size
+of the pickled output. Since the cost of every stage grows with the size of
+the document, the measurements are turned into per byte rates for each
+category and extrapolated with the total size on disk of the category. The
+total CPU time is divided between the tasks of a parallel run, assuming it
+scales linearly, which is optimistic for small corpora.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import math
+import nltk
+import pickle
+import random
+
+from collections import OrderedDict
+from minke.utils.timer import Timer
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# The stages of preprocessing a document that are timed
+PARSE    = "parse"
+TOKENIZE = "tokenize"
+TAG      = "tag"
+WRITE    = "write"
+STAGES   = (PARSE, TOKENIZE, TAG, WRITE)
+
+
+##########################################################################
+## Measurements
+##########################################################################
+
+def measure(preprocessor, fileid):
+    """
+    Preprocesses the document with the models of the preprocessor, returning
+    the CPU seconds spent on each stage and the size in bytes of the pickled
+    document. Batch tagging is always measured since it is the default.
+    """
+    preprocessor.load()
+    timings = OrderedDict()
+
+    with Timer(wall_clock=False) as timer:
+        paragraphs = list(preprocessor.corpus.paras(fileids=fileid))
+    timings[PARSE] = timer.elapsed
+
+    with Timer(wall_clock=False) as timer:
+        paragraphs = [
+            [
+                nltk.wordpunct_tokenize(sent)
+                for sent in preprocessor.sent_tokenizer.tokenize(paragraph)
+            ]
+            for paragraph in paragraphs
+        ]
+    timings[TOKENIZE] = timer.elapsed
+
+    with Timer(wall_clock=False) as timer:
+        tagged = iter(preprocessor.tagger.tag_sents(
+            sent for paragraph in paragraphs for sent in paragraph
+        ))
+        document = [[next(tagged) for _ in paragraph] for paragraph in paragraphs]
+    timings[TAG] = timer.elapsed
+
+    with Timer(wall_clock=False) as timer:
+        output = pickle.dumps(document, pickle.HIGHEST_PROTOCOL)
+    timings[WRITE] = timer.elapsed
+
+    return timings, len(output)
+
+
+def sample(corpus, fileids, fraction, seed=None):
+    """
+    Groups the fileids into strata by their first category and draws a
+    random sample of the fraction of each stratum (at least one document).
+    Returns a dictionary of the fileids of each stratum and the sample.
+    """
+    if not 0.0 < fraction <= 1.0:
+        raise ValueError("Sample must be a fraction between 0 and 1")
+
+    strata = OrderedDict()
+    for fileid in fileids:
+        cats = corpus.categories([fileid])
+        strata.setdefault(cats[0] if cats else None, []).append(fileid)
+
+    rng = random.Random(seed)
+    sampled = []
+    for key in sorted(strata, key=str):
+        population = strata[key]
+        n_sample = min(len(population), max(1, int(math.ceil(fraction * len(population)))))
+        sampled.extend(rng.sample(population, n_sample))
+
+    return strata, sampled
+
+
+def estimate(preprocessor, fileids=None, categories=None, fraction=0.01,
+             tasks=1, seed=None):
+    """
+    Estimates the CPU time of each stage, the runtime with the given number
+    of tasks and the size of the target of preprocessing the fileids, from a
+    stratified sample of the fraction of the documents of every category.
+    Documents that fail to process are counted but not measured.
+    """
+    corpus  = preprocessor.corpus
+    fileids = preprocessor.fileids(fileids, categories)
+    sizes   = dict(zip(fileids, corpus.sizes(fileids=fileids)))
+    strata, sampled = sample(corpus, fileids, fraction, seed)
+
+    # Measure the sampled documents, keyed by fileid
+    measured, errors = {}, 0
+    for fileid in sampled:
+        try:
+            measured[fileid] = measure(preprocessor, fileid)
+        except Exception:
+            errors += 1
+
+    def rates(population):
+        """
+        Returns the per byte CPU time of each stage and the output ratio.
+        """
+        population = [fileid for fileid in population if fileid in measured]
+        nbytes = float(sum(sizes[fileid] for fileid in population))
+        if not nbytes:
+            return None
+
+        per_byte = OrderedDict(
+            (stage, sum(measured[fileid][0][stage] for fileid in population) / nbytes)
+            for stage in STAGES
+        )
+        ratio = sum(measured[fileid][1] for fileid in population) / nbytes
+        return per_byte, ratio
+
+    # Extrapolate the rates of each category by its total size, falling back
+    # to the rates of the whole sample for categories without measurements.
+    overall = rates(sampled)
+    seconds = OrderedDict((stage, 0.0) for stage in STAGES)
+    target = 0.0
+
+    for population in strata.values():
+        stratum = rates(population) or overall
+        if stratum is None:
+            continue
+
+        per_byte, ratio = stratum
+        nbytes = sum(sizes[fileid] for fileid in population)
+        for stage in STAGES:
+            seconds[stage] += per_byte[stage] * nbytes
+        target += ratio * nbytes
+
+    total = sum(sizes.values())
+    cpu = sum(seconds.values())
+
+    return {
+        'files': len(fileids),
+        'bytes': total,
+        'sampled': len(measured),
+        'errors': errors,
+        'per_byte': overall[0] if overall else OrderedDict((stage, 0.0) for stage in STAGES),
+        'stages': seconds,
+        'cpu': cpu,
+        'tasks': tasks,
+        'runtime': cpu / max(1, tasks),
+        'ratio': overall[1] if overall else 0.0,
+        'target_size': int(round(target)),
+    }
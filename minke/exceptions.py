@@ -31,6 +31,21 @@ class NotifyError(MinkeError):
     pass
 
 
+class QuarantineError(MinkeError):
+    """
+    A document exceeded a preprocessing budget or could not be processed
+    and was quarantined.
+    """
+    pass
+
+
+class DocumentTimeout(MinkeError):
+    """
+    Processing a document took longer than the time limit.
+    """
+    pass
+
+
 ##########################################################################
 ## Warning Hierarchy
 ##########################################################################
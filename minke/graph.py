@@ -29,12 +29,20 @@ from minke.keyphrase import TFIDFScorer
 
 
 
-def graph(corpus, lookup, categories=None, verbose=True):
+def graph(corpus, lookup, categories=None, verbose=True, duplicates=None):
     """
     Returns a TF-IDF Graph of key terms to documents to feeds to categories.
     Temporarily this loads two corpora one that's already parsed and one that
     is used to lookup the requried JSON data from the corpus.
+
+    If a ``Deduplicator`` is given only the representative of every cluster
+    of duplicates is added, with the number of its duplicates as an attribute.
     """
+    # Select the documents, one per cluster of duplicates
+    fileids = corpus.fileids(categories=categories)
+    if duplicates is not None:
+        fileids = duplicates.representatives(fileids)
+        clusters = duplicates.clusters()
 
     G = nx.Graph(name="Baleen Keyphrase Graph")
 
@@ -47,7 +55,11 @@ def graph(corpus, lookup, categories=None, verbose=True):
     if verbose: print("Creating category, feed, and document nodes")
     G.add_nodes_from(corpus.categories(), type='category')
     G.add_nodes_from([feed['title'] for feed in feeds.values()], type='feed')
-    G.add_nodes_from(corpus.fileids(), type='document')
+    G.add_nodes_from(
+        corpus.fileids() if duplicates is None
+        else duplicates.representatives(corpus.fileids()),
+        type='document'
+    )
 
     # Create feed-category edges
     if verbose: print("Creating feed-category edges")
@@ -59,32 +71,39 @@ def graph(corpus, lookup, categories=None, verbose=True):
     if verbose: print("Creating document-category edges")
     G.add_edges_from([
         (fileid, corpus.categories(fileids=fileid)[0])
-        for fileid in corpus.fileids(categories=categories)
+        for fileid in fileids
     ])
 
     # Add document attributes from lookup and document-feed edges
     if verbose: print("Adding document attributes from lookup")
-    for fileid in corpus.fileids(categories=categories):
+    for fileid in fileids:
 
         # Figure out the lookup file extension
         rawid, ext = os.path.splitext(fileid)
         rawid += ".json"
 
-        # Load the document from the lookup
-        doc = lookup.docs(fileids=rawid).next()
+        # Load only the required fields of the document from the lookup
+        doc = next(lookup.fields(
+            ['title', 'pubdate.$date', 'feed.$oid'], fileids=rawid
+        ))
 
         # Set the node attributes
         G.node[fileid]['title'] = doc['title']
-        G.node[fileid]['pubdate'] = doc.get('pubdate', {}).get('$date', 0)
+        G.node[fileid]['pubdate'] = doc['pubdate.$date'] or 0
+
+        if duplicates is not None:
+            G.node[fileid]['duplicates'] = len(
+                clusters.get(os.path.splitext(fileid)[0], [])
+            )
 
         # Create the document-feed edge
-        G.add_edge(fileid, feeds[doc['feed']['$oid']]['title'])
+        G.add_edge(fileid, feeds[doc['feed.$oid']]['title'])
 
 
     # Perform the keyphrase extractions using TF-IDF Scores
     if verbose: print("Performing keyphrase extraction and scoring")
     phrases = TFIDFScorer(corpus)
-    phrases.score(categories=categories)
+    phrases.score(categories=categories, duplicates=duplicates)
 
     # Add the keyphrase-document edges
     if verbose: print("Adding keyphrase-document edges weighted by TF-IDF")
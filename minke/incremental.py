@@ -0,0 +1,209 @@
+# minke.incremental
+# A manifest of the preprocessed outputs for incremental preprocessing.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: incremental.py [] benjamin@bengfort.com $
+
+"""
+A manifest of the preprocessed outputs for incremental preprocessing.
+
+The existence of an output file says nothing about whether it is up to date:
+the source document may have been edited since, the output may have been
+written by an older version of the preprocessor or with different models.
+The output manifest records, for every document written to the target, the
+hash of the content of its source along with the version and settings of the
+preprocessor that wrote it, in a SQLite database in the root of the target.
+An incremental run then only processes documents that are new or changed.
+
+The size and modification time of the source are recorded as well so that
+unchanged documents are not read and hashed again on every run; a source is
+only hashed when its stat differs from what was recorded.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+OUTPUTS = ".outputs.sqlite"
+CHUNK   = 1048576 # Number of bytes read at a time when hashing sources
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS outputs ("
+    "  fileid TEXT PRIMARY KEY,"
+    "  output TEXT NOT NULL,"
+    "  hash TEXT NOT NULL,"
+    "  size INTEGER NOT NULL,"
+    "  mtime REAL NOT NULL,"
+    "  version TEXT NOT NULL,"
+    "  settings TEXT NOT NULL,"
+    "  written REAL NOT NULL"
+    ")",
+)
+
+
+##########################################################################
+## Helper Functions
+##########################################################################
+
+def content_hash(path):
+    """
+    Returns the sha1 hex digest of the contents of the file at path.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+##########################################################################
+## Output Manifest
+##########################################################################
+
+class OutputManifest(object):
+    """
+    A SQLite database of the source hash, preprocessor version and settings
+    of every output in a preprocessed target, keyed by source fileid. The
+    connection is opened lazily in each process, so the manifest can be
+    used by the workers of a parallel preprocessor; SQLite serializes the
+    writes of concurrent processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self._conn = None
+        self._pid  = None
+
+    @property
+    def conn(self):
+        if self._conn is None or self._pid != os.getpid():
+            if not os.path.exists(self.root):
+                os.makedirs(self.root)
+
+            self._conn = sqlite3.connect(self.path, timeout=60)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def settings(settings):
+        """
+        Serializes the preprocessor settings so that they can be compared.
+        """
+        return json.dumps(settings, sort_keys=True)
+
+    def fresh(self, fileid, source, output, version, settings):
+        """
+        Returns True if the output of the fileid exists and was written from
+        the current content of the source path by the same version and
+        settings of the preprocessor, in which case it need not be processed.
+        """
+        row = self.conn.execute(
+            "SELECT output, hash, size, mtime, version, settings "
+            "FROM outputs WHERE fileid=?", (fileid,)
+        ).fetchone()
+
+        if row is None or not os.path.exists(output):
+            return False
+
+        recorded, digest, size, mtime, rversion, rsettings = row
+        if recorded != self._relpath(output) or rversion != version:
+            return False
+
+        if rsettings != self.settings(settings):
+            return False
+
+        stat = os.stat(source)
+        if (stat.st_size, stat.st_mtime) == (size, mtime):
+            return True
+
+        # The source was touched, but only a change of content is stale
+        if content_hash(source) != digest:
+            return False
+
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outputs SET size=?, mtime=? WHERE fileid=?",
+                (stat.st_size, stat.st_mtime, fileid)
+            )
+        return True
+
+    def record(self, fileid, source, output, version, settings):
+        """
+        Records that the output of the fileid was written from the current
+        content of the source path with the version and settings.
+        """
+        stat = os.stat(source)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    fileid, self._relpath(output), content_hash(source), stat.st_size,
+                    stat.st_mtime, version, self.settings(settings), time.time(),
+                )
+            )
+
+    def merge(self, path):
+        """
+        Merges the records of the output manifest at path (e.g. written by
+        another shard of the job) into this one, keeping the most recently
+        written record of every fileid. Returns the number of records merged.
+        """
+        with self.conn:
+            self.conn.execute("ATTACH DATABASE ? AS other", (path,))
+            try:
+                cursor = self.conn.execute(
+                    "INSERT OR REPLACE INTO outputs SELECT * FROM other.outputs o "
+                    "WHERE NOT EXISTS (SELECT 1 FROM outputs WHERE "
+                    "fileid=o.fileid AND written > o.written)"
+                )
+                merged = cursor.rowcount
+            finally:
+                self.conn.commit()
+                self.conn.execute("DETACH DATABASE other")
+        return merged
+
+    def _relpath(self, output):
+        """
+        Outputs are recorded relative to the target so it can be moved.
+        """
+        return os.path.relpath(output, self.root).replace(os.sep, '/')
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM outputs").fetchone()[0]
+
+    def __contains__(self, fileid):
+        return self.conn.execute(
+            "SELECT 1 FROM outputs WHERE fileid=?", (fileid,)
+        ).fetchone() is not None
+
+    def __getstate__(self):
+        """
+        Connections cannot be pickled; they are reopened in the new process.
+        """
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid']  = None
+        return state
@@ -0,0 +1,196 @@
+# minke.journal
+# An append-only journal of the documents processed by a preprocessing job.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: journal.py [] benjamin@bengfort.com $
+
+"""
+An append-only journal of the documents processed by a preprocessing job.
+
+The journal is a log of JSON records, one per line, in the target directory.
+Every run of the job appends a start record, then a record as each document
+is dispatched, completed or failed, and a finish record with the throughput
+of the run. Records are flushed as they are written, so if the job is killed
+the journal still records which documents were completed, which failed and
+which were in flight. Replaying the journal recovers that state so that a
+resumed run skips the completed documents and retries everything else.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import json
+import time
+import threading
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+JOURNAL = ".journal.log"
+
+# Journal record events
+START    = "start"
+DISPATCH = "dispatch"
+COMPLETE = "complete"
+FAIL     = "fail"
+FINISH   = "finish"
+
+
+##########################################################################
+## Job Journal
+##########################################################################
+
+class JobJournal(object):
+    """
+    Appends the records of a preprocessing job to the journal at path and
+    replays them to recover the state of the job. A run that is not resumed
+    starts the job over; a resumed run continues from the replayed state.
+    Writes are serialized with a lock since documents are dispatched from
+    the task feeder thread of the parallel preprocessors.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._handle = None
+        self._lock = threading.Lock()
+        self.replay()
+
+    def replay(self):
+        """
+        Reads the journal to recover the completed, failed, and in-flight
+        fileids of the job since it was last started without resuming. A
+        partially written last record (e.g. if the job was killed while
+        writing it) is ignored.
+        """
+        self.completed = set()
+        self.failed = {}
+        self.inflight = set()
+        self.runs = 0
+
+        if not os.path.exists(self.path):
+            return self
+
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+
+                event = record.get('event')
+                if event == START:
+                    if not record.get('resume'):
+                        self.completed, self.failed = set(), {}
+                        self.runs = 0
+                    self.inflight = set()
+                    self.runs += 1
+
+                elif event == DISPATCH:
+                    self.inflight.add(record['fileid'])
+
+                elif event == COMPLETE:
+                    self.inflight.discard(record['fileid'])
+                    self.failed.pop(record['fileid'], None)
+                    self.completed.add(record['fileid'])
+
+                elif event == FAIL:
+                    self.inflight.discard(record['fileid'])
+                    self.failed[record['fileid']] = record.get('error')
+
+        return self
+
+    def write(self, event, **fields):
+        """
+        Appends a record to the journal and flushes it to disk.
+        """
+        fields['event'] = event
+        fields['time'] = time.time()
+        line = json.dumps(fields) + "\n"
+
+        with self._lock:
+            if self._handle is None:
+                self._handle = open(self.path, 'a')
+
+                # Terminate a record cut off when the job was killed
+                if self._handle.tell() > 0:
+                    with open(self.path, 'rb') as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            self._handle.write("\n")
+
+            self._handle.write(line)
+            self._handle.flush()
+
+    def start(self, total, resume=False):
+        """
+        Starts a run of the job over total documents, continuing the replayed
+        state if resuming, otherwise starting the job over.
+        """
+        if not resume:
+            self.completed, self.failed = set(), {}
+            self.runs = 0
+
+        self.inflight = set()
+        self.runs += 1
+        self._started = time.time()
+        self._counts  = {COMPLETE: 0, FAIL: 0}
+        self.write(START, total=total, resume=resume, pid=os.getpid())
+
+    def dispatch(self, fileid):
+        self.inflight.add(fileid)
+        self.write(DISPATCH, fileid=fileid)
+
+    def complete(self, fileid):
+        self.inflight.discard(fileid)
+        self.failed.pop(fileid, None)
+        self.completed.add(fileid)
+        self._counts[COMPLETE] += 1
+        self.write(COMPLETE, fileid=fileid)
+
+    def fail(self, fileid, error=None):
+        self.inflight.discard(fileid)
+        self.failed[fileid] = error
+        self._counts[FAIL] += 1
+        self.write(FAIL, fileid=fileid, error=error)
+
+    def throughput(self):
+        """
+        Returns the documents completed per second in the current run.
+        """
+        elapsed = time.time() - self._started
+        return self._counts[COMPLETE] / elapsed if elapsed > 0 else 0.0
+
+    def finish(self):
+        """
+        Appends the counts and throughput of the run and closes the journal.
+        """
+        self.write(
+            FINISH, completed=self._counts[COMPLETE], failed=self._counts[FAIL],
+            elapsed=time.time() - self._started, throughput=self.throughput(),
+        )
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+            self._handle = None
+
+    def __getstate__(self):
+        """
+        The file handle and lock cannot be pickled; they are recreated.
+        """
+        state = self.__dict__.copy()
+        state['_handle'] = None
+        state.pop('_lock', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -147,12 +147,19 @@ class TFIDFScorer(Scorer):
         self.tfidfs  = None
         self.fileids = None
 
-    def score(self, fileids=None, categories=None, chunks=True):
+    def score(self, fileids=None, categories=None, chunks=True, duplicates=None):
         """
-        Fits the TF-IDF model and creates the lexicon and scores.
+        Fits the TF-IDF model and creates the lexicon and scores. If a
+        ``Deduplicator`` is given only the representative of every cluster of
+        duplicate documents is scored, so that duplicates do not lower the
+        inverse document frequency of their phrases.
         """
         # Resolve the fileids and the categories for doc specific selection.
         self.fileids = self.corpus._resolve(fileids, categories)
+        if duplicates is not None:
+            self.fileids = duplicates.representatives(
+                self.fileids or self.corpus.fileids()
+            )
 
         # Determine if we have a tagged corpus or not
         tagged = isinstance(self.corpus, BaleenPickledCorpusReader)
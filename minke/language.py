@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+# minke.language
+# A cheap offline language identifier using character n-gram profiles.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: language.py [] benjamin@bengfort.com $
+
+"""
+A cheap offline language identifier using character n-gram profiles.
+
+Part of the corpus is not English, but punkt's English model and the English
+perceptron tagger process it at full cost and produce garbage keyphrases.
+Documents are identified by the character trigrams of their cleaned
+paragraphs, before they are tokenized: the frequencies of the trigrams of
+the first few thousand characters are compared by cosine similarity with the
+trigram profiles of a handful of languages, built from the short samples
+below, and the most similar language is returned. Text in another script
+shares no trigrams with the profiles and is identified as unknown.
+
+Documents that are rejected are recorded in the language log in the target
+(one JSON record per line) with their category, so that rejections can be
+counted per category and the documents routed to other pipelines.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import re
+import json
+import time
+import numpy as np
+
+from collections import Counter
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+LANGUAGES = ".languages.log"
+UNKNOWN   = "unknown"
+NONLETTER = re.compile(r'[\W\d_]+', re.UNICODE)
+
+# The samples the language profiles are built from: the first articles of
+# the Universal Declaration of Human Rights and a short passage of prose.
+SAMPLES = {
+    'en': (
+        u"All human beings are born free and equal in dignity and rights. They "
+        u"are endowed with reason and conscience and should act towards one "
+        u"another in a spirit of brotherhood. Everyone is entitled to all the "
+        u"rights and freedoms set forth in this Declaration, without distinction "
+        u"of any kind, such as race, colour, sex, language, religion, political "
+        u"or other opinion, national or social origin, property, birth or other "
+        u"status. Everyone has the right to life, liberty and security of person. "
+        u"The city council said on Tuesday that the new library would open next "
+        u"year, and that the work on the roads which connect the northern "
+        u"neighborhoods of the city will be finished before the winter. The "
+        u"report shows what we have known for some time: people want their "
+        u"children to have a good school and a safe place to live."
+    ),
+    'es': (
+        u"Todos los seres humanos nacen libres e iguales en dignidad y derechos y, "
+        u"dotados como están de razón y conciencia, deben comportarse "
+        u"fraternalmente los unos con los otros. Toda persona tiene todos los "
+        u"derechos y libertades proclamados en esta Declaración, sin distinción "
+        u"alguna de raza, color, sexo, idioma, religión, opinión política o de "
+        u"cualquier otra índole, origen nacional o social, posición económica, "
+        u"nacimiento o cualquier otra condición. Todo individuo tiene derecho a "
+        u"la vida, a la libertad y a la seguridad de su persona. El ayuntamiento "
+        u"dijo el martes que la nueva biblioteca abrirá el próximo año y que las "
+        u"obras de las calles que conectan los barrios del norte de la ciudad "
+        u"terminarán antes del invierno."
+    ),
+    'fr': (
+        u"Tous les êtres humains naissent libres et égaux en dignité et en "
+        u"droits. Ils sont doués de raison et de conscience et doivent agir les "
+        u"uns envers les autres dans un esprit de fraternité. Chacun peut se "
+        u"prévaloir de tous les droits et de toutes les libertés proclamés dans "
+        u"la présente Déclaration, sans distinction aucune, notamment de race, de "
+        u"couleur, de sexe, de langue, de religion, d'opinion politique ou de "
+        u"toute autre opinion, d'origine nationale ou sociale, de fortune, de "
+        u"naissance ou de toute autre situation. Tout individu a droit à la vie, "
+        u"à la liberté et à la sûreté de sa personne. Le conseil municipal a "
+        u"annoncé mardi que la nouvelle bibliothèque ouvrira l'année prochaine et "
+        u"que les travaux des routes qui relient les quartiers du nord de la "
+        u"ville seront terminés avant l'hiver."
+    ),
+    'de': (
+        u"Alle Menschen sind frei und gleich an Würde und Rechten geboren. Sie "
+        u"sind mit Vernunft und Gewissen begabt und sollen einander im Geist der "
+        u"Brüderlichkeit begegnen. Jeder hat Anspruch auf alle in dieser "
+        u"Erklärung verkündeten Rechte und Freiheiten ohne irgendeinen "
+        u"Unterschied, etwa nach Rasse, Hautfarbe, Geschlecht, Sprache, Religion, "
+        u"politischer oder sonstiger Überzeugung, nationaler oder sozialer "
+        u"Herkunft, Vermögen, Geburt oder sonstigem Stand. Jeder hat das Recht "
+        u"auf Leben, Freiheit und Sicherheit der Person. Der Stadtrat teilte am "
+        u"Dienstag mit, dass die neue Bibliothek im nächsten Jahr eröffnet wird "
+        u"und die Arbeiten an den Straßen, die die nördlichen Viertel der Stadt "
+        u"verbinden, vor dem Winter abgeschlossen sein werden."
+    ),
+    'it': (
+        u"Tutti gli esseri umani nascono liberi ed eguali in dignità e diritti. "
+        u"Essi sono dotati di ragione e di coscienza e devono agire gli uni verso "
+        u"gli altri in spirito di fratellanza. Ad ogni individuo spettano tutti "
+        u"i diritti e tutte le libertà enunciate nella presente Dichiarazione, "
+        u"senza distinzione alcuna, per ragioni di razza, di colore, di sesso, di "
+        u"lingua, di religione, di opinione politica o di altro genere, di "
+        u"origine nazionale o sociale, di ricchezza, di nascita o di altra "
+        u"condizione. Ogni individuo ha diritto alla vita, alla libertà ed alla "
+        u"sicurezza della propria persona. Il consiglio comunale ha detto martedì "
+        u"che la nuova biblioteca aprirà il prossimo anno e che i lavori sulle "
+        u"strade che collegano i quartieri settentrionali della città saranno "
+        u"finiti prima dell'inverno."
+    ),
+    'pt': (
+        u"Todos os seres humanos nascem livres e iguais em dignidade e em "
+        u"direitos. Dotados de razão e de consciência, devem agir uns para com "
+        u"os outros em espírito de fraternidade. Todos os seres humanos podem "
+        u"invocar os direitos e as liberdades proclamados na presente "
+        u"Declaração, sem distinção alguma, nomeadamente de raça, de cor, de "
+        u"sexo, de língua, de religião, de opinião política ou outra, de origem "
+        u"nacional ou social, de fortuna, de nascimento ou de qualquer outra "
+        u"situação. Todo indivíduo tem direito à vida, à liberdade e à segurança "
+        u"pessoal. A câmara municipal disse na terça-feira que a nova biblioteca "
+        u"vai abrir no próximo ano e que as obras nas estradas que ligam os "
+        u"bairros do norte da cidade estarão concluídas antes do inverno."
+    ),
+    'nl': (
+        u"Alle mensen worden vrij en gelijk in waardigheid en rechten geboren. "
+        u"Zij zijn begiftigd met verstand en geweten, en behoren zich jegens "
+        u"elkander in een geest van broederschap te gedragen. Een ieder heeft "
+        u"aanspraak op alle rechten en vrijheden, in deze Verklaring opgesomd, "
+        u"zonder enig onderscheid van welke aard ook, zoals ras, kleur, geslacht, "
+        u"taal, godsdienst, politieke of andere overtuiging, nationale of "
+        u"maatschappelijke afkomst, eigendom, geboorte of andere status. Een "
+        u"ieder heeft het recht op leven, vrijheid en onschendbaarheid van zijn "
+        u"persoon. De gemeenteraad zei dinsdag dat de nieuwe bibliotheek volgend "
+        u"jaar opent en dat het werk aan de wegen die de noordelijke wijken van "
+        u"de stad verbinden voor de winter klaar zal zijn."
+    ),
+}
+
+
+##########################################################################
+## Language Identifier
+##########################################################################
+
+class LanguageIdentifier(object):
+    """
+    Identifies the language of text by the cosine similarity of the
+    frequencies of its character n-grams to those of the profile of every
+    language. Only the first max_chars characters of the text are used, and
+    text whose best similarity is below min_score is unknown. Text with fewer
+    than min_chars letters is too short to identify.
+    """
+
+    def __init__(self, samples=None, n=3, min_score=0.1, min_chars=64, max_chars=4096):
+        self.n = n
+        self.min_score = min_score
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+
+        # The normalized n-gram frequency profile of each language
+        samples = samples or SAMPLES
+        self.languages = sorted(samples)
+        profiles = [self.ngrams(samples[language]) for language in self.languages]
+
+        vocab = sorted(set(gram for profile in profiles for gram in profile))
+        self.index = dict((gram, idx) for idx, gram in enumerate(vocab))
+        self.profiles = np.zeros((len(self.languages), len(vocab)), dtype=np.float64)
+        for row, profile in enumerate(profiles):
+            for gram, count in profile.items():
+                self.profiles[row, self.index[gram]] = count
+
+        norms = np.linalg.norm(self.profiles, axis=1)[:, None]
+        self.profiles /= np.maximum(norms, 1.0)
+
+    def ngrams(self, text):
+        """
+        Counts the character n-grams of the words of the text, lowercased and
+        padded with spaces; digits and punctuation are ignored.
+        """
+        counts = Counter()
+        for word in NONLETTER.sub(u' ', text.lower()).split():
+            word = u" {} ".format(word)
+            for idx in range(max(1, len(word) - self.n + 1)):
+                counts[word[idx:idx+self.n]] += 1
+        return counts
+
+    def scores(self, text):
+        """
+        Returns the cosine similarity of the text to every language.
+        """
+        counts = self.ngrams(text[:self.max_chars])
+        vector = np.zeros(len(self.index), dtype=np.float64)
+        for gram, count in counts.items():
+            if gram in self.index:
+                vector[self.index[gram]] = count
+
+        # The norm includes the n-grams that are in none of the profiles
+        norm = np.sqrt(sum(count * count for count in counts.values()))
+        similarity = self.profiles.dot(vector) / max(norm, 1.0)
+        return dict(zip(self.languages, similarity.tolist()))
+
+    def identify(self, paragraphs):
+        """
+        Returns the language of the paragraphs and its score, or None if the
+        paragraphs are too short to identify.
+        """
+        text, size = [], 0
+        for paragraph in paragraphs:
+            text.append(paragraph)
+            size += len(paragraph)
+            if size >= self.max_chars:
+                break
+
+        text = u" ".join(text)
+        if len(NONLETTER.sub(u'', text)) < self.min_chars:
+            return None, 0.0
+
+        scores = self.scores(text)
+        language = max(self.languages, key=scores.get)
+        if scores[language] < self.min_score:
+            return UNKNOWN, scores[language]
+        return language, scores[language]
+
+
+##########################################################################
+## Language Log
+##########################################################################
+
+class LanguageLog(object):
+    """
+    An append only log of the documents rejected by the language filter,
+    written to by the worker processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def add(self, fileid, category, language, score):
+        """
+        Appends the record of a rejected document to the log.
+        """
+        record = {
+            'fileid': fileid,
+            'category': category,
+            'language': language,
+            'score': round(score, 4),
+            'timestamp': time.time(),
+        }
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+
+    def reset(self):
+        """
+        Removes the log so that a new job starts with no rejections.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def records(self, since=None):
+        """
+        Returns the last record of each rejected document, optionally only
+        those added since the timestamp; lines that cannot be read are
+        skipped.
+        """
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+
+                if since is not None and record['timestamp'] < since:
+                    continue
+                records[record['fileid']] = record
+
+        return records
+
+    def counts(self, since=None):
+        """
+        Returns the number of rejected documents per category.
+        """
+        return Counter(
+            record['category'] for record in self.records(since).values()
+        )
+
+    def __len__(self):
+        return len(self.records())
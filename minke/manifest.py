@@ -0,0 +1,342 @@
+# minke.manifest
+# A persistent index of the fileids, categories, and sizes in a corpus.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: manifest.py [] benjamin@bengfort.com $
+
+"""
+A persistent index of the fileids, categories, and sizes in a corpus.
+
+Walking the corpus directory tree and matching every path against the fileid
+and category patterns takes a considerable amount of time on the full Baleen
+corpus. The manifest performs that walk once, stores the results in a compact
+pickle in the root of the corpus, and then answers fileid and category
+lookups from in-memory dictionaries on subsequent loads. If the corpus root is
+not writable, the manifest is stored in the user's cache directory instead.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import re
+import pickle
+import hashlib
+import logging
+
+from six import string_types
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+MANIFEST = ".manifest.pickle"
+VERSION  = 1
+
+logger = logging.getLogger(__name__)
+
+
+##########################################################################
+## Helper Functions
+##########################################################################
+
+def cache_path(root):
+    """
+    Returns the path of the manifest of the corpus root in the user's cache
+    directory, used when the corpus root is not writable. Manifests are keyed
+    by the hash of the absolute path of the root.
+    """
+    cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'
+    )
+    name = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()
+    return os.path.join(cache, 'minke', 'manifests', name + '.pickle')
+
+
+##########################################################################
+## Corpus Manifest
+##########################################################################
+
+class CorpusManifest(object):
+    """
+    The corpus manifest records the fileid, category, size, and modification
+    time of every document in the corpus along with the modification times
+    of the directories that contain them. Adding or removing a document from
+    a directory changes the modification time of that directory, so checking
+    for staleness only requires a stat of each directory, not of every file.
+
+    Note that editing a document in place does not change the directory, so
+    use ``validate`` to perform a complete (and expensive) check of sizes.
+    """
+
+    def __init__(self, root, pattern, cat_pattern, path=None):
+        self.root = os.path.abspath(root)
+        self.path = path or os.path.join(self.root, MANIFEST)
+        self.pattern = pattern
+        self.cat_pattern = cat_pattern
+
+        # Whether or not the manifest is stored on disk
+        self.persisted = False
+
+        # Columnar storage for the manifest
+        self._fileids = []
+        self._categories = []
+        self._sizes = []
+        self._mtimes = []
+        self._dirs = {}
+        self._names = []
+
+        # Lookup tables computed from the columns
+        self._f2i = {}
+        self._c2f = {}
+
+    @classmethod
+    def open(klass, root, pattern, cat_pattern, path=None):
+        """
+        Loads the manifest from disk if it exists and is fresh, otherwise
+        walks the corpus to build the manifest and attempts to save it. If no
+        path is given, the manifest is stored in the corpus root or, if the
+        root is not writable, in the user's cache directory.
+        """
+        paths = [path] if path else [
+            os.path.join(os.path.abspath(root), MANIFEST), cache_path(root),
+        ]
+
+        for candidate in paths:
+            manifest = klass(root, pattern, cat_pattern, candidate)
+            if manifest.load() and not manifest.stale():
+                return manifest
+
+        manifest.build()
+        for candidate in paths:
+            manifest.path = candidate
+            if manifest.save():
+                return manifest
+
+        logger.warning(
+            "could not save the manifest of %s, it will be rebuilt on every load",
+            manifest.root
+        )
+        return manifest
+
+    def build(self):
+        """
+        Walks the corpus root, matching relative paths against the fileid
+        pattern and computing the category with the category pattern.
+        """
+        pattern = re.compile(self.pattern + '$')
+        cat_pattern = re.compile(self.cat_pattern)
+
+        entries = []
+        self._dirs = {}
+        self._names = self._listroot()
+
+        for dirname, subdirs, names in os.walk(self.root):
+            # Record the subdirectory modification time for staleness checks
+            reldir = os.path.relpath(dirname, self.root)
+            if reldir != os.curdir:
+                self._dirs[reldir] = os.stat(dirname).st_mtime
+
+            # Compute the fileid prefix with forward slashes like nltk
+            prefix = "" if reldir == os.curdir else reldir.replace(os.sep, '/') + '/'
+
+            for name in names:
+                fileid = prefix + name
+                if not pattern.match(fileid):
+                    continue
+
+                stat = os.stat(os.path.join(dirname, name))
+                category = cat_pattern.match(fileid).group(1)
+                entries.append((fileid, category, stat.st_size, stat.st_mtime))
+
+        self._load_entries(sorted(entries))
+        return self
+
+    def stale(self):
+        """
+        Returns True if the names in the corpus root have changed or if any
+        subdirectory in the corpus has been modified since the build. The root
+        is listed rather than stat'd since saving the manifest modifies it.
+        """
+        if self._listroot() != self._names:
+            return True
+
+        for reldir, mtime in self._dirs.items():
+            try:
+                if os.stat(os.path.join(self.root, reldir)).st_mtime != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def validate(self):
+        """
+        Performs a complete check of the manifest, returning a list of the
+        fileids whose size or modification time differs from what is stored
+        on disk, or which no longer exist at all.
+        """
+        invalid = []
+        for idx, fileid in enumerate(self._fileids):
+            try:
+                stat = os.stat(self.abspath(fileid))
+            except OSError:
+                invalid.append(fileid)
+                continue
+
+            if stat.st_size != self._sizes[idx] or stat.st_mtime != self._mtimes[idx]:
+                invalid.append(fileid)
+
+        return invalid
+
+    def load(self):
+        """
+        Loads the manifest from disk, returning False if it does not exist,
+        cannot be read, or was created with a different version or pattern.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return False
+
+        if data.get('version') != VERSION:
+            return False
+
+        if data['pattern'] != self.pattern or data['cat_pattern'] != self.cat_pattern:
+            return False
+
+        self._dirs = data['dirs']
+        self._names = data['names']
+        self._load_entries(zip(
+            data['fileids'], data['categories'], data['sizes'], data['mtimes']
+        ))
+
+        self.persisted = True
+        return True
+
+    def save(self):
+        """
+        Writes the manifest to a temporary file then renames it into place.
+        Returns False if the path is not writable by this process.
+        """
+        data = {
+            'version': VERSION,
+            'pattern': self.pattern,
+            'cat_pattern': self.cat_pattern,
+            'dirs': self._dirs,
+            'names': self._names,
+            'fileids': self._fileids,
+            'categories': self._categories,
+            'sizes': self._sizes,
+            'mtimes': self._mtimes,
+        }
+
+        tmp = "{}.{}.tmp".format(self.path, os.getpid())
+        try:
+            dirname = os.path.dirname(self.path)
+            if not os.path.exists(dirname):
+                os.makedirs(dirname)
+
+            with open(tmp, 'wb') as f:
+                pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp, self.path)
+        except (IOError, OSError):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            self.persisted = False
+            return False
+
+        self.persisted = True
+        return True
+
+    def _listroot(self):
+        """
+        Returns the sorted names in the corpus root, excluding hidden files
+        such as the manifest and catalog, which do not match any fileid.
+        """
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith('.')
+        )
+
+    def _load_entries(self, entries):
+        """
+        Populates the columns and lookup tables from sorted entry tuples.
+        Category names are interned so that they are pickled only once.
+        """
+        self._fileids, self._categories = [], []
+        self._sizes, self._mtimes = [], []
+        self._f2i, self._c2f = {}, {}
+        interned = {}
+
+        for idx, (fileid, category, size, mtime) in enumerate(entries):
+            category = interned.setdefault(category, category)
+            if category not in self._c2f:
+                self._c2f[category] = []
+
+            self._fileids.append(fileid)
+            self._categories.append(category)
+            self._sizes.append(size)
+            self._mtimes.append(mtime)
+            self._f2i[fileid] = idx
+            self._c2f[category].append(fileid)
+
+    def fileids(self, categories=None):
+        """
+        Returns the sorted fileids of the corpus or of the given categories.
+        Lookups of a single category do not require sorting or matching.
+        """
+        if categories is None:
+            return list(self._fileids)
+
+        if isinstance(categories, string_types):
+            if categories not in self._c2f:
+                raise ValueError("Category {} not found".format(categories))
+            return list(self._c2f[categories])
+
+        fileids = []
+        for category in categories:
+            if category not in self._c2f:
+                raise ValueError("Category {} not found".format(category))
+            fileids.extend(self._c2f[category])
+        return sorted(set(fileids))
+
+    def categories(self, fileids=None):
+        """
+        Returns the sorted categories of the corpus or of the given fileids.
+        """
+        if fileids is None:
+            return sorted(self._c2f)
+
+        if isinstance(fileids, string_types):
+            fileids = [fileids]
+
+        return sorted(set(self.category(fileid) for fileid in fileids))
+
+    def category(self, fileid):
+        """
+        Returns the category of a single fileid.
+        """
+        return self._categories[self._f2i[fileid]]
+
+    def size(self, fileid):
+        """
+        Returns the size in bytes of a single fileid when it was indexed.
+        """
+        return self._sizes[self._f2i[fileid]]
+
+    def abspath(self, fileid):
+        """
+        Returns the absolute path of the fileid without touching the disk.
+        """
+        return os.path.join(self.root, *fileid.split('/'))
+
+    def __len__(self):
+        return len(self._fileids)
+
+    def __contains__(self, fileid):
+        return fileid in self._f2i
@@ -0,0 +1,171 @@
+# minke.partition
+# Deterministic partitioning of a corpus across independent hosts.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: partition.py [] benjamin@bengfort.com $
+
+"""
+Deterministic partitioning of a corpus across independent hosts.
+
+To preprocess a corpus on N machines without any coordination, every host
+computes the same partition of the fileids and processes only its own
+slice. Fileids are either assigned by a stable hash, so the assignment of a
+document never depends on the rest of the corpus, or balanced by their size
+on disk, which evens out the work but requires every host to see the same
+corpus. Shards are written as ``i/N`` with i from 1 to N.
+
+Hosts may write into the same target on a shared filesystem, since each
+shard keeps its own output manifest and journal, or into separate targets
+that are synced later. Either way ``merge`` combines the per-shard output
+manifests (copying the outputs of separate targets) into a single target.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import re
+import glob
+import heapq
+import shutil
+
+from six import string_types
+from minke.utils.sketches import stable_hash
+from minke.incremental import OutputManifest, OUTPUTS
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+HASH = "hash"
+SIZE = "size"
+SHARD = re.compile(r'^\s*(\d+)\s*/\s*(\d+)\s*$')
+
+
+##########################################################################
+## Partitioning
+##########################################################################
+
+def parse_shard(shard):
+    """
+    Parses a shard specification "i/N" into an (i, N) tuple, raising a
+    ValueError if it is malformed or if i is not between 1 and N.
+    """
+    if not isinstance(shard, string_types):
+        index, count = shard
+    else:
+        match = SHARD.match(shard)
+        if match is None:
+            raise ValueError("Shards must be specified as i/N, not '{}'".format(shard))
+        index, count = int(match.group(1)), int(match.group(2))
+
+    if not 1 <= index <= count:
+        raise ValueError("Shard {}/{} must be between 1 and {}".format(index, count, count))
+    return index, count
+
+
+def shard_name(name, shard):
+    """
+    Returns the name of the per-shard version of a file in the target, e.g.
+    ``.outputs.sqlite`` is ``.outputs.2-of-4.sqlite`` for shard 2/4, so that
+    hosts writing to the same target do not share files.
+    """
+    if shard is None:
+        return name
+
+    base, ext = name.rsplit('.', 1)
+    return "{}.{}-of-{}.{}".format(base, shard[0], shard[1], ext)
+
+
+def partition(fileids, shard, method=HASH, sizes=None):
+    """
+    Returns the fileids assigned to the (i, N) shard, in their given order.
+    With the hash method every fileid is assigned to shard stable hash mod N.
+    With the size method the fileids are sorted largest first and each is
+    assigned to the shard with the smallest total size so far, which
+    requires the sizes of the fileids (in the same order).
+    """
+    index, count = parse_shard(shard)
+    fileids = list(fileids)
+
+    if method == HASH:
+        return [
+            fileid for fileid in fileids
+            if stable_hash(fileid) % count == index - 1
+        ]
+
+    if method == SIZE:
+        if sizes is None:
+            raise ValueError("Size balanced partitioning requires the sizes")
+
+        # Ties are broken by fileid and shard so every host agrees
+        loads = [(0, idx) for idx in range(count)]
+        assigned = set()
+        for size, fileid in sorted(zip(sizes, fileids), key=lambda item: (-item[0], item[1])):
+            load, idx = heapq.heappop(loads)
+            if idx == index - 1:
+                assigned.add(fileid)
+            heapq.heappush(loads, (load + size, idx))
+
+        return [fileid for fileid in fileids if fileid in assigned]
+
+    raise ValueError("Unknown partition method '{}'".format(method))
+
+
+##########################################################################
+## Merging
+##########################################################################
+
+def merge(target, sources=()):
+    """
+    Merges the per-shard output manifests in the target and in every source
+    target into the output manifest of the target. The outputs of source
+    targets are copied into the target first, skipping hidden files such as
+    the manifests and journals. Returns the number of copied files and the
+    number of outputs recorded in the merged manifest.
+    """
+    target = os.path.abspath(target)
+    manifest = OutputManifest(os.path.join(target, OUTPUTS))
+    copied = 0
+
+    for source in [target] + [os.path.abspath(source) for source in sources]:
+        if source != target:
+            copied += _copy_outputs(source, target)
+
+        base, ext = OUTPUTS.rsplit('.', 1)
+        pattern = os.path.join(source, "{}.*-of-*.{}".format(base, ext))
+        paths = sorted(glob.glob(pattern))
+        if source != target:
+            paths.insert(0, os.path.join(source, OUTPUTS))
+
+        for path in paths:
+            if os.path.exists(path):
+                manifest.merge(path)
+
+    merged = len(manifest)
+    manifest.close()
+    return copied, merged
+
+
+def _copy_outputs(source, target):
+    """
+    Copies the files in the source directory tree to the same relative paths
+    in the target, skipping hidden files and directories.
+    """
+    copied = 0
+    for dirname, subdirs, names in os.walk(source):
+        subdirs[:] = [name for name in subdirs if not name.startswith('.')]
+        parent = os.path.join(target, os.path.relpath(dirname, source))
+        if not os.path.exists(parent):
+            os.makedirs(parent)
+
+        for name in names:
+            if name.startswith('.'):
+                continue
+            shutil.copy2(os.path.join(dirname, name), os.path.join(parent, name))
+            copied += 1
+    return copied
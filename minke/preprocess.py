@@ -18,13 +18,58 @@ Converts a raw text corpus into a part of speech tokenized corpus.
 ##########################################################################
 
 import os
+import sys
+import json
+import time
 import nltk
+import codecs
 import shutil
 import pickle
+import logging
+import resource
+import threading
+import traceback
 import multiprocessing as mp
 
 from tqdm import tqdm
+from collections import OrderedDict
+from six.moves import queue
+from nltk.tag.perceptron import PerceptronTagger
 from minke.config import settings
+from minke.exceptions import MinkeError, QuarantineError, DocumentTimeout
+from minke.version import get_version
+from minke.incremental import OutputManifest, OUTPUTS
+from minke.journal import JobJournal, JOURNAL
+from minke.quarantine import Quarantine, QUARANTINE, time_limit
+from minke.quarantine import TIMEOUT, OVERSIZE, ERROR
+from minke.partition import parse_shard, shard_name, partition, SIZE
+from minke.shards import ShardWriter
+from minke.columnar import ColumnarWriter
+from minke.cache import SentenceCache
+from minke.boilerplate import BoilerplateFilter
+from minke.dedup import Deduplicator, DUPLICATES
+from minke.language import LanguageIdentifier, LanguageLog, LANGUAGES
+from minke.tagger import VectorizedPerceptronTagger
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+POLL_INTERVAL = 1.0 # Seconds to wait for a result before checking the workers
+PUNKT         = 'tokenizers/punkt/english.pickle'
+LARGEST       = 'largest'   # Schedule the largest documents first
+ORDERED       = 'ordered'   # Schedule documents in corpus order
+
+# The part of speech tagger backends by name; a backend is a callable that
+# returns an object with the ``tag`` and ``tag_sents`` methods of nltk's
+# ``TaggerI`` interface. Backends are identified by name (rather than passed
+# as instances) so that the worker processes can construct their own.
+TAGGERS = {
+    'perceptron': PerceptronTagger,
+    'vectorized': VectorizedPerceptronTagger,
+}
+
+logger = logging.getLogger(__name__)
 
 ##########################################################################
 ## Preprocessor
@@ -52,6 +97,62 @@ class Preprocessor(object):
         # Collect settings from arguments or YAML configuration.
         self.overwrite = kwargs.get('overwrite', settings.preprocess.overwrite)
         self.skip_exists = kwargs.get('skip_exists', settings.preprocess.skip_exists)
+        self.batch = kwargs.get('batch', settings.preprocess.batch)
+        self.incremental = kwargs.get('incremental', settings.preprocess.incremental)
+        self.backend = kwargs.get('tagger', settings.preprocess.tagger)
+
+        # Drop paragraphs in more than this fraction of the documents of a feed
+        self.boilerplate = kwargs.get('boilerplate', settings.preprocess.boilerplate)
+        self.boilerplate_docs = kwargs.get(
+            'boilerplate_docs', settings.preprocess.boilerplate_docs
+        )
+
+        # Process one representative of every cluster of duplicate documents
+        self.dedup = kwargs.get('dedup', settings.preprocess.dedup)
+        self.dedup_threshold = kwargs.get(
+            'dedup_threshold', settings.preprocess.dedup_threshold
+        )
+        self.duplicates = kwargs.get('duplicates', None)
+
+        # Only tag the documents identified as this language, if one is set
+        self.language = kwargs.get('language', settings.preprocess.language)
+        self.identifier = LanguageIdentifier() if self.language else None
+
+        # Memoize the tagged sentences in a bounded LRU cache if a size is set
+        capacity = kwargs.get('sentence_cache', settings.preprocess.sentence_cache)
+        self.sentences = SentenceCache(capacity) if capacity else None
+        self.resume = kwargs.get('resume', False)
+
+        # Per-document budgets of wall time in seconds and input in bytes
+        self.time_limit = kwargs.get('time_limit', settings.preprocess.time_limit)
+        self.size_limit = kwargs.get('size_limit', settings.preprocess.size_limit)
+
+        # The (i, N) shard of the corpus processed on this host, if any
+        shard = kwargs.get('shard', None)
+        self.shard = parse_shard(shard) if shard is not None else None
+        self.partition = kwargs.get('partition', settings.preprocess.partition)
+        self._assigned = None
+
+        if self.backend not in TAGGERS:
+            raise ValueError("Unknown tagger '{}'".format(self.backend))
+
+        # The sentence tokenizer and tagger models, loaded once on first use
+        self.sent_tokenizer = None
+        self.tagger = None
+
+    def load(self):
+        """
+        Loads the punkt sentence tokenizer and the tagger backend models if
+        they have not been loaded yet. Rather than letting nltk load them on
+        the first sentence (and, in older versions of nltk, reload the tagger
+        for every sentence), the models are held by the preprocessor; the
+        parallel preprocessors call this once when each worker starts.
+        """
+        if self.sent_tokenizer is None:
+            self.sent_tokenizer = nltk.data.load(PUNKT)
+        if self.tagger is None:
+            self.tagger = TAGGERS[self.backend]()
+        return self
 
     @property
     def target(self):
@@ -72,15 +173,98 @@ class Preprocessor(object):
                     )
 
         self._target = path
+        self._outputs = None
+        self._journal = None
+        self._quarantine = None
+        self._languages = None
+
+    @property
+    def outputs(self):
+        """
+        The manifest of the outputs written to the target.
+        """
+        if self._outputs is None:
+            self._outputs = OutputManifest(
+                os.path.join(self.target, shard_name(OUTPUTS, self.shard))
+            )
+        return self._outputs
+
+    @property
+    def journal(self):
+        """
+        The journal of the preprocessing job writing to the target.
+        """
+        if self._journal is None:
+            self._journal = JobJournal(
+                os.path.join(self.target, shard_name(JOURNAL, self.shard))
+            )
+        return self._journal
+
+    @property
+    def quarantine(self):
+        """
+        The log of the documents quarantined by the job writing to the target.
+        """
+        if self._quarantine is None:
+            self._quarantine = Quarantine(
+                os.path.join(self.target, shard_name(QUARANTINE, self.shard))
+            )
+        return self._quarantine
+
+    @property
+    def languages(self):
+        """
+        The log of the documents rejected by the language filter of the job.
+        """
+        if self._languages is None:
+            self._languages = LanguageLog(
+                os.path.join(self.target, shard_name(LANGUAGES, self.shard))
+            )
+        return self._languages
+
+    def signature(self):
+        """
+        Returns the version and settings of the preprocessor that determine
+        its output; outputs written with a different signature are stale.
+        """
+        signature = {
+            'sent_tokenizer': PUNKT,
+            'tagger': self.backend,
+            'nltk': nltk.__version__,
+        }
+
+        if self.boilerplate:
+            signature['boilerplate'] = [self.boilerplate, self.boilerplate_docs]
+        return get_version(), signature
 
     def fileids(self, fileids=None, categories=None):
         """
-        Helper function access the fileids of the corpus
+        Helper function access the fileids of the corpus, limited to the
+        fileids assigned to the shard of this host if sharded.
         """
         fileids = self.corpus._resolve(fileids, categories)
-        if fileids:
+        if not fileids:
+            fileids = self.corpus.fileids()
+
+        if self.shard is None:
             return fileids
-        return self.corpus.fileids()
+
+        assigned = self.assigned()
+        return [fileid for fileid in fileids if fileid in assigned]
+
+    def assigned(self):
+        """
+        Returns the set of fileids assigned to the shard of this host. The
+        whole corpus is partitioned (rather than a selection of it) so that
+        every host agrees on the assignment of every document.
+        """
+        if self._assigned is None:
+            fileids = self.corpus.fileids()
+            sizes = list(self.corpus.sizes()) if self.partition == SIZE else None
+            self._assigned = set(
+                partition(fileids, self.shard, self.partition, sizes)
+            )
+        return self._assigned
 
     def abspath(self, fileid):
         """
@@ -101,6 +285,18 @@ class Preprocessor(object):
         # Return the path to the file relative to the target.
         return os.path.normpath(os.path.join(self.target, parent, basename))
 
+    def __getstate__(self):
+        """
+        The models are not pickled; they are loaded again in the new process.
+        """
+        state = self.__dict__.copy()
+        state['sent_tokenizer'] = None
+        state['tagger'] = None
+        state['_journal'] = None
+        state['_assigned'] = None
+        state['duplicates'] = None
+        return state
+
     def replicate(self, source):
         """
         Directly copies all files in the source directory to the root of the
@@ -125,12 +321,99 @@ class Preprocessor(object):
         Segments, tokenizes, and tags a document in the corpus. Returns a
         generator of paragraphs, which are lists of sentences, which in turn
         are lists of part of speech tagged words.
+
+        In batch mode every sentence of the document is segmented and
+        tokenized first and then all of them are tagged with a single
+        ``tag_sents`` call, which produces the same output as tagging each
+        sentence in turn.
+
+        If a language is set the cleaned paragraphs are identified first, and
+        documents in another language are recorded in the language log and
+        not tagged, returning None.
         """
-        for paragraph in self.corpus.paras(fileids=fileid):
-            yield [
-                nltk.pos_tag(nltk.wordpunct_tokenize(sent))
-                for sent in nltk.sent_tokenize(paragraph)
-            ]
+        paragraphs = self.corpus.paras(fileids=fileid)
+        if self.identifier is None:
+            return self.tag(paragraphs)
+
+        paragraphs = list(paragraphs)
+        language, score = self.identifier.identify(paragraphs)
+        if language is not None and language != self.language:
+            categories = self.corpus.categories([fileid])
+            self.languages.add(
+                fileid, categories[0] if categories else None, language, score
+            )
+            return None
+
+        return self.tag(paragraphs)
+
+    def tag(self, paragraphs):
+        """
+        Segments, tokenizes, and tags the paragraphs of a document, returning
+        a generator of lists of part of speech tagged sentences.
+        """
+        self.load()
+
+        if not self.batch:
+            for paragraph in paragraphs:
+                yield [
+                    self.tag_sent(sent)
+                    for sent in self.sent_tokenizer.tokenize(paragraph)
+                ]
+            return
+
+        paragraphs = [
+            self.sent_tokenizer.tokenize(paragraph) for paragraph in paragraphs
+        ]
+
+        # Tag the sentences of all paragraphs at once then regroup them
+        tagged = iter(self.tag_sents([
+            sent for paragraph in paragraphs for sent in paragraph
+        ]))
+        for paragraph in paragraphs:
+            yield [next(tagged) for _ in paragraph]
+
+    def tag_sent(self, sent):
+        """
+        Tokenizes and tags a single sentence, using the sentence cache if it
+        is enabled.
+        """
+        tagged = self.sentences.get(sent) if self.sentences is not None else None
+        if tagged is None:
+            tagged = self.tagger.tag(nltk.wordpunct_tokenize(sent))
+            if self.sentences is not None:
+                self.sentences.set(sent, tagged)
+        return tagged
+
+    def tag_sents(self, sents):
+        """
+        Tokenizes and tags a list of sentences with a single call to the
+        tagger, returning the list of tagged sentences. If the sentence cache
+        is enabled only the sentences that are not cached are tagged, since
+        the tags of a sentence do not depend on the rest of the document.
+        """
+        if self.sentences is None:
+            return self.tagger.tag_sents(
+                nltk.wordpunct_tokenize(sent) for sent in sents
+            )
+
+        tagged = [self.sentences.get(sent) for sent in sents]
+        misses = [idx for idx, sent in enumerate(tagged) if sent is None]
+        if misses:
+            results = self.tagger.tag_sents(
+                nltk.wordpunct_tokenize(sents[idx]) for idx in misses
+            )
+            for idx, sent in zip(misses, results):
+                self.sentences.set(sents[idx], sent)
+                tagged[idx] = sent
+        return tagged
+
+    def cache_stats(self):
+        """
+        Returns the hits and misses of the sentence cache during the run.
+        """
+        if self.sentences is None:
+            return 0, 0
+        return self.sentences.hits, self.sentences.misses
 
     def process(self, fileid):
         """
@@ -142,12 +425,98 @@ class Preprocessor(object):
             4. Tokenizes the sentences with the wordpunct_tokenizer
             5. Tags the sentences using the default pos_tagger
             6. Writes the document as a pickle to the target location.
+            7. Records the source hash and signature in the output manifest.
+
+        Steps 2 through 5 are bounded by the time and size limits, see
+        ``tokenized``; a document that exceeds them or raises is quarantined.
+
+        In incremental mode, documents whose output is fresh according to the
+        output manifest are skipped and stale outputs are overwritten. The
+        pickle is written to a temporary file and renamed into place so that
+        an interrupted run never leaves a truncated output behind.
 
         This method is called multiple times from the transform runner.
         """
+        target = self.check(fileid)
+        if target is None:
+            return None
+
+        # Create a data structure for the pickle, unless it was rejected
+        document = self.tokenized(fileid)
+        if document is None:
+            return None
+        return self.write(fileid, target, document)
+
+    def tokenized(self, fileid):
+        """
+        Returns the tokenized document as a list of paragraphs (or None if it
+        is rejected by the language filter) if it is within the size limit
+        and is processed within the time limit. Otherwise, or
+        if processing the document raises, the document is recorded in the
+        quarantine log with the reason, elapsed time and size, and a
+        QuarantineError is raised (chained to the original exception).
+        """
+        size = next(iter(self.corpus.sizes(fileids=fileid)))
+        started = time.time()
+
+        try:
+            if self.size_limit is not None and size > self.size_limit:
+                raise QuarantineError(
+                    "{:,} bytes exceeds the size limit of {:,} bytes".format(
+                        size, self.size_limit
+                    )
+                )
+
+            with time_limit(self.time_limit):
+                document = self.tokenize(fileid)
+                if document is not None:
+                    document = list(document)
+
+            # Without the interval timer the limit is checked afterwards
+            elapsed = time.time() - started
+            if self.time_limit is not None and elapsed > self.time_limit:
+                raise DocumentTimeout(
+                    "exceeded the time limit of {:0.2f} seconds".format(
+                        self.time_limit
+                    )
+                )
+
+            return document
+
+        except Exception as e:
+            if isinstance(e, DocumentTimeout):
+                reason = TIMEOUT
+            elif isinstance(e, QuarantineError):
+                reason = OVERSIZE
+            else:
+                reason = ERROR
+
+            message = str(e) or e.__class__.__name__
+            elapsed = time.time() - started
+            self.quarantine.add(fileid, reason, message, elapsed, size)
+
+            if reason == OVERSIZE:
+                raise
+            raise QuarantineError(
+                "quarantined {} ({}): {}".format(fileid, reason, message)
+            )
+
+    def check(self, fileid):
+        """
+        Returns the path to write the output of the fileid to, creating its
+        parent directory, or None if the document should be skipped because
+        its output already exists (or is fresh in incremental mode).
+        """
         # Compute the outpath to write the file to.
         target = self.abspath(fileid)
         parent = os.path.dirname(target)
+        source = self.corpus.abspath(fileid)
+        version, signature = self.signature()
+
+        # Skip documents that have not changed since they were processed
+        if self.incremental:
+            if self.outputs.fresh(fileid, source, target, version, signature):
+                return None
 
         # Make sure the directory exists
         if not os.path.exists(parent):
@@ -160,7 +529,7 @@ class Preprocessor(object):
             )
 
         # Ensure that we are not overwriting existing data
-        if os.path.exists(target):
+        if os.path.exists(target) and not self.incremental:
             # If we're in overwrite mode just keep going.
             if not self.overwrite:
 
@@ -174,23 +543,140 @@ class Preprocessor(object):
                         "Path at '{}' already exists!".format(target)
                     )
 
-        # Create a data structure for the pickle
-        document = list(self.tokenize(fileid))
-
-        # Open and serialize the pickle to disk
-        with open(target, 'wb') as f:
-            pickle.dump(document, f, pickle.HIGHEST_PROTOCOL)
+        return target
 
-        # Clean up the document
-        del document
+    def write(self, fileid, target, document):
+        """
+        Writes the document as a pickle to the target path, recording the
+        source hash and signature in the output manifest.
+        """
+        source = self.corpus.abspath(fileid)
+        version, signature = self.signature()
+
+        # Serialize the pickle to a temporary file and move it into place
+        tmp = "{}.{}.tmp".format(target, os.getpid())
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump(document, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        # Record what the output was written from
+        self.outputs.record(fileid, source, target, version, signature)
 
         # Return the target fileid
         return target
 
+    def checkpoint(self):
+        """
+        Returns the fileids completed by previous runs of the job according
+        to the journal; they are skipped when the job is resumed.
+        """
+        return self.journal.completed
+
+    def fit_boilerplate(self):
+        """
+        Fits a boilerplate filter on the whole corpus (rather than a selection
+        of it, so that every shard agrees on the boilerplate) and installs it
+        in the corpus reader so that its paragraphs are filtered.
+        """
+        self.corpus.boilerplate = BoilerplateFilter(
+            self.boilerplate, self.boilerplate_docs
+        ).fit(self.corpus, self.corpus.fileids())
+        logger.info(
+            "found %d boilerplate paragraphs in %d feeds",
+            len(self.corpus.boilerplate), len(self.corpus.boilerplate.feeds)
+        )
+        return self.corpus.boilerplate
+
+    def fit_duplicates(self):
+        """
+        Clusters the duplicate documents of the whole corpus (so that every
+        shard agrees on the representatives) unless a duplicate map was given,
+        and saves the map to the target for the readers of the target.
+        """
+        if self.duplicates is None:
+            self.duplicates = Deduplicator(self.dedup_threshold).fit(
+                self.corpus, self.corpus.fileids()
+            )
+            logger.info(
+                "found %d exact and %d near duplicate documents",
+                self.duplicates.exact, self.duplicates.near
+            )
+
+        self.duplicates.save(
+            os.path.join(self.target, shard_name(DUPLICATES, self.shard))
+        )
+        return self.duplicates
+
+    def on_start(self, fileids, pending):
+        """
+        Called before processing with all of the fileids of the job and the
+        pending fileids that will be processed in this run.
+        """
+        self.journal.start(len(fileids), self.resume)
+        if not self.resume:
+            self.quarantine.reset()
+            self.languages.reset()
+        self.started = time.time()
+
+    def on_result(self, fileid, result, error):
+        """
+        Called as each document completes or fails, with the formatted
+        traceback of the exception as the error if it failed.
+        """
+        if error is None:
+            self.journal.complete(fileid)
+        else:
+            self.journal.fail(fileid, error)
+
+    def on_finish(self):
+        """
+        Called when processing ends, whether it completed or not.
+        """
+        self.journal.finish()
+
+    def quarantined(self):
+        """
+        Summarizes the documents quarantined during the last run by reason.
+        """
+        return self.quarantine.summary(since=getattr(self, 'started', None))
+
+    def rejected(self):
+        """
+        Counts the documents rejected by the language filter during the last
+        run by category.
+        """
+        return self.languages.counts(since=getattr(self, 'started', None))
+
+    def execute(self, fileids):
+        """
+        Processes the fileids one at a time, yielding the result of each.
+        Quarantined documents are skipped; any other exception is raised.
+        """
+        for fileid in fileids:
+            self.journal.dispatch(fileid)
+            try:
+                result = self.process(fileid)
+            except QuarantineError:
+                self.on_result(fileid, None, traceback.format_exc())
+                continue
+            except Exception:
+                self.on_result(fileid, None, traceback.format_exc())
+                raise
+
+            self.on_result(fileid, result, None)
+            yield result
+
     def transform(self, fileids=None, categories=None):
         """
         Transform the wrapped corpus, writing out the segmented, tokenized,
         and part of speech tagged corpus as a pickle to the target directory.
+        Every document is recorded in the job journal in the target; when
+        resuming, the documents completed by previous runs are skipped and
+        failed or interrupted documents are processed again.
 
         This method will also directly copy files that are in the corpus.root
         directory that are not matched by the corpus.fileids().
@@ -202,9 +688,26 @@ class Preprocessor(object):
         # First shutil.copy anything in the root directory.
         self.replicate(self.corpus.root)
 
-        # Resolve the fileids to start processing
-        for fileid in self.fileids(fileids, categories):
-            yield self.process(fileid)
+        # Learn the boilerplate of every feed before processing any documents
+        if self.boilerplate:
+            self.fit_boilerplate()
+
+        # Resolve the fileids and skip those completed if resuming
+        fileids = self.fileids(fileids, categories)
+        if self.dedup or self.duplicates is not None:
+            fileids = self.fit_duplicates().representatives(fileids)
+
+        pending = fileids
+        if self.resume:
+            completed = self.checkpoint()
+            pending = [fileid for fileid in fileids if fileid not in completed]
+
+        self.on_start(fileids, pending)
+        try:
+            for result in self.execute(pending):
+                yield result
+        finally:
+            self.on_finish()
 
 
 class ProgressPreprocessor(Preprocessor):
@@ -213,125 +716,852 @@ class ProgressPreprocessor(Preprocessor):
     what is going on during preprocessing.
     """
 
+    def on_start(self, fileids, pending):
+        """
+        Opens a progress bar over the total corpus size for per byte counting
+        that starts from the size of the documents already completed.
+        """
+        super(ProgressPreprocessor, self).on_start(fileids, pending)
+        total = sum(self.corpus.sizes(fileids=fileids)) if fileids else 0
+        remaining = sum(self.corpus.sizes(fileids=pending)) if pending else 0
+        self.pbar = tqdm(
+            total=total, initial=total - remaining, unit='B', unit_scale=True
+        )
+
+    def on_result(self, fileid, result, error):
+        """
+        Indicates progress as each document is completed.
+        """
+        super(ProgressPreprocessor, self).on_result(fileid, result, error)
+        self.pbar.update(sum(self.corpus.sizes(fileids=fileid)))
+
+    def on_finish(self):
+        super(ProgressPreprocessor, self).on_finish()
+        self.pbar.close()
+
+
+class ShardedPreprocessor(Preprocessor):
+    """
+    Rather than writing one pickle per document, this preprocessor appends
+    the documents to large segment files in the target directory using a
+    `ShardWriter`. The `BaleenPickledCorpusReader` detects the sharded store
+    and streams documents from the segments instead of individual files.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Get sharding-specific arguments and then call super.
+        """
+        self.segment_size = kwargs.pop(
+            'segment_size', settings.preprocess.segment_size
+        )
+        super(ShardedPreprocessor, self).__init__(*args, **kwargs)
+
+        # Documents cannot be replaced in the append-only stores
+        if self.incremental:
+            raise ValueError(
+                "Incremental preprocessing requires one pickle per document."
+            )
+
+    def shardid(self, fileid):
+        """
+        Returns the fileid of the document in the sharded store, which is the
+        path of the pickle that would have been written, relative to target.
+        """
+        path = os.path.relpath(self.abspath(fileid), self.target)
+        return path.replace(os.sep, '/')
+
+    def writer(self):
+        """
+        Returns the shard writer used to append documents to the target.
+        """
+        return ShardWriter(self.target, self.segment_size)
+
+    def checkpoint(self):
+        """
+        The store rather than the journal is the checkpoint of a sharded job:
+        documents in the store are skipped by the transform, and documents
+        that the journal records as completed but were lost with the segment
+        that was open when the job was killed must be processed again.
+        """
+        return set()
+
+    def process(self, fileid):
+        """
+        Segments, tokenizes, and tags the document, returning the fileid in
+        the sharded store along with the document so that the transform can
+        write it to the currently open segment (or None if it is rejected).
+        """
+        document = self.tokenized(fileid)
+        if document is None:
+            return None
+        return self.shardid(fileid), document
+
     def transform(self, fileids=None, categories=None):
         """
-        At the moment, we simply have to replace the entire transform method
-        to get progress bar functionality. Kind of a bummer, but it's a small
-        method (purposefully so).
+        Opens a shard writer on the target and writes every processed
+        document to it. Documents that already exist in the store are skipped
+        (yielding None) or overwritten according to the settings.
         """
         # Make the target directory if it doesn't already exist
         if not os.path.exists(self.target):
             os.makedirs(self.target)
 
-        # First shutil.copy anything in the root directory.
-        self.replicate(self.corpus.root)
+        with self.writer() as writer:
+            # Determine which fileids have already been written to the store.
+            remaining = []
+            for fileid in self.fileids(fileids, categories):
+                if self.shardid(fileid) in writer and not self.overwrite:
+                    if not self.skip_exists:
+                        raise ValueError(
+                            "Document '{}' already exists in the store!".format(
+                                self.shardid(fileid)
+                            )
+                        )
+                    yield None
+                    continue
+                remaining.append(fileid)
+
+            # Nothing to process, so don't resolve fileids to the whole corpus.
+            if not remaining:
+                return
+
+            parent = super(ShardedPreprocessor, self)
+            for result in parent.transform(fileids=remaining):
+                # Documents rejected by the language filter are skipped
+                if result is None:
+                    yield None
+                    continue
+
+                shardid, document = result
+                yield writer.write(shardid, document)
+
+
+class ProgressShardedPreprocessor(ShardedPreprocessor, ProgressPreprocessor):
+    """
+    Writes a sharded store while displaying a progress bar.
+    """
+    pass
 
-        # Get the total corpus size for per byte counting
-        corpus_size = sum(self.corpus.sizes(fileids, categories))
 
-        # Start processing with a progress bar.
-        with tqdm(total=corpus_size, unit='B', unit_scale=True) as pbar:
-            for fileid in self.fileids(fileids, categories):
-                yield self.process(fileid)
-                pbar.update(sum(self.corpus.sizes(fileids=fileid)))
+class ColumnarPreprocessor(ShardedPreprocessor):
+    """
+    Writes the tagged documents into a memory-mapped columnar store in the
+    target directory using a `ColumnarWriter`, which can be read with the
+    `BaleenColumnarCorpusReader`.
+    """
+
+    def writer(self):
+        """
+        Returns the columnar writer used to append documents to the target.
+        """
+        return ColumnarWriter(self.target)
+
+
+class ProgressColumnarPreprocessor(ColumnarPreprocessor, ProgressPreprocessor):
+    """
+    Writes a columnar store while displaying a progress bar.
+    """
+    pass
 
 
 class ParallelPreprocessor(Preprocessor):
     """
-    Implements multiprocessing to speed up the preprocessing efforts.
+    Implements multiprocessing to speed up the preprocessing efforts. The
+    preprocessor (along with its corpus reader) is installed in each worker
+    process once by the pool initializer, which also loads the tokenizer and
+    tagger models before the worker receives any documents. Only chunks of
+    fileids are then streamed to the pool with ``imap_unordered``;
+    results are yielded as they complete, like the serial transform. At most
+    ``window`` documents are in flight at any time so that neither the tasks
+    nor the results are accumulated in memory. Exceptions raised while
+    processing a document are collected in ``errors`` rather than aborting
+    the transform, and if a worker process dies (e.g. killed by the kernel
+    for using too much memory) a MinkeError is raised rather than waiting
+    forever for the documents it was processing.
+
+    Document sizes are very skewed, so by default the largest documents are
+    submitted first rather than leaving the pool waiting on a few huge
+    documents submitted at the end. Chunks are packed by size: a chunk is
+    sent when it holds ``chunk_bytes`` of documents or ``chunksize``
+    documents, so large documents are sent individually and small ones in
+    chunks of roughly the same cost.
+
+    The parsers accumulate memory over many documents, so workers can be
+    recycled after ``max_tasks`` chunks, and a worker whose peak resident
+    memory passes ``memory_limit`` bytes after a document exits and is
+    replaced by the pool, returning the rest of its chunk to be requeued.
+    The peak memory of every worker is logged when the transform ends.
+
+    Each worker has its own sentence cache; the workers return their cache
+    statistics with every chunk so they can be reported for the whole run.
     """
 
     def __init__(self, *args, **kwargs):
         """
         Get parallel-specific arguments and then call super.
         """
-        self.tasks   = kwargs.pop('tasks', settings.preprocess.tasks)
+        self.tasks     = kwargs.pop('tasks', settings.preprocess.tasks)
+        self.chunksize = kwargs.pop('chunksize', settings.preprocess.chunksize)
+        self.window    = kwargs.pop('window', settings.preprocess.window)
+        self.schedule  = kwargs.pop('schedule', settings.preprocess.schedule)
+        self.chunk_bytes = kwargs.pop('chunk_bytes', settings.preprocess.chunk_bytes)
+        self.max_tasks = kwargs.pop('max_tasks', settings.preprocess.max_tasks)
+        self.memory_limit = kwargs.pop('memory_limit', settings.preprocess.memory_limit)
         super(ParallelPreprocessor, self).__init__(*args, **kwargs)
 
-    def on_result(self, result):
+        if self.schedule not in (LARGEST, ORDERED):
+            raise ValueError("Unknown schedule '{}'".format(self.schedule))
+
+        # The window must allow every worker to have a full chunk in flight,
+        # otherwise the pool will wait forever to fill a chunk.
+        minimum = self.tasks * self.chunksize
+        self.window = max(self.window or minimum * 4, minimum)
+        self.errors = []
+
+        # The peak resident memory in bytes of each worker process by pid
+        self.peaks = {}
+        self.recycled = 0
+
+        # The sentence cache (hits, misses) of each worker process by pid
+        self.cached = {}
+
+    def on_result(self, fileid, result, error):
         """
-        Appends the results to the master results list.
+        Called in the main process as each document completes or fails;
+        failures are recorded as (fileid, traceback) tuples.
         """
-        self.results.append(result)
+        super(ParallelPreprocessor, self).on_result(fileid, result, error)
+        if error is not None:
+            self.errors.append((fileid, error))
 
-    def transform(self, fileids=None, categories=None):
+    def execute(self, fileids):
         """
-        At the moment, we simply have to replace the entire transform method
-        to get progress bar functionality. Kind of a bummer, but it's a small
-        method (purposefully so).
+        Streams the fileids through a process pool, yielding the result of
+        every document as it completes (in completion order).
         """
-        # Make the target directory if it doesn't already exist
-        if not os.path.exists(self.target):
-            os.makedirs(self.target)
+        self.errors = []
+        return self.imap(self.scheduled(fileids))
 
-        # First shutil.copy anything in the root directory.
-        self.replicate(self.corpus.root)
+    def scheduled(self, fileids):
+        """
+        Returns (fileid, size) pairs in the order the documents are submitted
+        to the pool: largest first by their size on disk, or in corpus order.
+        """
+        fileids = list(fileids)
+        if not fileids:
+            return []
 
-        # Reset the results
-        self.results = []
+        documents = list(zip(fileids, self.corpus.sizes(fileids=fileids)))
+        if self.schedule == LARGEST:
+            documents.sort(key=lambda document: document[1], reverse=True)
+        return documents
 
-        # Create a multiprocessing pool
-        pool  = mp.Pool(processes=self.tasks)
-        tasks = [
-            pool.apply_async(self.process, (fileid,), callback=self.on_result)
-            for fileid in self.fileids(fileids, categories)
-        ]
+    def chunks(self, documents):
+        """
+        Groups the (fileid, size) pairs into chunks of fileids that are sent
+        to the workers as single tasks. A chunk is closed when its documents
+        reach chunk_bytes in size or when it holds chunksize documents.
+        """
+        chunk, size = [], 0
+        for fileid, nbytes in documents:
+            chunk.append(fileid)
+            size += nbytes
+
+            full = self.chunk_bytes is not None and size >= self.chunk_bytes
+            if full or len(chunk) == self.chunksize:
+                yield chunk
+                chunk, size = [], 0
 
-        # Close the pool and join
-        pool.close()
-        pool.join()
+        if chunk:
+            yield chunk
 
-        return self.results
+    def imap(self, documents):
+        """
+        Maps process over the chunks of (fileid, size) documents with a pool,
+        bounding the number of documents in flight with a semaphore that the
+        task feeder acquires and that is released as each result is received.
+        Workers put their results on a queue rather than returning them, so
+        that a worker that exceeds the memory limit can exit after any
+        document; the documents of its chunk that it did not process are
+        submitted again. While waiting for results the workers are checked
+        for abnormal exits.
+        """
+        window  = threading.BoundedSemaphore(self.window)
+        stopped = threading.Event()
+        fed     = threading.Event()
+        lock    = threading.Lock()
+        results = mp.Queue()
+
+        # The chunks submitted to the pool that have not returned, by id
+        outstanding = {}
+        counter = [0]
+
+        def submit(chunk):
+            with lock:
+                cid = counter[0]
+                counter[0] += 1
+                outstanding[cid] = chunk
+            pool.apply_async(_process, (cid, chunk))
+
+        def admit():
+            for fileid, size in documents:
+                window.acquire()
+                if stopped.is_set():
+                    return
+
+                self.journal.dispatch(fileid)
+                yield fileid, size
+
+        def feed():
+            try:
+                for chunk in self.chunks(admit()):
+                    if stopped.is_set():
+                        return
+                    submit(chunk)
+            finally:
+                fed.set()
+
+        self.peaks, self.recycled, self.cached = {}, 0, {}
+        pool = mp.Pool(self.tasks, _initialize, (self, results), self.max_tasks)
+        feeder = threading.Thread(target=feed)
+        feeder.daemon = True
+        workers = {}
+
+        try:
+            self._check_workers(pool, workers)
+            feeder.start()
+
+            while True:
+                with lock:
+                    if fed.is_set() and not outstanding:
+                        break
+
+                try:
+                    pid, cid, chunk, remaining, peak, cached = results.get(
+                        timeout=POLL_INTERVAL
+                    )
+                except queue.Empty:
+                    self._check_workers(pool, workers)
+                    continue
+
+                self.peaks[pid] = max(peak, self.peaks.get(pid, 0))
+                self.cached[pid] = cached
+                with lock:
+                    outstanding.pop(cid, None)
+
+                if remaining is not None:
+                    self.recycled += 1
+                    logger.info(
+                        "recycled worker %d with a peak memory of %d bytes, "
+                        "requeued %d documents", pid, peak, len(remaining)
+                    )
+                    if remaining:
+                        submit(remaining)
+
+                for fileid, result, error in chunk:
+                    window.release()
+                    self.on_result(fileid, result, error)
+                    if error is None:
+                        yield result
+
+            pool.close()
+        finally:
+            # Unblock the task feeder if the transform was abandoned
+            stopped.set()
+            for _ in range(self.window):
+                try:
+                    window.release()
+                except ValueError:
+                    break
+
+            pool.terminate()
+            pool.join()
+            feeder.join()
+            results.cancel_join_thread()
+
+            for pid, peak in sorted(self.peaks.items()):
+                logger.info("worker %d peak memory %d bytes", pid, peak)
+
+    def _check_workers(self, pool, workers):
+        """
+        Tracks the worker processes of the pool (which replaces workers that
+        exit) and raises a MinkeError if any of them exited abnormally, since
+        the documents it was processing will never be returned. Workers that
+        exit normally after their maximum number of tasks are not errors.
+        """
+        for process in pool._pool:
+            workers.setdefault(process.pid, process)
+
+        for process in workers.values():
+            if process.exitcode is not None and process.exitcode != 0:
+                raise MinkeError(
+                    "worker process {} exited with code {}, its documents "
+                    "were lost".format(process.pid, process.exitcode)
+                )
+
+    def __getstate__(self):
+        """
+        The progress bar, errors and peaks stay in the main process.
+        """
+        state = super(ParallelPreprocessor, self).__getstate__()
+        state.pop('pbar', None)
+        state['errors'] = []
+        state['peaks'] = {}
+        state['cached'] = {}
+        return state
+
+    def cache_stats(self):
+        """
+        Returns the hits and misses of the sentence caches of all workers.
+        """
+        return (
+            sum(hits for hits, _ in self.cached.values()),
+            sum(misses for _, misses in self.cached.values()),
+        )
 
 
 class ProgressParallelPreprocessor(ParallelPreprocessor):
     """
     Preprocessor that implements both multiprocessing and a progress bar.
-    Note: had to jump through a lot of hoops just to get a progress bar, not
-    sure it was worth it or that this performs the most effectively ...
     """
 
-    def on_result(self, pbar):
+    def on_start(self, fileids, pending):
         """
-        Indicates progress on result.
+        Setup the progress bar, starting from the completed documents.
         """
+        super(ProgressParallelPreprocessor, self).on_start(fileids, pending)
+        self.pbar = tqdm(
+            total=len(fileids), initial=len(fileids) - len(pending), unit='Docs'
+        )
 
-        def inner(result):
-            pbar.update(1)
-            self.results.append(result)
-        return inner
+    def on_result(self, fileid, result, error):
+        """
+        Indicates progress as each document is completed or fails.
+        """
+        self.pbar.update(1)
+        super(ProgressParallelPreprocessor, self).on_result(fileid, result, error)
 
-    def transform(self, fileids=None, categories=None):
+    def on_finish(self):
+        super(ProgressParallelPreprocessor, self).on_finish()
+        self.pbar.close()
+
+
+class ParallelShardedPreprocessor(ShardedPreprocessor, ParallelPreprocessor):
+    """
+    Processes documents with a process pool, writing the results into a
+    sharded store as they are received in the main process.
+    """
+    pass
+
+
+class ProgressParallelShardedPreprocessor(ShardedPreprocessor, ProgressParallelPreprocessor):
+    """
+    Writes a sharded store in parallel while displaying a progress bar.
+    """
+    pass
+
+
+class ParallelColumnarPreprocessor(ColumnarPreprocessor, ParallelPreprocessor):
+    """
+    Processes documents with a process pool, writing the results into a
+    columnar store as they are received in the main process.
+    """
+    pass
+
+
+class ProgressParallelColumnarPreprocessor(ColumnarPreprocessor, ProgressParallelPreprocessor):
+    """
+    Writes a columnar store in parallel while displaying a progress bar.
+    """
+    pass
+
+
+##########################################################################
+## Pipeline Preprocessor
+##########################################################################
+
+class Stage(object):
+    """
+    A stage of the preprocessing pipeline: a bounded inbox of documents and
+    the number of thread or process workers that consume it, along with
+    counters of the documents processed and of the time spent processing
+    them that are shared with the worker processes.
+    """
+
+    def __init__(self, name, workers, inbox):
+        self.name = name
+        self.workers = workers
+        self.inbox = inbox
+        self.processed = mp.Value('l', 0)
+        self.busy = mp.Value('d', 0.0)
+
+    def depth(self):
         """
-        Setup the progress bar before conducting multiprocess transform.
+        Returns the number of documents waiting in the inbox of the stage.
         """
+        if self.inbox is None:
+            return None
 
-        # Make the target directory if it doesn't already exist
-        if not os.path.exists(self.target):
-            os.makedirs(self.target)
+        try:
+            return self.inbox.qsize()
+        except NotImplementedError:
+            # Not implemented for multiprocessing queues on Mac OS X
+            return None
 
-        # First shutil.copy anything in the root directory.
-        self.replicate(self.corpus.root)
+    def stats(self, elapsed):
+        """
+        Returns the queue depth, the number of documents processed, the
+        throughput in documents per second and the utilization of workers.
+        """
+        capacity = elapsed * self.workers
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'depth': self.depth(),
+            'processed': self.processed.value,
+            'throughput': self.processed.value / elapsed if elapsed > 0 else 0.0,
+            'utilization': self.busy.value / capacity if capacity > 0 else 0.0,
+        }
+
+
+class PipelinePreprocessor(Preprocessor):
+    """
+    Preprocesses documents with a staged pipeline so that I/O and CPU work
+    overlap: a reader thread reads the raw JSON documents, a pool of parse
+    processes extracts their paragraphs with readability and lxml, a pool of
+    tag processes segments, tokenizes and tags them, and a writer thread
+    pickles the tagged documents to the target. Each pair of stages is
+    connected by a bounded queue so that a slow stage applies backpressure
+    to the stages before it rather than accumulating documents in memory.
+
+    The queue depth, throughput, and worker utilization of every stage are
+    returned by ``stats`` while the pipeline is running and after it ends;
+    the stage with full queues before it and busy workers is the
+    bottleneck. As in the parallel preprocessor, exceptions raised while
+    processing a document are collected in ``errors``, and if a worker
+    process dies a MinkeError is raised.
+    """
 
-        # Reset the results
-        self.results = []
-        fileids = self.fileids(fileids, categories)
+    def __init__(self, *args, **kwargs):
+        """
+        Get pipeline-specific arguments and then call super.
+        """
+        self.parse_tasks = kwargs.pop('parse_tasks', settings.preprocess.parse_tasks)
+        self.tag_tasks   = kwargs.pop('tag_tasks', settings.preprocess.tag_tasks)
+        self.queue_size  = kwargs.pop('queue_size', settings.preprocess.queue_size)
+        super(PipelinePreprocessor, self).__init__(*args, **kwargs)
+
+        self.stages = []
+        self.errors = []
+        self._started = None
+        self._finished = None
 
-        # Get the total corpus size for per byte counting and create pbar
-        with tqdm(total=len(fileids), unit='Docs') as pbar:
+    def parse(self, raw):
+        """
+        Decodes a raw JSON document and returns the paragraphs of its content.
+        """
+        document = json.loads(raw)
+        if document.get('content') is None:
+            return []
+
+        feed = (document.get('feed') or {}).get('$oid')
+        return self.corpus.parse(document['content'], feed)
 
-            # Create a multiprocessing pool
-            pool  = mp.Pool(processes=self.tasks)
-            tasks = [
-                pool.apply_async(self.process, (fileid,), callback=self.on_result(pbar))
-                for fileid in fileids
+    def tagged(self, paragraphs):
+        """
+        Returns the list of tagged paragraphs of the parsed paragraphs.
+        """
+        return list(self.tag(paragraphs))
+
+    def on_result(self, fileid, result, error):
+        """
+        Records failures as (fileid, traceback) tuples.
+        """
+        super(PipelinePreprocessor, self).on_result(fileid, result, error)
+        if error is not None:
+            self.errors.append((fileid, error))
+
+    def stats(self):
+        """
+        Returns the statistics of every stage of the running (or finished)
+        pipeline.
+        """
+        if self._started is None:
+            return []
+        elapsed = (self._finished or time.time()) - self._started
+        return [stage.stats(elapsed) for stage in self.stages]
+
+    def execute(self, fileids):
+        """
+        Runs the fileids through the pipeline, yielding the result of every
+        document as it is written (in completion order).
+        """
+        self.errors = []
+        size = lambda workers: self.queue_size or 2 * workers
+
+        read  = Stage('read', 1, None)
+        parse = Stage('parse', self.parse_tasks, mp.Queue(size(self.parse_tasks)))
+        tag   = Stage('tag', self.tag_tasks, mp.Queue(size(self.tag_tasks)))
+        write = Stage('write', 1, mp.Queue(size(1)))
+        self.stages = [read, parse, tag, write]
+        self._started, self._finished = time.time(), None
+
+        results = queue.Queue()
+        stopped = threading.Event()
+        done = object()
+
+        def put(inbox, item):
+            # Block while the inbox is full unless the pipeline is stopped
+            while not stopped.is_set():
+                try:
+                    return inbox.put(item, timeout=POLL_INTERVAL)
+                except queue.Full:
+                    continue
+
+        def reader():
+            try:
+                for fileid in fileids:
+                    if stopped.is_set():
+                        return
+
+                    self.journal.dispatch(fileid)
+                    started = time.time()
+                    try:
+                        target = self.check(fileid)
+                        if target is None:
+                            results.put((fileid, None, None))
+                            continue
+
+                        path = self.corpus.abspath(fileid)
+                        with codecs.open(path, 'r', encoding=self.corpus.encoding(fileid)) as f:
+                            item = (fileid, target, f.read(), None)
+                    except Exception:
+                        item = (fileid, None, None, traceback.format_exc())
+
+                    read.busy.value += time.time() - started
+                    read.processed.value += 1
+                    put(parse.inbox, item)
+            finally:
+                for _ in range(self.parse_tasks):
+                    put(parse.inbox, None)
+
+        def writer():
+            while not stopped.is_set():
+                try:
+                    item = write.inbox.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+
+                if item is None:
+                    results.put(done)
+                    return
+
+                fileid, target, document, error = item
+                started = time.time()
+                result = None
+                if error is None:
+                    try:
+                        result = self.write(fileid, target, document)
+                    except Exception:
+                        error = traceback.format_exc()
+
+                write.busy.value += time.time() - started
+                write.processed.value += 1
+                results.put((fileid, result, error))
+
+        def processes(stage, func, outbox):
+            return [
+                mp.Process(target=_stage, args=(func, stage, outbox))
+                for _ in range(stage.workers)
             ]
 
-            # Close the pool and join
-            pool.close()
-            pool.join()
+        workers = {
+            parse: processes(parse, self.parse, tag.inbox),
+            tag:   processes(tag, self.tagged, write.inbox),
+        }
+        threads = [
+            threading.Thread(target=reader), threading.Thread(target=writer),
+        ]
+
+        try:
+            for process in workers[parse] + workers[tag]:
+                process.daemon = True
+                process.start()
+
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+
+            # Stop each stage once the stage before it has finished
+            chained = [(parse, tag), (tag, write)]
+            while True:
+                try:
+                    item = results.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    item = None
+
+                for process in workers[parse] + workers[tag]:
+                    if process.exitcode not in (None, 0):
+                        raise MinkeError(
+                            "worker process {} exited with code {}, its "
+                            "documents were lost".format(process.pid, process.exitcode)
+                        )
+
+                while chained and not any(
+                    process.is_alive() for process in workers[chained[0][0]]
+                ):
+                    stage, following = chained.pop(0)
+                    for _ in range(following.workers):
+                        put(following.inbox, None)
+
+                if item is None:
+                    continue
+                if item is done:
+                    break
+
+                fileid, result, error = item
+                self.on_result(fileid, result, error)
+                if error is None:
+                    yield result
+
+        finally:
+            self._finished = time.time()
+            stopped.set()
+            for process in workers[parse] + workers[tag]:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+
+            for thread in threads:
+                thread.join()
+
+            # Don't wait to flush documents to the queues of an aborted run
+            for stage in (parse, tag, write):
+                stage.inbox.cancel_join_thread()
+
+    def __getstate__(self):
+        """
+        The stages, progress bar and errors stay in the main process.
+        """
+        state = super(PipelinePreprocessor, self).__getstate__()
+        state.pop('pbar', None)
+        state['stages'] = []
+        state['errors'] = []
+        return state
+
+
+class ProgressPipelinePreprocessor(PipelinePreprocessor, ProgressPreprocessor):
+    """
+    Runs the staged pipeline while displaying a progress bar along with the
+    queue depth before each stage.
+    """
 
-        return self.results
+    def on_result(self, fileid, result, error):
+        super(ProgressPipelinePreprocessor, self).on_result(fileid, result, error)
+        self.pbar.set_postfix(OrderedDict(
+            (stage['stage'], stage['depth']) for stage in self.stats()[1:]
+        ), refresh=False)
+
+
+##########################################################################
+## Multiprocessing Helpers
+##########################################################################
+
+# The preprocessor of a worker process, installed once by the initializer.
+_preprocessor = None
+
+
+# The queue the worker process puts its results on.
+_results = None
+
+
+def peak_memory():
+    """
+    Returns the peak resident memory of the current process in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _initialize(preprocessor, results=None):
+    """
+    Installs the preprocessor and the results queue in a worker process when
+    it starts so that they are not pickled along with every task, and loads
+    the models of the preprocessor up front.
+    """
+    global _preprocessor, _results
+    _preprocessor = preprocessor.load()
+    _results = results
+
+
+def _process(cid, fileids):
+    """
+    Processes a chunk of fileids in a worker process, putting the pid, the
+    chunk id, a list of the fileid, the result and None for each document
+    (or if an exception is raised, the fileid, None and the formatted
+    traceback so that one bad document doesn't fail the transform), the
+    unprocessed fileids, the peak memory and the sentence cache statistics
+    on the results queue.
+
+    If the peak memory passes the memory limit after a document, the rest of
+    the chunk is returned unprocessed and the worker exits so that the pool
+    replaces it. Defined at the module level so it can be pickled.
+    """
+    results = []
+    limit = _preprocessor.memory_limit
+
+    # The statistics of this worker's cache rather than of all the workers
+    cached = lambda: Preprocessor.cache_stats(_preprocessor)
+    for idx, fileid in enumerate(fileids):
+        try:
+            results.append((fileid, _preprocessor.process(fileid), None))
+        except Exception:
+            results.append((fileid, None, traceback.format_exc()))
+
+        peak = peak_memory()
+        if limit is not None and peak > limit:
+            _results.put((
+                os.getpid(), cid, results, fileids[idx+1:], peak,
+                cached(),
+            ))
+            _results.close()
+            _results.join_thread()
+            os._exit(0)
+
+    _results.put((
+        os.getpid(), cid, results, None, peak_memory(),
+        cached(),
+    ))
+
+
+def _stage(func, stage, outbox):
+    """
+    Runs in the worker processes of a pipeline stage, applying the function
+    to the payload of every document in the stage inbox and putting the
+    result in the outbox, until it receives None. Documents that have
+    already failed are passed through, and exceptions are passed on as the
+    formatted traceback so that one bad document doesn't stop the pipeline.
+    """
+    while True:
+        item = stage.inbox.get()
+        if item is None:
+            return
+
+        fileid, target, payload, error = item
+        started = time.time()
+        if error is None:
+            try:
+                payload = func(payload)
+            except Exception:
+                payload, error = None, traceback.format_exc()
+
+        with stage.busy.get_lock():
+            stage.busy.value += time.time() - started
+        with stage.processed.get_lock():
+            stage.processed.value += 1
+
+        outbox.put((fileid, target, payload, error))
 
 
 if __name__ == '__main__':
@@ -341,8 +1571,24 @@ if __name__ == '__main__':
     TARGET  = os.path.join(PROJECT, "fixtures", "tagged")
 
     from corpus import BaleenCorpusReader
+    from minke.utils.timer import Timer
 
     corpus = BaleenCorpusReader(CORPUS)
+
+    # Benchmark tagging per sentence against batch tagging per document
+    fileids = corpus.fileids()[:100]
+    for batch in (False, True):
+        tokenizer = Preprocessor(corpus, TARGET, batch=batch).load()
+        with Timer() as timer:
+            tagged = [list(tokenizer.tokenize(fileid)) for fileid in fileids]
+        print("batch={}: {:0.3f} seconds per document".format(
+            batch, timer.elapsed / len(fileids)
+        ))
+
+        if batch and tagged != expected:
+            print("batch tagging output differs from per sentence tagging!")
+        expected = tagged
+
     transformer = ProgressPreprocessor(corpus, TARGET)
     docs = transformer.transform()
     print(len(list(docs)))
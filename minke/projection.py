@@ -0,0 +1,368 @@
+# minke.projection
+# Streaming projection of fields from JSON documents.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: projection.py [] benjamin@bengfort.com $
+
+"""
+Streaming projection of fields from JSON documents.
+
+Most metadata consumers only need a few small fields of a Baleen document,
+but ``json.load`` decodes the entire document including the large HTML
+``content`` string. The ``FieldProjector`` instead scans the document in
+blocks, decoding only the values of the requested fields and skipping over
+all other values (strings are skipped with the C string scanner of the json
+module, without building any Python objects for the containers around them).
+Scanning stops, and no more of the file is read, as soon as every requested
+field has been found.
+
+If one of the requested fields is the bulk of the document (by default the
+``content`` field) there is nothing to gain from skipping the rest, so the
+document is simply decoded with ``json.load`` and the fields looked up.
+Fields can also be requested raw, in which case the undecoded JSON text of
+the value is returned, e.g. to hash the content without decoding it.
+
+Fields are specified as dotted paths into nested objects, for example
+``feed.$oid`` or ``pubdate.$date``.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import re
+import json
+
+from io import StringIO
+from json.decoder import scanstring
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+BLOCK_SIZE = 8192       # Number of characters to read from the file at a time
+BULK       = ('content',) # Fields that are most of the size of a document
+WHITESPACE = " \t\n\r"
+SCALAR     = re.compile(r'[^\s,\]}]+')
+STRUCTURAL = re.compile(r'["\[\]{}]')
+ESCAPE     = 6          # Length of the longest string escape, \uXXXX
+
+# Marks a leaf of the field trie; the value is the full path of the field.
+LEAF = None
+
+
+##########################################################################
+## Exceptions
+##########################################################################
+
+class _Incomplete(Exception):
+    """
+    Raised when the scanner reaches the end of the buffer before the end of
+    the file; the caller reads another block and tries again.
+    """
+    pass
+
+
+class _Complete(Exception):
+    """
+    Raised when every requested field has been found to stop scanning.
+    """
+    pass
+
+
+##########################################################################
+## Field Projector
+##########################################################################
+
+class FieldProjector(object):
+    """
+    Extracts the values of the given dotted field paths from JSON documents.
+    A projector compiles the paths once and can be reused for many files.
+    """
+
+    def __init__(self, fields, block_size=BLOCK_SIZE, bulk=BULK, raw=()):
+        self.fields = list(fields)
+        self.block_size = block_size
+        self.decoder = json.JSONDecoder()
+
+        # Fields whose JSON text is returned rather than decoded
+        self.raw = set(raw)
+        if not self.raw.issubset(self.fields):
+            raise ValueError("Raw fields must also be projected")
+
+        # Decode the whole document if a bulk field is requested decoded
+        self.decode = any(
+            field.split('.')[0] in bulk for field in self.fields
+            if field not in self.raw
+        )
+        if self.decode and self.raw:
+            raise ValueError("Cannot project raw fields along with bulk fields")
+
+        # Compile the field paths into a trie of nested keys
+        self.trie = {}
+        for field in self.fields:
+            node = self.trie
+            for key in field.split('.'):
+                node = node.setdefault(key, {})
+            node[LEAF] = field
+
+    def project(self, stream):
+        """
+        Reads the JSON object from the file-like stream and returns a dict of
+        the values of the requested fields that were found in it, keyed by
+        their paths. Fields that are missing from the document are omitted.
+        """
+        if self.decode:
+            return self._project_decoded(json.load(stream))
+
+        self._stream = stream
+        self._buf = ""
+        self._eof = False
+        self._found = {}
+
+        # The scan states of a container or string that exceeded the buffer
+        self._container = None
+        self._string = None
+
+        try:
+            pos = self._whitespace(0)
+            if self._char(pos) != '{':
+                raise ValueError("Projected JSON documents must be objects")
+            self._object(pos, self.trie)
+        except _Complete:
+            pass
+        finally:
+            self._stream = None
+            self._buf = ""
+
+        return self._found
+
+    def project_string(self, data):
+        """
+        Projects the fields from a JSON string rather than a stream.
+        """
+        return self.project(StringIO(data))
+
+    def _project_decoded(self, document):
+        """
+        Looks up the requested fields in a completely decoded document.
+        """
+        if not isinstance(document, dict):
+            raise ValueError("Projected JSON documents must be objects")
+
+        found = {}
+        for field in self.fields:
+            value = document
+            for key in field.split('.'):
+                if not isinstance(value, dict) or key not in value:
+                    break
+                value = value[key]
+            else:
+                found[field] = value
+        return found
+
+    ##////////////////////////////////////////////////////////////////////
+    ## Buffer management
+    ##////////////////////////////////////////////////////////////////////
+
+    def _fill(self):
+        """
+        Appends the next block of the stream to the buffer, raising a
+        ValueError if the document ends prematurely. Blocks grow with the
+        buffer so that scanning a large value rereads it a bounded number of
+        times.
+        """
+        if self._eof:
+            raise ValueError("Unexpected end of JSON document")
+
+        block = self._stream.read(max(self.block_size, len(self._buf)))
+        if not block:
+            self._eof = True
+            raise ValueError("Unexpected end of JSON document")
+        self._buf += block
+
+    def _char(self, pos):
+        while pos >= len(self._buf):
+            self._fill()
+        return self._buf[pos]
+
+    def _whitespace(self, pos):
+        while self._char(pos) in WHITESPACE:
+            pos += 1
+        return pos
+
+    ##////////////////////////////////////////////////////////////////////
+    ## Scanning
+    ##////////////////////////////////////////////////////////////////////
+
+    def _object(self, pos, node):
+        """
+        Scans the object starting at pos, decoding the values of keys that
+        are leaves of the trie node, descending into objects of keys that are
+        branches, and skipping everything else. Returns the end position.
+        """
+        pos = self._whitespace(pos + 1)
+        if self._char(pos) == '}':
+            return pos + 1
+
+        while True:
+            key, pos = self._decode(pos)
+            pos = self._whitespace(pos)
+            if self._char(pos) != ':':
+                raise ValueError("Expecting ':' delimiter at {}".format(pos))
+            pos = self._whitespace(pos + 1)
+
+            child = node.get(key)
+            if child is None:
+                pos = self._skip(pos)
+            elif child.get(LEAF) in self.raw:
+                end = self._skip(pos)
+                self._collect(child, self._buf[pos:end])
+                pos = end
+            elif LEAF in child:
+                value, pos = self._decode(pos)
+                self._collect(child, value)
+            elif self._char(pos) == '{':
+                pos = self._object(pos, child)
+            else:
+                pos = self._skip(pos)
+
+            pos = self._whitespace(pos)
+            char = self._char(pos)
+            if char == '}':
+                return pos + 1
+            if char != ',':
+                raise ValueError("Expecting ',' delimiter at {}".format(pos))
+            pos = self._whitespace(pos + 1)
+
+    def _collect(self, node, value):
+        """
+        Records the value of a leaf and of any requested descendant paths.
+        """
+        for key, child in node.items():
+            if key is LEAF:
+                self._found[child] = value
+            elif isinstance(value, dict) and key in value:
+                self._collect(child, value[key])
+
+        if len(self._found) == len(self.fields):
+            raise _Complete()
+
+    def _decode(self, pos):
+        """
+        Decodes the complete JSON value at pos, reading more of the stream
+        until the value is complete. Returns the value and the end position.
+        """
+        while True:
+            try:
+                self._end(pos)
+                return self.decoder.raw_decode(self._buf, pos)
+            except _Incomplete:
+                self._fill()
+
+    def _end(self, pos):
+        """
+        Returns the end position of the value at pos, raising _Incomplete if
+        the value extends beyond the buffer.
+        """
+        try:
+            return self._scan(pos)
+        except IndexError:
+            raise _Incomplete()
+
+    def _skip(self, pos):
+        """
+        Returns the end of the value at pos without decoding it.
+        """
+        while True:
+            try:
+                return self._end(pos)
+            except _Incomplete:
+                self._fill()
+
+    def _scan(self, pos):
+        """
+        Finds the end of the value at pos in the current buffer. Strings are
+        skipped by matching up to the unescaped closing quote, containers by
+        counting their depth, and scalars by matching up to a delimiter. If a
+        string or container extends beyond the buffer, the scan resumes from
+        where it stopped once more of the stream has been read.
+        """
+        buf = self._buf
+        char = buf[pos]
+
+        if char == '"':
+            return self._scan_string(pos)
+
+        if char in '[{':
+            start, depth = pos, 0
+            if self._container is not None and self._container[0] == start:
+                _, depth, pos = self._container
+
+            while True:
+                match = STRUCTURAL.search(buf, pos)
+                if match is None:
+                    self._container = (start, depth, len(buf))
+                    raise IndexError(pos)
+
+                pos = match.start()
+                char = buf[pos]
+                if char == '"':
+                    try:
+                        pos = self._scan_string(pos)
+                    except IndexError:
+                        self._container = (start, depth, pos)
+                        raise
+                    continue
+
+                depth += 1 if char in '[{' else -1
+                pos += 1
+                if depth == 0:
+                    self._container = None
+                    return pos
+
+        match = SCALAR.match(buf, pos)
+        if match is None:
+            raise ValueError("Expecting value at {}".format(pos))
+        if match.end() == len(buf) and not self._eof:
+            # The scalar may continue in the next block
+            raise IndexError(pos)
+        return match.end()
+
+    def _scan_string(self, pos):
+        """
+        Returns the position after the closing quote of the string at pos.
+        """
+        idx = pos + 1
+        if self._string is not None and self._string[0] == pos:
+            idx = self._string[1]
+
+        try:
+            end = scanstring(self._buf, idx, False)[1]
+        except ValueError:
+            if self._eof:
+                raise
+
+            # The string continues past the buffer, resume from its tail
+            self._string = (pos, self._boundary(idx))
+            raise IndexError(pos)
+
+        self._string = None
+        return end
+
+    def _boundary(self, start):
+        """
+        Returns the last position in the buffer after start that cannot be
+        inside an escape sequence, i.e. that has no backslash in the escape
+        length before it, so a partially scanned string can be resumed there.
+        """
+        idx = len(self._buf)
+        while idx > start:
+            slash = self._buf.rfind('\\', max(start, idx - ESCAPE + 1), idx)
+            if slash < 0:
+                return idx
+            idx = slash
+        return start
@@ -0,0 +1,172 @@
+# minke.quarantine
+# Per-document time and size budgets and the quarantine of their outliers.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: quarantine.py [] benjamin@bengfort.com $
+
+"""
+Per-document time and size budgets and the quarantine of their outliers.
+
+A handful of pathological documents (huge pages, or markup that sends
+readability or punkt into a spin) can hold a worker for minutes. Documents
+whose input is larger than the size limit are not processed at all, and
+processing is interrupted when a document runs past the time limit. These
+documents, along with any that raise while being processed, are recorded in
+the quarantine log in the target: a log of JSON records, one per line, with
+the reason, the error message, the time spent on the document and its size.
+Workers append to the log directly so that the record survives the worker.
+
+The time limit is enforced with an interval timer, which is only available
+on Unix and only in the main thread of a process; elsewhere a document that
+runs over is quarantined once it completes. Python signal handlers also only
+run between bytecodes, so a single long call into lxml is not interrupted
+until it returns.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import json
+import time
+import signal
+
+from contextlib import contextmanager
+from minke.exceptions import DocumentTimeout
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+QUARANTINE = ".quarantine.log"
+
+# Quarantine reasons
+TIMEOUT  = "time"
+OVERSIZE = "size"
+ERROR    = "error"
+
+
+##########################################################################
+## Time Limits
+##########################################################################
+
+@contextmanager
+def time_limit(seconds):
+    """
+    Raises DocumentTimeout in the body of the context if it runs for longer
+    than seconds. Does nothing if seconds is None or if the interval timer is
+    not available in this thread, restoring any previous handler on exit.
+    """
+    def expired(signum, frame):
+        raise DocumentTimeout(
+            "exceeded the time limit of {:0.2f} seconds".format(seconds)
+        )
+
+    installed = False
+    if seconds is not None and hasattr(signal, 'setitimer'):
+        try:
+            previous = signal.signal(signal.SIGALRM, expired)
+            installed = True
+        except ValueError:
+            # Signal handlers can only be installed in the main thread
+            pass
+
+    if not installed:
+        yield
+        return
+
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        if previous is None:
+            previous = signal.SIG_DFL
+        signal.signal(signal.SIGALRM, previous)
+
+
+##########################################################################
+## Quarantine Log
+##########################################################################
+
+class Quarantine(object):
+    """
+    Appends the documents quarantined by a preprocessing job to the log at
+    path. Each record is written with a single append so that the workers of
+    the parallel preprocessors can share the log without a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def add(self, fileid, reason, message, elapsed, size):
+        """
+        Records that the fileid was quarantined for the reason (time, size or
+        error) after elapsed seconds, along with its size in bytes.
+        """
+        record = {
+            'fileid': fileid, 'reason': reason, 'message': message,
+            'elapsed': elapsed, 'size': size, 'time': time.time(),
+        }
+
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+
+    def reset(self):
+        """
+        Removes the log, e.g. when a job is started over.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def records(self, since=None):
+        """
+        Reads the records of the log, ignoring partially written lines,
+        optionally only those written at or after the since timestamp. A
+        document quarantined more than once is reported by its last record.
+        """
+        records = {}
+        if not os.path.exists(self.path):
+            return []
+
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+
+                if since is not None and record['time'] < since:
+                    continue
+                records[record['fileid']] = record
+
+        return list(records.values())
+
+    def summary(self, since=None):
+        """
+        Summarizes the records by reason with the number of documents and the
+        median and maximum time and size, which are used to tune the limits.
+        """
+        reasons = {}
+        for record in self.records(since):
+            reasons.setdefault(record['reason'], []).append(record)
+
+        summary = {}
+        for reason, records in reasons.items():
+            elapsed = sorted(record['elapsed'] for record in records)
+            sizes = sorted(record['size'] for record in records)
+            summary[reason] = {
+                'documents': len(records),
+                'median_elapsed': elapsed[len(elapsed) // 2],
+                'max_elapsed': elapsed[-1],
+                'median_size': sizes[len(sizes) // 2],
+                'max_size': sizes[-1],
+            }
+        return summary
+
+    def __len__(self):
+        return len(self.records())
@@ -0,0 +1,260 @@
+# minke.shards
+# A sharded container format for storing many pickled documents.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: shards.py [] benjamin@bengfort.com $
+
+"""
+A sharded container format for storing many pickled documents.
+
+Rather than writing one pickle file per document (hundreds of thousands of
+tiny files that each require an open, stat, and close) the sharded store
+appends pickled documents to a small number of large segment files. Each
+segment ends with an offset table of the documents it contains followed by a
+fixed size footer that points to the table, and a global index in the root
+of the store maps every fileid to its segment, offset, and length.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import pickle
+import struct
+
+from itertools import groupby
+from operator import itemgetter
+from six import string_types
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+SHARD_INDEX  = "shards.index"
+SEGMENT_NAME = "segment-{:05d}.shard"
+SEGMENT_SIZE = 268435456 # Roll over to a new segment after 256 MiB
+FOOTER       = struct.Struct('<Q')
+VERSION      = 1
+
+
+##########################################################################
+## Shard Writer
+##########################################################################
+
+class ShardWriter(object):
+    """
+    Appends pickled documents to segment files in the root directory. If an
+    index already exists in the root, new documents are appended to new
+    segments so that existing segments are never modified. Writing a fileid
+    that already exists replaces its index entry; the old bytes are simply
+    no longer referenced.
+
+    Segments are written to a temporary file and renamed into place when
+    they are finished, and the index is saved after every segment, so that
+    a crash only loses the documents in the currently open segment.
+    """
+
+    def __init__(self, root, segment_size=SEGMENT_SIZE):
+        self.root = root
+        self.segment_size = segment_size
+
+        # Load the existing index to append to it
+        index = ShardReader.load_index(root)
+        self.segments = index['segments']
+        self.fileids  = index['fileids']
+
+        # State of the currently open segment
+        self._segment = None
+        self._table   = None
+        self._handle  = None
+
+    def write(self, fileid, document):
+        """
+        Appends the document to the current segment, opening a new segment
+        as necessary and closing the current one when it is full.
+        """
+        if self._handle is None:
+            self._open_segment()
+
+        offset = self._handle.tell()
+        pickle.dump(document, self._handle, pickle.HIGHEST_PROTOCOL)
+        length = self._handle.tell() - offset
+
+        self._table[fileid] = (offset, length)
+        if self._handle.tell() >= self.segment_size:
+            self._close_segment()
+
+        return fileid
+
+    def close(self):
+        """
+        Finishes the currently open segment and saves the index.
+        """
+        if self._handle is not None:
+            self._close_segment()
+
+    def _open_segment(self):
+        """
+        Opens a new temporary segment file for writing.
+        """
+        self._segment = SEGMENT_NAME.format(len(self.segments))
+        self._table   = {}
+        self._handle  = open(self._path(self._segment) + '.tmp', 'wb')
+
+    def _close_segment(self):
+        """
+        Writes the offset table and footer, renames the segment into place,
+        then adds its documents to the global index and saves it.
+        """
+        table = self._handle.tell()
+        pickle.dump(self._table, self._handle, pickle.HIGHEST_PROTOCOL)
+        self._handle.write(FOOTER.pack(table))
+        self._handle.close()
+
+        path = self._path(self._segment)
+        os.rename(path + '.tmp', path)
+
+        idx = len(self.segments)
+        self.segments.append(self._segment)
+        for fileid, (offset, length) in self._table.items():
+            self.fileids[fileid] = (idx, offset, length)
+
+        self._segment, self._table, self._handle = None, None, None
+        self.save()
+
+    def save(self):
+        """
+        Atomically writes the global index to the root of the store.
+        """
+        path = self._path(SHARD_INDEX)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump({
+                'version': VERSION,
+                'segments': self.segments,
+                'fileids': self.fileids,
+            }, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(path + '.tmp', path)
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def __contains__(self, fileid):
+        return fileid in self.fileids or (
+            self._table is not None and fileid in self._table
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, tb):
+        self.close()
+
+
+##########################################################################
+## Shard Reader
+##########################################################################
+
+class ShardReader(object):
+    """
+    Reads pickled documents from the segments of a sharded store, either by
+    seeking directly to a single document or by streaming every document in
+    a segment sequentially with a single open file handle.
+    """
+
+    def __init__(self, root):
+        self.root  = root
+        index = self.load_index(root)
+        self.segments = index['segments']
+        self.index    = index['fileids']
+
+    @staticmethod
+    def exists(root):
+        """
+        Returns True if the root directory contains a sharded store.
+        """
+        return os.path.exists(os.path.join(root, SHARD_INDEX))
+
+    @staticmethod
+    def load_index(root):
+        """
+        Loads the global index, rebuilding it from the segment footers if it
+        is missing. Returns an empty index if there are no segments at all.
+        """
+        try:
+            with open(os.path.join(root, SHARD_INDEX), 'rb') as f:
+                index = pickle.load(f)
+            if index.get('version') == VERSION:
+                return index
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            pass
+
+        return ShardReader.rebuild_index(root)
+
+    @staticmethod
+    def rebuild_index(root):
+        """
+        Reconstructs the global index from the offset table of every finished
+        segment in the root directory, in segment order.
+        """
+        index = {'version': VERSION, 'segments': [], 'fileids': {}}
+        if not os.path.isdir(root):
+            return index
+
+        names = sorted(
+            name for name in os.listdir(root) if name.endswith('.shard')
+        )
+
+        for idx, name in enumerate(names):
+            index['segments'].append(name)
+            with open(os.path.join(root, name), 'rb') as f:
+                f.seek(-FOOTER.size, os.SEEK_END)
+                f.seek(FOOTER.unpack(f.read(FOOTER.size))[0])
+                for fileid, (offset, length) in pickle.load(f).items():
+                    index['fileids'][fileid] = (idx, offset, length)
+
+        return index
+
+    def fileids(self):
+        """
+        Returns the sorted list of fileids contained in the store.
+        """
+        return sorted(self.index)
+
+    def size(self, fileid):
+        """
+        Returns the length in bytes of the pickled document.
+        """
+        return self.index[fileid][2]
+
+    def read(self, fileid):
+        """
+        Seeks to and loads a single document from its segment.
+        """
+        segment, offset, length = self.index[fileid]
+        with open(os.path.join(self.root, self.segments[segment]), 'rb') as f:
+            f.seek(offset)
+            return pickle.loads(f.read(length))
+
+    def documents(self, fileids=None):
+        """
+        Streams documents from the store, grouped by segment and in the order
+        they were written so that each segment is opened once and read
+        sequentially. Note that documents are not yielded in fileid order.
+        """
+        if fileids is None:
+            fileids = self.index.keys()
+        elif isinstance(fileids, string_types):
+            fileids = [fileids]
+
+        locations = sorted(self.index[fileid] for fileid in fileids)
+        for segment, group in groupby(locations, key=itemgetter(0)):
+            path = os.path.join(self.root, self.segments[segment])
+            with open(path, 'rb') as f:
+                for _, offset, length in group:
+                    if f.tell() != offset:
+                        f.seek(offset)
+                    yield pickle.load(f)
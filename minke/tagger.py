@@ -0,0 +1,202 @@
+# minke.tagger
+# A vectorized part of speech tagger using the averaged perceptron model.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: tagger.py [] benjamin@bengfort.com $
+
+"""
+A vectorized part of speech tagger using the averaged perceptron model.
+
+NLTK's ``PerceptronTagger`` builds a dictionary of feature strings for every
+token and then loops over the weights of every feature and label in Python,
+which makes tagging the largest CPU cost of preprocessing. This tagger
+compiles the weights of the same trained model into a dense matrix with one
+row per feature and one column per label, so that a feature string is
+hashed once into its row index and the scores of every label are summed by
+NumPy. The sentences of a batch are tagged in lockstep: since the features
+of a token depend on the tags predicted for the two tokens before it, the
+tokens at each position of all sentences are scored together.
+
+The scores are accumulated in the same order as NLTK adds them and ties are
+broken in the same way, so the output is identical to ``PerceptronTagger``.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import numpy as np
+
+from nltk.tag.perceptron import PerceptronTagger
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# The number of features of a token, in the order NLTK sums their weights;
+# the features at these indices depend on the previously predicted tags.
+N_FEATURES = 14
+PREV_TAG, PREV2_TAG, PREV_TAGS, PREV_TAG_WORD = 3, 4, 5, 7
+
+
+##########################################################################
+## Vectorized Tagger
+##########################################################################
+
+class VectorizedPerceptronTagger(object):
+    """
+    Tags sentences with the weights, tag dictionary and normalization of a
+    trained nltk ``PerceptronTagger`` (by default the pretrained English
+    model), implementing the ``tag`` and ``tag_sents`` methods of nltk's
+    ``TaggerI`` interface.
+    """
+
+    def __init__(self, tagger=None):
+        if tagger is None:
+            tagger = PerceptronTagger()
+
+        self.start = list(tagger.START)
+        self.end = list(tagger.END)
+        self.normalize = tagger.normalize
+        self.tagdict = dict(tagger.tagdict)
+
+        # Labels are ordered so that argmax breaks ties like nltk, which
+        # selects the maximum of (score, label).
+        self.classes = sorted(tagger.model.classes, reverse=True)
+        column = dict((label, idx) for idx, label in enumerate(self.classes))
+
+        # The last row is all zeros for features the model has no weights for
+        features = list(tagger.model.weights)
+        self.index = dict((feature, idx) for idx, feature in enumerate(features))
+        self.missing = len(features)
+        self.weights = np.zeros((len(features) + 1, len(self.classes)), dtype=np.float64)
+
+        for idx, feature in enumerate(features):
+            for label, weight in tagger.model.weights[feature].items():
+                self.weights[idx, column[label]] = weight
+
+    def features(self, tokens, context):
+        """
+        Returns the row indices of the features of every token in the
+        sentence that do not depend on the predicted tags, leaving those
+        that do to be filled in as the sentence is tagged.
+        """
+        index, missing = self.index, self.missing
+        rows = np.full((len(tokens), N_FEATURES), missing, dtype=np.intp)
+
+        for i, word in enumerate(tokens):
+            c = i + len(self.start)
+            row = rows[i]
+            row[0]  = index.get("bias", missing)
+            row[1]  = index.get("i suffix " + word[-3:], missing)
+            row[2]  = index.get("i pref1 " + (word[0] if word else ""), missing)
+            row[6]  = index.get("i word " + context[c], missing)
+            row[8]  = index.get("i-1 word " + context[c-1], missing)
+            row[9]  = index.get("i-1 suffix " + context[c-1][-3:], missing)
+            row[10] = index.get("i-2 word " + context[c-2], missing)
+            row[11] = index.get("i+1 word " + context[c+1], missing)
+            row[12] = index.get("i+1 suffix " + context[c+1][-3:], missing)
+            row[13] = index.get("i+2 word " + context[c+2], missing)
+
+        return rows
+
+    def tag(self, tokens):
+        """
+        Tags a single tokenized sentence, returning (token, tag) tuples.
+        """
+        return self.tag_sents([tokens])[0]
+
+    def tag_sents(self, sentences):
+        """
+        Tags a batch of tokenized sentences, returning a list of (token, tag)
+        tuples for each sentence.
+        """
+        sentences = [list(sent) for sent in sentences]
+        tagged = [[None] * len(sent) for sent in sentences]
+
+        # Tag the longest sentences first so the active ones are a prefix
+        order = sorted(
+            range(len(sentences)), key=lambda idx: len(sentences[idx]), reverse=True
+        )
+        lengths = [len(sentences[idx]) for idx in order]
+        if not lengths or not lengths[0]:
+            return [[] for _ in sentences]
+
+        contexts, rows = [], []
+        for idx in order:
+            tokens = sentences[idx]
+            context = self.start + [self.normalize(w) for w in tokens] + self.end
+            contexts.append(context)
+            rows.append(self.features(tokens, context))
+
+        index, missing = self.index, self.missing
+        history = [tuple(self.start) for _ in order]
+        active = len(order)
+
+        for i in range(lengths[0]):
+            while lengths[active - 1] <= i:
+                active -= 1
+
+            # Fill in the features that depend on the previous two tags
+            block = np.empty((active, N_FEATURES), dtype=np.intp)
+            for s in range(active):
+                prev, prev2 = history[s]
+                row = block[s]
+                row[:] = rows[s][i]
+                row[PREV_TAG]  = index.get("i-1 tag " + prev, missing)
+                row[PREV2_TAG] = index.get("i-2 tag " + prev2, missing)
+                row[PREV_TAGS] = index.get("i tag+i-2 tag " + prev + " " + prev2, missing)
+                row[PREV_TAG_WORD] = index.get(
+                    "i-1 tag+i word " + prev + " " + contexts[s][i + len(self.start)],
+                    missing
+                )
+
+            # Sum the weights in the order of the features, like nltk
+            scores = self.weights[block[:, 0]]
+            for j in range(1, N_FEATURES):
+                scores += self.weights[block[:, j]]
+            best = scores.argmax(axis=1)
+
+            for s in range(active):
+                word = sentences[order[s]][i]
+                tag = self.tagdict.get(word) or self.classes[best[s]]
+                tagged[order[s]][i] = (word, tag)
+                history[s] = (tag, history[s][0])
+
+        return tagged
+
+
+if __name__ == '__main__':
+
+    import os
+    import time
+    import nltk
+
+    from minke.corpus import BaleenCorpusReader
+
+    PROJECT = os.path.join(os.path.dirname(__file__), "..")
+    CORPUS  = os.path.join(PROJECT, "fixtures", "sample")
+
+    corpus = BaleenCorpusReader(CORPUS)
+    sents  = [
+        nltk.wordpunct_tokenize(sent)
+        for fileid in corpus.fileids()[:100]
+        for sent in corpus.sents(fileids=fileid)
+    ]
+
+    # Benchmark the nltk tagger against the vectorized tagger
+    expected = None
+    for tagger in (PerceptronTagger(), VectorizedPerceptronTagger()):
+        started = time.time()
+        tagged = tagger.tag_sents(sents)
+        elapsed = time.time() - started
+        print("{}: {:0.1f} tokens per second".format(
+            tagger.__class__.__name__, sum(len(sent) for sent in sents) / elapsed
+        ))
+
+        if expected is not None and tagged != expected:
+            print("vectorized tagging output differs from the perceptron tagger!")
+        expected = tagged
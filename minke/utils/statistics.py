@@ -17,6 +17,9 @@ Helper functions for statistical computations.
 ## Imports
 ##########################################################################
 
+import math
+
+
 ##########################################################################
 ## Statistical computation functions
 ##########################################################################
@@ -54,3 +57,51 @@ def median(data, sort=True):
     jdx = num / 2
     idx = jdx - 1
     return (data[idx] + data[jdx]) / 2.0
+
+
+def variance(data):
+    """
+    Computes the unbiased sample variance of a list of numbers.
+    """
+    data = list(map(float, data))
+    if len(data) < 2:
+        return 0.0
+
+    mu = sum(data) / len(data)
+    return sum((x - mu) ** 2 for x in data) / (len(data) - 1)
+
+
+def zscore(confidence=0.95):
+    """
+    Returns the two-sided critical value of the standard normal distribution
+    for the given confidence level, found by bisection on the normal CDF.
+    """
+    target = 1.0 - (1.0 - confidence) / 2.0
+    low, high = 0.0, 10.0
+    for _ in range(64):
+        mid = (low + high) / 2.0
+        if 0.5 * (1.0 + math.erf(mid / math.sqrt(2.0))) < target:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2.0
+
+
+def stratified_total(strata, confidence=0.95):
+    """
+    Estimates the population total from a stratified random sample, where
+    strata is a list of (population size, sampled values) pairs. Returns the
+    estimate along with the lower and upper bounds of its confidence interval,
+    using the finite population correction for each stratum.
+    """
+    total, var = 0.0, 0.0
+    for size, values in strata:
+        if not values:
+            continue
+
+        n = len(values)
+        total += size * mean(values)
+        var += size * size * (1.0 - float(n) / size) * variance(values) / n
+
+    margin = zscore(confidence) * math.sqrt(var)
+    return total, total - margin, total + margin
@@ -21,6 +21,9 @@ import time
 
 from minke.utils.humanize import timedelta as humanizedelta
 
+# The CPU time of the process, time.clock before Python 3.3
+process_time = getattr(time, 'process_time', None) or time.clock
+
 
 ##########################################################################
 ## Timer functions
@@ -37,11 +40,11 @@ class Timer(object):
     def __init__(self, wall_clock=True):
         """
         If wall_clock is True then use time.time() to get the number of
-        actually elapsed seconds. If wall_clock is False, use time.clock to
-        get the process time instead.
+        actually elapsed seconds. If wall_clock is False, use the CPU time of
+        the process instead (time.clock was removed in Python 3.8).
         """
         self.wall_clock = wall_clock
-        self.time = time.time if wall_clock else time.clock
+        self.time = time.time if wall_clock else process_time
 
         # Stubs for serializing an empty timer.
         self.started  = None
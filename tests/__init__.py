@@ -17,6 +17,10 @@ Testing for the minke module
 ## Imports
 ##########################################################################
 
+import os
+import json
+import shutil
+import tempfile
 import unittest
 
 ##########################################################################
@@ -25,6 +29,42 @@ import unittest
 
 TEST_VERSION = "0.1" ## Also the expected version onf the package
 
+##########################################################################
+## Fixtures
+##########################################################################
+
+def make_corpus(root, docs):
+    """
+    Writes a tiny Baleen corpus of JSON documents to the root directory.
+    """
+    for fileid, doc in docs.items():
+        path = os.path.join(root, fileid)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        with open(path, 'w') as f:
+            json.dump(doc, f)
+
+    with open(os.path.join(root, 'feeds.json'), 'w') as f:
+        json.dump([], f)
+
+
+class CorpusTestCase(unittest.TestCase):
+    """
+    Writes the DOCS of the test case to a temporary corpus root before each
+    test and removes the root afterward.
+    """
+
+    DOCS = {}
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        make_corpus(self.root, self.DOCS)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+
 ##########################################################################
 ## Test Cases
 ##########################################################################
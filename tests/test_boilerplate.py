@@ -0,0 +1,117 @@
+# tests.test_boilerplate
+# Tests for filtering the boilerplate paragraphs of a feed.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_boilerplate.py [] benjamin@bengfort.com $
+
+"""
+Tests for filtering the boilerplate paragraphs of a feed.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import pickle
+
+from tests import CorpusTestCase
+from tests.test_preprocess import SimplePreprocessor
+from minke.corpus import BaleenCorpusReader
+from minke.boilerplate import BoilerplateFilter
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+FOOTER = '<p>Subscribe to  our newsletter!</p>'
+
+DOCS = {
+    "news/{:04x}.json".format(idx): {
+        'title': 'Document {}'.format(idx),
+        'feed': {'$oid': 'daily'},
+        'content': '<p>Story number {} of the day.</p>{}'.format(
+            idx, FOOTER if idx < 4 else ''
+        ),
+    }
+    for idx in range(6)
+}
+
+# A small feed under the minimum number of documents is left alone
+DOCS.update({
+    "tech/{:04x}.json".format(idx): {
+        'title': 'Post {}'.format(idx),
+        'feed': {'$oid': 'weekly'},
+        'content': '<p>Post number {} of the week.</p>{}'.format(idx, FOOTER),
+    }
+    for idx in range(2)
+})
+
+
+##########################################################################
+## Boilerplate Tests
+##########################################################################
+
+class BoilerplateFilterTests(CorpusTestCase):
+    """
+    Test learning and filtering the boilerplate paragraphs of feeds.
+    """
+
+    DOCS = DOCS
+
+    def setUp(self):
+        super(BoilerplateFilterTests, self).setUp()
+        self.corpus = BaleenCorpusReader(self.root, cache=False)
+
+    def test_fit(self):
+        """
+        Test that only paragraphs in most documents of a feed are boilerplate
+        """
+        boilerplate = BoilerplateFilter(0.5, 3).fit(self.corpus)
+        self.assertEqual(len(boilerplate), 1)
+        self.assertEqual(dict(boilerplate.feeds), {'daily': 1})
+
+        # The footer is matched irrespective of whitespace and case
+        self.assertEqual(
+            boilerplate.filter('daily', ['Story.', 'SUBSCRIBE to our\nnewsletter!']),
+            ['Story.']
+        )
+        self.assertEqual(
+            boilerplate.filter('weekly', ['Subscribe to our newsletter!']),
+            ['Subscribe to our newsletter!']
+        )
+
+        # The footer is in four of six documents, not more than three quarters
+        self.assertEqual(len(BoilerplateFilter(0.75, 3).fit(self.corpus)), 0)
+
+        with self.assertRaises(ValueError):
+            BoilerplateFilter(0.0)
+
+    def test_corpus_paras(self):
+        """
+        Test that the corpus reader drops the boilerplate paragraphs
+        """
+        self.corpus.boilerplate = BoilerplateFilter().fit(self.corpus)
+
+        paras = list(self.corpus.paras(fileids='news/0000.json'))
+        self.assertEqual(paras, ['Story number 0 of the day.'])
+
+        paras = list(self.corpus.paras(fileids='tech/0000.json'))
+        self.assertEqual(len(paras), 2)
+
+    def test_preprocess(self):
+        """
+        Test fitting the boilerplate filter when preprocessing
+        """
+        target = os.path.join(self.root, 'target')
+        transformer = SimplePreprocessor(self.corpus, target, boilerplate=0.5)
+        self.assertEqual(len(list(transformer.transform())), len(DOCS))
+        self.assertEqual(len(self.corpus.boilerplate), 1)
+        self.assertEqual(transformer.signature()[1]['boilerplate'], [0.5, 3])
+
+        with open(os.path.join(target, 'news', '0001.pickle'), 'rb') as f:
+            document = pickle.load(f)
+        self.assertEqual(len(document), 1)
@@ -0,0 +1,184 @@
+# tests.test_cache
+# Tests for the content-addressed readability cache.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_cache.py [] benjamin@bengfort.com $
+
+"""
+Tests for the content-addressed readability cache.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import gc
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from binascii import hexlify
+from minke.cache import ReadabilityCache, SentenceCache
+from minke.corpus import BaleenCorpusReader
+from tests import make_corpus
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+DOCS = {
+    'books/a1.json': {'content': '<p>Reading a book about caching.</p>'},
+    'books/b2.json': {'content': '<p>Writing a book about eviction.</p>'},
+    'news/c3.json': {'content': '<p>Caches are in the news today.</p>'},
+}
+
+
+##########################################################################
+## Cache Tests
+##########################################################################
+
+class ReadabilityCacheTests(unittest.TestCase):
+    """
+    Test the readability cache and its use by the corpus reader.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'cache', 'readability.db')
+
+    def tearDown(self):
+        # Finalize unclosed caches first, closing them removes their WAL files
+        gc.collect()
+        shutil.rmtree(self.root)
+
+    def test_key(self):
+        """
+        Test that keys depend on the content and the settings
+        """
+        key = ReadabilityCache.key("<p>content</p>")
+        self.assertEqual(key, ReadabilityCache.key("<p>content</p>", {}))
+        self.assertNotEqual(key, ReadabilityCache.key("<p>changed</p>"))
+        self.assertNotEqual(
+            key, ReadabilityCache.key("<p>content</p>", {'min_text_length': 10})
+        )
+
+    def test_roundtrip(self):
+        """
+        Test that cleaned html is stored and survives pickling the cache
+        """
+        cache = ReadabilityCache(self.path)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', u'<p>caf\xe9</p>')
+
+        cache = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(cache.get('a'), u'<p>caf\xe9</p>')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIn('a', cache)
+
+    def test_eviction(self):
+        """
+        Test that least recently used entries are evicted over capacity
+        """
+        cache = ReadabilityCache(self.path)
+        for idx in range(3):
+            cache.set(str(idx), hexlify(os.urandom(150)).decode('ascii'))
+        self.assertEqual(len(cache), 3)
+
+        # Cap the cache so that the next entry exceeds the capacity
+        cache.capacity = cache.size() + 10
+
+        # Touch the oldest entry so that the second is least recently used
+        cache.get('0')
+        cache.set('3', hexlify(os.urandom(150)).decode('ascii'))
+
+        self.assertLessEqual(cache.size(), cache.capacity)
+        self.assertNotIn('1', cache)
+        self.assertIn('0', cache)
+        self.assertIn('3', cache)
+
+    def test_size(self):
+        """
+        Test that the tracked size matches the database when replacing entries
+        """
+        cache = ReadabilityCache(self.path)
+        for idx in range(5):
+            cache.set('a', hexlify(os.urandom(100 * (idx + 1))).decode('ascii'))
+            cache.set('b', u'<p>b</p>')
+
+        tracked = cache.size()
+        cache._size = None
+        self.assertEqual(tracked, cache.size())
+
+    def test_touch(self):
+        """
+        Test that access times of hits are written in batches
+        """
+        cache = ReadabilityCache(self.path)
+        cache.set('a', u'<p>a</p>')
+        stored = cache.conn.execute("SELECT accessed FROM readability").fetchone()
+
+        cache.get('a')
+        self.assertEqual(
+            cache.conn.execute("SELECT accessed FROM readability").fetchone(), stored
+        )
+
+        cache.flush()
+        self.assertGreater(
+            cache.conn.execute("SELECT accessed FROM readability").fetchone(), stored
+        )
+
+    def test_reader(self):
+        """
+        Test that the corpus reader cleans html through the cache
+        """
+        corpus_root = os.path.join(self.root, 'corpus')
+        make_corpus(corpus_root, DOCS)
+
+        corpus = BaleenCorpusReader(corpus_root, cache=self.path)
+        first = list(corpus.html())
+        self.assertEqual(corpus.cache.misses, 3)
+        self.assertEqual(len(corpus.cache), 3)
+
+        self.assertEqual(list(corpus.html()), first)
+        self.assertEqual(corpus.cache.hits, 3)
+
+        uncached = BaleenCorpusReader(corpus_root, cache=False)
+        self.assertIsNone(uncached.cache)
+        self.assertEqual(list(uncached.html()), first)
+
+
+class SentenceCacheTests(unittest.TestCase):
+    """
+    Test the in-memory LRU cache of tagged sentences.
+    """
+
+    def test_lru(self):
+        """
+        Test that the least recently used sentence is evicted
+        """
+        cache = SentenceCache(2)
+        self.assertIsNone(cache.get(u'Read more.'))
+        cache.set(u'Read more.', [(u'Read', 'VB'), (u'more', 'JJR'), (u'.', '.')])
+        cache.set(u'Share this.', [(u'Share', 'NN'), (u'this', 'DT'), (u'.', '.')])
+
+        # Reading a sentence makes it the most recently used
+        tagged = cache.get(u'Read more.')
+        self.assertEqual(tagged, [(u'Read', 'VB'), (u'more', 'JJR'), (u'.', '.')])
+        tagged.append(('mutated', 'NN'))
+        self.assertEqual(len(cache.get(u'Read more.')), 3)
+
+        cache.set(u'Subscribe now!', [(u'Subscribe', 'VB'), (u'now', 'RB'), (u'!', '.')])
+        self.assertEqual(len(cache), 2)
+        self.assertIn(u'Read more.', cache)
+        self.assertNotIn(u'Share this.', cache)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertAlmostEqual(cache.hit_rate(), 2.0 / 3)
+
+        # Each worker process starts with an empty cache
+        cache = pickle.loads(pickle.dumps(cache))
+        self.assertEqual((len(cache), cache.hits, cache.capacity), (0, 0, 2))
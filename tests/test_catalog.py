@@ -0,0 +1,132 @@
+# tests.test_catalog
+# Tests for the SQLite metadata catalog.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_catalog.py [] benjamin@bengfort.com $
+
+"""
+Tests for the SQLite metadata catalog.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import json
+import hashlib
+
+from datetime import datetime
+from tests import CorpusTestCase
+from minke.catalog import timestamp
+from minke.corpus import BaleenCorpusReader
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+DOCS = {
+    'books/a1.json': {
+        'title': 'Reading', 'feed': {'$oid': 'f1'},
+        'pubdate': {'$date': timestamp('2016-05-01T12:00:00Z')},
+        'content': '<p>Reading.</p>',
+    },
+    'books/b2.json': {
+        'title': 'Writing', 'feed': {'$oid': 'f2'},
+        'pubdate': {'$date': timestamp('2016-05-03T12:00:00Z')},
+        'content': '<p>Writing.</p>',
+    },
+    'news/c3.json': {
+        'title': 'Breaking News', 'feed': {'$oid': 'f1'},
+        'content': '<p>News.</p>',
+    },
+}
+
+
+##########################################################################
+## Catalog Tests
+##########################################################################
+
+class MetadataCatalogTests(CorpusTestCase):
+    """
+    Test building and querying the metadata catalog.
+    """
+
+    DOCS = DOCS
+
+    def setUp(self):
+        super(MetadataCatalogTests, self).setUp()
+        self.corpus = BaleenCorpusReader(self.root, cache=False)
+
+    def test_timestamp(self):
+        """
+        Test conversion of dates to milliseconds since the epoch
+        """
+        self.assertEqual(timestamp(datetime(1970, 1, 2)), 86400000)
+        self.assertEqual(timestamp('1970-01-01T00:00:01Z'), 1000)
+        self.assertEqual(timestamp(42), 42)
+        self.assertIsNone(timestamp(None))
+
+    def test_select(self):
+        """
+        Test resolving filters into fileids with the catalog
+        """
+        with self.assertRaises(ValueError):
+            self.corpus.select(feed='f1')
+
+        self.assertEqual(self.corpus.catalog.build(self.corpus), (3, 0))
+        self.assertEqual(self.corpus.fileids(), sorted(DOCS))
+
+        self.assertEqual(
+            self.corpus.select(feed='f1'), ['books/a1.json', 'news/c3.json']
+        )
+        self.assertEqual(
+            self.corpus.select(start='2016-05-02', end=datetime(2016, 6, 1)),
+            ['books/b2.json']
+        )
+        self.assertEqual(
+            self.corpus.select(feed=['f1', 'f2'], categories='books'),
+            ['books/a1.json', 'books/b2.json']
+        )
+        self.assertEqual(self.corpus.select(title='News'), ['news/c3.json'])
+
+    def test_incremental(self):
+        """
+        Test that only changed documents are cataloged again
+        """
+        self.corpus.catalog.build(self.corpus)
+        self.assertEqual(self.corpus.catalog.build(self.corpus), (0, 0))
+
+        path = os.path.join(self.root, 'books/a1.json')
+        with open(path, 'w') as f:
+            json.dump(dict(DOCS['books/a1.json'], title='Rereading'), f)
+        os.remove(os.path.join(self.root, 'news/c3.json'))
+
+        corpus = BaleenCorpusReader(self.root, cache=False)
+        self.assertEqual(corpus.catalog.build(corpus), (1, 1))
+        self.assertEqual(corpus.select(title='Rereading'), ['books/a1.json'])
+        self.assertEqual(len(corpus.catalog), 2)
+
+    def test_columns(self):
+        """
+        Test the columnar metadata export
+        """
+        self.corpus.catalog.build(self.corpus)
+        columns = self.corpus.catalog.columns(['fileid', 'pubdate', 'size'])
+
+        self.assertEqual(list(columns), ['fileid', 'pubdate', 'size'])
+        self.assertEqual(columns['fileid'].tolist(), sorted(DOCS))
+        self.assertEqual(columns['pubdate'][2], -1)
+        self.assertTrue((columns['size'] > 0).all())
+
+        books = self.corpus.catalog.columns(categories='books')
+        self.assertEqual(len(books['hash']), 2)
+        self.assertEqual(
+            books['hash'][0],
+            hashlib.sha1(
+                json.dumps(DOCS['books/a1.json']['content']).encode('utf-8')
+            ).hexdigest()
+        )
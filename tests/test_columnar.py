@@ -0,0 +1,140 @@
+# tests.test_columnar
+# Tests for the memory-mapped columnar token store.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_columnar.py [] benjamin@bengfort.com $
+
+"""
+Tests for the memory-mapped columnar token store.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import shutil
+import tempfile
+import unittest
+
+from minke.columnar import ColumnarWriter, ColumnarReader
+from minke.corpus import BaleenColumnarCorpusReader
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+DOCS = {
+    'books/a1.pickle': [
+        [[('The', 'DT'), ('book', 'NN'), ('.', '.')], [('Read', 'VB'), ('it', 'PRP')]],
+        [[('A', 'DT'), ('book', 'NN')]],
+    ],
+    'books/b2.pickle': [],
+    'news/c3.pickle': [
+        [],
+        [[('News', 'NN'), ('!', '.')]],
+    ],
+}
+
+
+##########################################################################
+## Columnar Tests
+##########################################################################
+
+class ColumnarTests(unittest.TestCase):
+    """
+    Test the columnar writer, reader, and corpus reader.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        with ColumnarWriter(self.root) as writer:
+            for fileid in sorted(DOCS):
+                writer.write(fileid, DOCS[fileid])
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_roundtrip(self):
+        """
+        Test that documents are decoded into the original structure
+        """
+        reader = ColumnarReader(self.root)
+        self.assertEqual(reader.fileids(), sorted(DOCS))
+        for fileid, doc in DOCS.items():
+            self.assertEqual(reader.document(fileid), doc)
+
+    def test_arrays(self):
+        """
+        Test the zero-copy arrays and vectorized counts
+        """
+        reader = ColumnarReader(self.root)
+        tokens, tags, sents, paras = reader.arrays('books/a1.pickle')
+        self.assertEqual(
+            [reader.vocab[idx] for idx in tokens],
+            ['The', 'book', '.', 'Read', 'it', 'A', 'book']
+        )
+        self.assertEqual(len(sents), 3)
+        self.assertEqual(len(paras), 2)
+
+        self.assertEqual(reader.counts(), (4, 4, 9))
+        self.assertEqual(reader.counts(['news/c3.pickle']), (2, 1, 2))
+        self.assertEqual(reader.frequencies()[reader.vocab.index('book')], 2)
+
+        mask = reader.tag_mask(['NN'])
+        self.assertEqual(int(mask[reader.tags].sum()), 3)
+
+    def test_append(self):
+        """
+        Test that reopening the writer appends and replaces documents
+        """
+        replaced = [[[('Replaced', 'VBN')]]]
+        with ColumnarWriter(self.root) as writer:
+            self.assertIn('news/c3.pickle', writer)
+            writer.write('news/c3.pickle', replaced)
+
+        reader = ColumnarReader(self.root)
+        self.assertEqual(reader.document('news/c3.pickle'), replaced)
+        self.assertEqual(reader.document('books/a1.pickle'), DOCS['books/a1.pickle'])
+        self.assertEqual(reader.counts(), (3, 4, 8))
+
+    def test_too_many_tags(self):
+        """
+        Test that a document with too many tags is rejected without side effects
+        """
+        with ColumnarWriter(self.root) as writer:
+            tags = len(writer.meta['tagset'])
+            vocab = len(writer.meta['vocab'])
+            document = [[[
+                (u'word{}'.format(idx), u'T{}'.format(idx)) for idx in range(300)
+            ]]]
+
+            with self.assertRaises(ValueError):
+                writer.write('news/d4.pickle', document)
+
+            self.assertEqual(len(writer.meta['tagset']), tags)
+            self.assertEqual(len(writer.meta['vocab']), vocab)
+            self.assertEqual(len(writer._tagset), tags)
+            self.assertNotIn('news/d4.pickle', writer)
+
+            writer.write('news/d4.pickle', [[[(u'word1', u'T1')]]])
+
+        reader = ColumnarReader(self.root)
+        self.assertEqual(reader.document('news/d4.pickle'), [[[(u'word1', u'T1')]]])
+
+    def test_reader(self):
+        """
+        Test the columnar corpus reader tuple API and describe
+        """
+        corpus = BaleenColumnarCorpusReader(self.root)
+        self.assertEqual(corpus.categories(), ['books', 'news'])
+        self.assertEqual(
+            list(corpus.words(categories='news')), [('News', 'NN'), ('!', '.')]
+        )
+
+        stats = corpus.describe()
+        self.assertEqual(stats['files'], 3)
+        self.assertEqual(stats['words'], 9)
+        self.assertEqual(stats['vocab'], 8)
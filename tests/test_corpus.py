@@ -0,0 +1,181 @@
+# tests.test_corpus
+# Tests for the Baleen corpus readers.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_corpus.py [] benjamin@bengfort.com $
+
+"""
+Tests for the Baleen corpus readers.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import pickle
+import nltk.data
+
+from tests import CorpusTestCase, make_corpus
+from minke.corpus import BaleenCorpusReader
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+DOCS = {
+    'books/a1.json': {
+        'content': (
+            '<html><body><div><h1>The Title &amp; More</h1>'
+            '<p>First <b>bold</b> paragraph<!-- comment -->.</p>trailing'
+            '<ul><li>An item</li><li><p>A nested paragraph.</p></li></ul>'
+            '<h7>Odd heading</h7><P>Upper case tag.</P></div></body></html>'
+        ),
+    },
+    'news/b2.json': {
+        'content': '<p>Only one paragraph in this document, but long enough.</p>',
+    },
+    'news/c3.json': {'content': ''},
+}
+
+
+class SplitTokenizer(object):
+    """
+    A picklable tokenizer that does not require any nltk models.
+    """
+
+    def __init__(self, sep=None):
+        self.sep = sep
+
+    def tokenize(self, text):
+        return [token for token in text.split(self.sep) if token.strip()]
+
+
+##########################################################################
+## Corpus Reader Tests
+##########################################################################
+
+class BaleenCorpusReaderTests(CorpusTestCase):
+    """
+    Test the raw JSON corpus reader.
+    """
+
+    DOCS = DOCS
+
+    def test_paras_parity(self):
+        """
+        Test that the lxml paragraphs match the BeautifulSoup paragraphs
+        """
+        fast = BaleenCorpusReader(self.root, cache=False)
+        slow = BaleenCorpusReader(self.root, cache=False, parser='bs4')
+
+        for html in fast.html(readability=False):
+            self.assertEqual(fast._lxml_paras(html), slow._bs4_paras(html))
+
+        self.assertEqual(list(fast.paras()), list(slow.paras()))
+        self.assertIn(u'The Title & More', fast._lxml_paras(DOCS['books/a1.json']['content']))
+
+    def test_unknown_parser(self):
+        """
+        Test that an unknown parser raises a ValueError
+        """
+        with self.assertRaises(ValueError):
+            BaleenCorpusReader(self.root, parser='html5lib')
+
+    def test_fields(self):
+        """
+        Test projecting top level and nested fields from the documents
+        """
+        make_corpus(self.root, {
+            'news/d4.json': {
+                'title': 'Nested', 'feed': {'$oid': 'abc123'},
+                'pubdate': {'$date': 1461000000000}, 'content': '<p>Text</p>',
+            },
+        })
+        corpus = BaleenCorpusReader(self.root, cache=False)
+
+        self.assertEqual(list(corpus.fields('feed.$oid')), ['abc123'])
+        self.assertEqual(
+            list(corpus.fields(['title', 'pubdate.$date'], fileids='news/d4.json')),
+            [{'title': 'Nested', 'pubdate.$date': 1461000000000}]
+        )
+        self.assertEqual(
+            list(corpus.fields(['title', 'feed'], fileids='news/b2.json')),
+            [{'title': None, 'feed': None}]
+        )
+        self.assertEqual(
+            list(corpus.fields('content', categories='books')),
+            [DOCS['books/a1.json']['content']]
+        )
+
+    def test_pickle(self):
+        """
+        Test that a reader with the default lazy sentence tokenizer pickles
+        """
+        corpus = pickle.loads(pickle.dumps(BaleenCorpusReader(self.root)))
+        self.assertEqual(corpus.fileids(), sorted(DOCS.keys()))
+        self.assertIsInstance(corpus._sent_tokenizer, nltk.data.LazyLoader)
+
+    def test_parallel_describe(self):
+        """
+        Test that describe with a process pool matches a sequential describe
+        """
+        corpus = BaleenCorpusReader(
+            self.root, cache=False,
+            word_tokenizer=SplitTokenizer(), sent_tokenizer=SplitTokenizer('. '),
+        )
+
+        expected = corpus.describe()
+        actual = corpus.describe(workers=2)
+        for key in ('files', 'topics', 'paras', 'sents', 'words', 'vocab'):
+            self.assertEqual(actual[key], expected[key])
+
+    def test_describe_empty_selection(self):
+        """
+        Test that describing an empty selection does not describe the corpus
+        """
+        corpus = BaleenCorpusReader(
+            self.root, cache=False,
+            word_tokenizer=SplitTokenizer(), sent_tokenizer=SplitTokenizer('. '),
+        )
+
+        for workers in (1, 2):
+            stats = corpus.describe(fileids=[], workers=workers)
+            self.assertEqual(stats['files'], 0)
+            self.assertEqual(stats['words'], 0)
+            self.assertEqual(stats['ppdoc'], 0.0)
+
+    def test_approximate_describe(self):
+        """
+        Test the approximate and sampled describe of the raw corpus
+        """
+        make_corpus(self.root, {
+            "{}/{:04x}.json".format(cat, idx): {
+                'content': '<p>the {} the.</p>'.format(
+                    ' '.join(['token{}'.format(idx)] * (idx + 1))
+                )
+            } for idx, cat in enumerate(['books', 'news'] * 10)
+        })
+        corpus = BaleenCorpusReader(
+            self.root, cache=False,
+            word_tokenizer=SplitTokenizer(), sent_tokenizer=SplitTokenizer('. '),
+        )
+        exact = corpus.describe()
+
+        approx = corpus.describe(approximate=True)
+        self.assertEqual(approx['words'], exact['words'])
+        self.assertEqual(approx['vocab'], exact['vocab'])
+        self.assertEqual(approx['common'][0], ('the', 20))
+
+        # A sample of every document is a census of the corpus
+        census = corpus.describe(sample=1.0)
+        self.assertEqual(census['sampled'], exact['files'])
+        self.assertEqual(census['intervals']['words'], (exact['words'],) * 2)
+
+        sampled = corpus.describe(sample=0.3, seed=42)
+        self.assertEqual(sampled['sampled'], 8)
+        low, high = sampled['intervals']['words']
+        self.assertLessEqual(low, sampled['words'])
+        self.assertGreaterEqual(high, sampled['words'])
@@ -0,0 +1,134 @@
+# tests.test_dedup
+# Tests for detecting exact and near duplicate documents.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_dedup.py [] benjamin@bengfort.com $
+
+"""
+Tests for detecting exact and near duplicate documents.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+
+from tests import CorpusTestCase
+from tests.test_preprocess import SimplePreprocessor
+from minke.corpus import BaleenCorpusReader
+from minke.dedup import Deduplicator, DUPLICATES
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+ARTICLE = [
+    "The city council voted on Tuesday to approve the new budget for the "
+    "public library system after months of heated debate among residents.",
+    "Supporters argued that the additional funding would extend opening "
+    "hours and pay for a new collection of books in every branch.",
+    "Opponents said the money would be better spent repairing the roads "
+    "and the bridges that connect the northern neighborhoods.",
+]
+
+EDITED = ARTICLE[:2] + [ARTICLE[2].replace("roads", "streets")]
+
+OTHER = [
+    "A new species of frog has been discovered in the rain forest by a team "
+    "of biologists who spent three years surveying the remote valley.",
+]
+
+
+def html(paragraphs):
+    return "".join("<p>{}</p>".format(paragraph) for paragraph in paragraphs)
+
+
+DOCS = {
+    'news/a.json': {'feed': {'$oid': 'f1'}, 'content': html(ARTICLE)},
+    'news/b.json': {'feed': {'$oid': 'f2'}, 'content': html(ARTICLE).upper()},
+    'tech/c.json': {'feed': {'$oid': 'f3'}, 'content': html(EDITED)},
+    'tech/d.json': {'feed': {'$oid': 'f3'}, 'content': html(OTHER)},
+    'tech/e.json': {'feed': {'$oid': 'f3'}, 'content': None},
+}
+
+
+##########################################################################
+## Deduplicator Tests
+##########################################################################
+
+class DeduplicatorTests(CorpusTestCase):
+    """
+    Test clustering exact and near duplicates of the corpus.
+    """
+
+    DOCS = DOCS
+
+    def setUp(self):
+        super(DeduplicatorTests, self).setUp()
+        self.corpus = BaleenCorpusReader(self.root, cache=False)
+
+    def test_fit(self):
+        """
+        Test that exact and near duplicates share a representative
+        """
+        dedup = Deduplicator(threshold=0.5).fit(self.corpus)
+        self.assertEqual(dedup.duplicates, {'news/b': 'news/a', 'tech/c': 'news/a'})
+        self.assertEqual((dedup.exact, dedup.near), (1, 1))
+        self.assertEqual(dedup.clusters(), {'news/a': ['news/b', 'tech/c']})
+
+        # The representatives of the raw or the preprocessed fileids
+        self.assertEqual(
+            dedup.representatives(['news/a.pickle', 'news/b.pickle', 'tech/d.pickle']),
+            ['news/a.pickle', 'tech/d.pickle']
+        )
+        self.assertEqual(dedup.representative('tech/c.json'), 'news/a')
+
+        # An edited article is not a duplicate at a strict threshold
+        dedup = Deduplicator(threshold=1.0).fit(self.corpus)
+        self.assertEqual(dedup.duplicates, {'news/b': 'news/a'})
+
+    def test_signature(self):
+        """
+        Test that the signatures estimate the Jaccard similarity
+        """
+        dedup = Deduplicator(shingle=2, permutations=256, bands=32)
+        a = dedup.shingles(ARTICLE)
+        b = dedup.shingles(EDITED)
+        jaccard = float(len(a & b)) / len(a | b)
+
+        estimate = (dedup.signature(a) == dedup.signature(b)).mean()
+        self.assertAlmostEqual(estimate, jaccard, delta=0.1)
+
+        with self.assertRaises(ValueError):
+            Deduplicator(permutations=100, bands=16)
+
+    def test_save_load(self):
+        """
+        Test that the duplicate map round trips through JSON
+        """
+        path = os.path.join(self.root, DUPLICATES)
+        dedup = Deduplicator(threshold=0.5).fit(self.corpus)
+        dedup.save(path)
+
+        loaded = Deduplicator.load(path)
+        self.assertEqual(loaded.duplicates, dedup.duplicates)
+        self.assertEqual((loaded.exact, loaded.near), (1, 1))
+        self.assertEqual(loaded.threshold, 0.5)
+
+    def test_preprocess(self):
+        """
+        Test that only the representatives of duplicates are preprocessed
+        """
+        target = os.path.join(self.root, 'target')
+        transformer = SimplePreprocessor(
+            self.corpus, target, dedup=True, dedup_threshold=0.5
+        )
+        results = list(transformer.transform())
+
+        self.assertEqual(len(results), 3)
+        self.assertFalse(os.path.exists(os.path.join(target, 'news', 'b.pickle')))
+        self.assertEqual(len(Deduplicator.load(os.path.join(target, DUPLICATES))), 2)
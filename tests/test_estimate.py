@@ -0,0 +1,88 @@
+# tests.test_estimate
+# Tests for estimating the cost of preprocessing from a sample.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_estimate.py [] benjamin@bengfort.com $
+
+"""
+Tests for estimating the cost of preprocessing from a sample.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import pickle
+
+from tests import CorpusTestCase
+from tests.test_preprocess import DOCS, SimplePreprocessor
+from minke.corpus import BaleenCorpusReader
+from minke.estimate import estimate, measure, sample, STAGES
+
+
+##########################################################################
+## Estimate Tests
+##########################################################################
+
+class EstimateTests(CorpusTestCase):
+    """
+    Test extrapolating the cost of preprocessing from a sample.
+    """
+
+    DOCS = DOCS
+
+    def setUp(self):
+        super(EstimateTests, self).setUp()
+        self.corpus = BaleenCorpusReader(self.root, cache=False)
+        self.target = os.path.join(self.root, 'target')
+        self.transformer = SimplePreprocessor(self.corpus, self.target)
+
+    def test_measure(self):
+        """
+        Test that measuring a document matches its preprocessed output
+        """
+        fileid = 'books/0000.json'
+        timings, size = measure(self.transformer, fileid)
+        self.assertEqual(tuple(timings), STAGES)
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+
+        document = list(self.transformer.tokenize(fileid))
+        self.assertEqual(size, len(pickle.dumps(document, pickle.HIGHEST_PROTOCOL)))
+
+    def test_sample(self):
+        """
+        Test that every category is sampled
+        """
+        strata, sampled = sample(self.corpus, self.corpus.fileids(), 0.1, seed=42)
+        self.assertEqual(sorted(strata), ['books', 'news', 'tech'])
+        self.assertEqual(
+            sorted(self.corpus.categories(sampled)), ['books', 'news', 'tech']
+        )
+        self.assertEqual(len(sampled), 3)
+
+        with self.assertRaises(ValueError):
+            sample(self.corpus, self.corpus.fileids(), 0.0)
+
+    def test_estimate(self):
+        """
+        Test extrapolating the runtime and target size without writing
+        """
+        result = estimate(self.transformer, fraction=0.25, tasks=4, seed=42)
+        self.assertFalse(os.path.exists(self.target))
+
+        self.assertEqual(result['files'], len(DOCS))
+        self.assertEqual(result['bytes'], sum(self.corpus.sizes()))
+        self.assertEqual(result['sampled'], 7)
+        self.assertEqual(result['errors'], 0)
+        self.assertEqual(tuple(result['stages']), STAGES)
+        self.assertAlmostEqual(result['runtime'], result['cpu'] / 4)
+
+        # Every document has nearly the same output to input ratio
+        self.assertGreater(result['ratio'], 0)
+        self.assertAlmostEqual(
+            result['target_size'], result['ratio'] * result['bytes'],
+            delta=0.1 * result['target_size']
+        )
@@ -0,0 +1,154 @@
+# tests.test_incremental
+# Tests for the output manifest and incremental preprocessing.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_incremental.py [] benjamin@bengfort.com $
+
+"""
+Tests for the output manifest and incremental preprocessing.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import json
+import pickle
+import shutil
+import tempfile
+
+from tests import CorpusTestCase
+from tests.test_preprocess import simple_load, simple_tokenize
+from minke.corpus import BaleenCorpusReader
+from minke.preprocess import Preprocessor
+from minke.incremental import OutputManifest, OUTPUTS
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+DOCS = {
+    "{}/{:04x}.json".format(cat, idx): {
+        'title': 'Document {}'.format(idx),
+        'content': '<p>Document number {} of the corpus.</p>'.format(idx),
+    }
+    for idx, cat in enumerate(['books', 'news'] * 3)
+}
+
+
+class SimplePreprocessor(Preprocessor):
+    load = simple_load
+    tokenize = simple_tokenize
+
+
+##########################################################################
+## Output Manifest Tests
+##########################################################################
+
+class IncrementalPreprocessorTests(CorpusTestCase):
+    """
+    Test that incremental runs only process new or changed documents.
+    """
+
+    DOCS = DOCS
+
+    def setUp(self):
+        super(IncrementalPreprocessorTests, self).setUp()
+        self.corpus = BaleenCorpusReader(self.root, cache=False)
+        self.output = tempfile.mkdtemp()
+        self.target = os.path.join(self.output, 'target')
+
+    def tearDown(self):
+        super(IncrementalPreprocessorTests, self).tearDown()
+        shutil.rmtree(self.output)
+
+    def transform(self, **kwargs):
+        kwargs.setdefault('incremental', True)
+        transformer = SimplePreprocessor(self.corpus, self.target, **kwargs)
+        return [path for path in transformer.transform() if path is not None]
+
+    def edit(self, fileid, content):
+        path = self.corpus.abspath(fileid)
+        with open(path, 'w') as f:
+            json.dump({'content': content}, f)
+
+        # Make sure the modification time changes on coarse filesystems
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    def test_incremental(self):
+        """
+        Test that only new or changed documents are reprocessed
+        """
+        self.assertEqual(len(self.transform()), len(DOCS))
+        self.assertEqual(self.transform(), [])
+
+        # Touching a document without changing it does not reprocess it
+        path = self.corpus.abspath('books/0000.json')
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        self.assertEqual(self.transform(), [])
+
+        self.edit('books/0000.json', '<p>An edited document.</p>')
+        written = self.transform()
+        self.assertEqual(len(written), 1)
+        with open(written[0], 'rb') as f:
+            self.assertEqual(pickle.load(f), [[[
+                ('An', 'NN'), ('edited', 'NN'), ('document.', 'NN'),
+            ]]])
+
+        # A missing output is written again
+        os.remove(written[0])
+        self.assertEqual(self.transform(), written)
+
+    def test_signature(self):
+        """
+        Test that a new preprocessor version or setting reprocesses everything
+        """
+        self.assertEqual(len(self.transform()), len(DOCS))
+
+        class TaggedPreprocessor(SimplePreprocessor):
+            def signature(self):
+                version, settings = super(TaggedPreprocessor, self).signature()
+                settings['tagger'] = 'simple'
+                return version, settings
+
+        transformer = TaggedPreprocessor(self.corpus, self.target, incremental=True)
+        written = [path for path in transformer.transform() if path]
+        self.assertEqual(len(written), len(DOCS))
+
+    def test_atomic_write(self):
+        """
+        Test that a failed write leaves neither a truncated nor temporary file
+        """
+        class FailingPreprocessor(SimplePreprocessor):
+            def tokenize(self, fileid):
+                yield [[('unpicklable', lambda: None)]]
+
+        transformer = FailingPreprocessor(self.corpus, self.target)
+        with self.assertRaises(Exception):
+            list(transformer.transform())
+
+        names = [
+            name for _, _, files in os.walk(self.target) for name in files
+            if not name.startswith('.')
+        ]
+        self.assertEqual(names, ['feeds.json'])
+
+    def test_moved_target(self):
+        """
+        Test that outputs are recorded relative to the target
+        """
+        self.transform()
+        moved = os.path.join(self.output, 'moved')
+        os.rename(self.target, moved)
+        self.target = moved
+        self.assertEqual(self.transform(), [])
+
+        manifest = OutputManifest(os.path.join(moved, OUTPUTS))
+        self.assertEqual(len(manifest), len(DOCS))
+        self.assertIn('news/0001.json', manifest)
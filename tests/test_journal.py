@@ -0,0 +1,154 @@
+# tests.test_journal
+# Tests for the job journal and resumable preprocessing.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_journal.py [] benjamin@bengfort.com $
+
+"""
+Tests for the job journal and resumable preprocessing.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from tests import make_corpus
+from tests.test_preprocess import DOCS
+from tests.test_preprocess import simple_load, simple_tokenize
+from tests.test_preprocess import SimpleParallelPreprocessor
+from tests.test_preprocess import SimpleProgressParallelPreprocessor
+from minke.journal import JobJournal
+from minke.corpus import BaleenCorpusReader
+from minke.preprocess import Preprocessor
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+class SimplePreprocessor(Preprocessor):
+    load = simple_load
+    tokenize = simple_tokenize
+
+
+##########################################################################
+## Journal Tests
+##########################################################################
+
+class JobJournalTests(unittest.TestCase):
+    """
+    Test writing and replaying the job journal.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'journal.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_replay(self):
+        """
+        Test that the state of an interrupted job is replayed
+        """
+        journal = JobJournal(self.path)
+        journal.start(4)
+        for fileid in ('a', 'b', 'c', 'd'):
+            journal.dispatch(fileid)
+        journal.complete('a')
+        journal.fail('b', 'ValueError')
+        journal.complete('c')
+        journal.close()
+
+        # A record cut off by the job being killed is ignored
+        with open(self.path, 'a') as f:
+            f.write('{"event": "complete", "fil')
+
+        journal = JobJournal(self.path)
+        self.assertEqual(journal.completed, {'a', 'c'})
+        self.assertEqual(journal.failed, {'b': 'ValueError'})
+        self.assertEqual(journal.inflight, {'d'})
+
+        # Resuming retries the failure, starting over forgets everything
+        journal.start(2, resume=True)
+        journal.complete('b')
+        journal.finish()
+        self.assertEqual(JobJournal(self.path).completed, {'a', 'b', 'c'})
+        self.assertEqual(JobJournal(self.path).failed, {})
+        self.assertEqual(JobJournal(self.path).runs, 2)
+
+        journal = JobJournal(self.path)
+        journal.start(4)
+        journal.finish()
+        self.assertEqual(JobJournal(self.path).completed, set())
+
+
+class ResumePreprocessorTests(unittest.TestCase):
+    """
+    Test resuming preprocessing jobs from the journal.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, 'source')
+        self.target = os.path.join(self.root, 'target')
+
+        make_corpus(self.source, DOCS)
+        self.corpus = BaleenCorpusReader(self.source, cache=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_resume(self):
+        """
+        Test that a resumed job processes only the unfinished documents
+        """
+        fileids = [fileid for fileid in sorted(DOCS) if fileid != 'news/0bad.json']
+
+        # Kill the job after three documents
+        transformer = SimplePreprocessor(self.corpus, self.target)
+        results = transformer.transform(fileids=fileids)
+        for _ in range(3):
+            next(results)
+        results.close()
+
+        transformer = SimplePreprocessor(self.corpus, self.target, resume=True)
+        results = list(transformer.transform(fileids=fileids))
+        self.assertEqual(len(results), len(fileids) - 3)
+        self.assertNotIn(None, results)
+        self.assertEqual(transformer.journal.completed, set(fileids))
+
+    def test_retry_failures(self):
+        """
+        Test that resuming a parallel job retries only its failures
+        """
+        transformer = SimpleParallelPreprocessor(self.corpus, self.target, tasks=2)
+        self.assertEqual(len(list(transformer.transform())), len(DOCS) - 1)
+        self.assertEqual(list(transformer.journal.failed), ['news/0bad.json'])
+
+        transformer = SimpleParallelPreprocessor(
+            self.corpus, self.target, tasks=2, resume=True
+        )
+        self.assertEqual(list(transformer.transform()), [])
+        self.assertEqual([fileid for fileid, _ in transformer.errors], ['news/0bad.json'])
+
+    def test_progress(self):
+        """
+        Test that the progress bar starts from the checkpointed count
+        """
+        transformer = SimpleParallelPreprocessor(self.corpus, self.target, tasks=2)
+        list(transformer.transform())
+
+        transformer = SimpleProgressParallelPreprocessor(
+            self.corpus, self.target, tasks=2, resume=True
+        )
+        list(transformer.transform())
+        self.assertEqual(transformer.pbar.n, len(DOCS))
+        self.assertEqual(transformer.pbar.total, len(DOCS))
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# tests.test_language
+# Tests for the character n-gram language prefilter.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_language.py [] benjamin@bengfort.com $
+
+"""
+Tests for the character n-gram language prefilter.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import unittest
+
+from tests import CorpusTestCase
+from tests.test_corpus import SplitTokenizer
+from tests.test_preprocess import SimplePreprocessor
+from minke.corpus import BaleenCorpusReader
+from minke.language import LanguageIdentifier, LanguageLog, LANGUAGES, UNKNOWN
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+TEXTS = {
+    'en': u"The government announced a new plan to reduce the taxes of small "
+          u"businesses, saying that it would create thousands of jobs.",
+    'es': u"El gobierno anunció un nuevo plan para reducir los impuestos de las "
+          u"pequeñas empresas, diciendo que crearía miles de empleos.",
+    'fr': u"Le gouvernement a annoncé un nouveau plan pour réduire les impôts "
+          u"des petites entreprises, affirmant qu'il créerait des milliers d'emplois.",
+    'de': u"Die Regierung hat einen neuen Plan angekündigt, um die Steuern für "
+          u"kleine Unternehmen zu senken, und sagte, er schaffe tausende Stellen.",
+}
+
+RUSSIAN = (
+    u"Правительство объявило о новом плане снижения налогов для малого "
+    u"бизнеса, заявив, что он создаст тысячи рабочих мест."
+)
+
+DOCS = {
+    'news/a.json': {'content': u'<p>{}</p>'.format(TEXTS['en'])},
+    'news/b.json': {'content': u'<p>{}</p>'.format(TEXTS['es'])},
+    'tech/c.json': {'content': u'<p>{}</p>'.format(TEXTS['en'])},
+    'tech/d.json': {'content': u'<p>{}</p>'.format(RUSSIAN)},
+    'tech/e.json': {'content': u'<p>Short.</p>'},
+}
+
+
+##########################################################################
+## Language Identifier Tests
+##########################################################################
+
+class LanguageIdentifierTests(unittest.TestCase):
+    """
+    Test identifying languages by character n-gram profiles.
+    """
+
+    def test_identify(self):
+        """
+        Test that each language is identified by its profile
+        """
+        identifier = LanguageIdentifier()
+        for language, text in TEXTS.items():
+            self.assertEqual(identifier.identify([text])[0], language)
+
+        # Another script is unknown and short text is not identified
+        self.assertEqual(identifier.identify([RUSSIAN])[0], UNKNOWN)
+        self.assertEqual(identifier.identify([u"Hello there."]), (None, 0.0))
+        self.assertEqual(identifier.identify([]), (None, 0.0))
+
+
+##########################################################################
+## Language Filter Tests
+##########################################################################
+
+class LanguageFilterTests(CorpusTestCase):
+    """
+    Test skipping the documents that are not English.
+    """
+
+    DOCS = DOCS
+
+    def setUp(self):
+        super(LanguageFilterTests, self).setUp()
+        self.corpus = BaleenCorpusReader(self.root, cache=False)
+
+    def test_preprocess(self):
+        """
+        Test that rejected documents are logged and not written
+        """
+        target = os.path.join(self.root, 'target')
+        transformer = SimplePreprocessor(self.corpus, target, language='en')
+        results = list(transformer.transform())
+
+        self.assertEqual(results.count(None), 2)
+        self.assertFalse(os.path.exists(os.path.join(target, 'news', 'b.pickle')))
+        self.assertTrue(os.path.exists(os.path.join(target, 'tech', 'e.pickle')))
+        self.assertEqual(dict(transformer.rejected()), {'news': 1, 'tech': 1})
+
+        records = LanguageLog(os.path.join(target, LANGUAGES)).records()
+        self.assertEqual(records['news/b.json']['language'], 'es')
+        self.assertEqual(records['tech/d.json']['language'], UNKNOWN)
+
+        # The documents are completed in the journal so a resume skips them
+        self.assertEqual(len(transformer.journal.completed), len(DOCS))
+
+    def test_describe(self):
+        """
+        Test that describe skips and counts rejected documents by category
+        """
+        corpus = BaleenCorpusReader(
+            self.root, cache=False,
+            word_tokenizer=SplitTokenizer(), sent_tokenizer=SplitTokenizer('. '),
+        )
+
+        for workers in (1, 2):
+            stats = corpus.describe(workers=workers, language='en')
+            self.assertEqual(stats['rejected'], {'news': 1, 'tech': 1})
+            self.assertEqual(stats['paras'], 3)
+            self.assertEqual(stats['words'], corpus.describe(
+                fileids=['news/a.json', 'tech/c.json', 'tech/e.json']
+            )['words'])
+
+        with self.assertRaises(ValueError):
+            corpus.describe(language='en', sample=0.5)
@@ -0,0 +1,165 @@
+# tests.test_manifest
+# Tests for the persistent corpus manifest.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_manifest.py [] benjamin@bengfort.com $
+
+"""
+Tests for the persistent corpus manifest.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import pickle
+import shutil
+import tempfile
+
+from tests import CorpusTestCase, make_corpus
+from minke.manifest import CorpusManifest, MANIFEST, cache_path
+from minke.corpus import BaleenCorpusReader, DOC_PATTERN, CAT_PATTERN
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+DOCS = {
+    'books/a1.json': {'title': 'A Book', 'content': '<p>Reading.</p>'},
+    'books/b2.json': {'title': 'B Book', 'content': '<p>Writing.</p>'},
+    'data_science/c3.json': {'title': 'Data', 'content': '<p>Science.</p>'},
+}
+
+
+##########################################################################
+## Manifest Tests
+##########################################################################
+
+class CorpusManifestTests(CorpusTestCase):
+    """
+    Test the corpus manifest build, load, and staleness checks.
+    """
+
+    DOCS = DOCS
+
+    def test_build(self):
+        """
+        Test that building the manifest finds the fileids and categories
+        """
+        manifest = CorpusManifest(self.root, DOC_PATTERN, CAT_PATTERN).build()
+        self.assertEqual(manifest.fileids(), sorted(DOCS.keys()))
+        self.assertEqual(manifest.categories(), ['books', 'data_science'])
+        self.assertEqual(
+            manifest.fileids('books'), ['books/a1.json', 'books/b2.json']
+        )
+        self.assertEqual(manifest.category('data_science/c3.json'), 'data_science')
+        self.assertEqual(
+            manifest.size('books/a1.json'),
+            os.path.getsize(os.path.join(self.root, 'books', 'a1.json'))
+        )
+
+        with self.assertRaises(ValueError):
+            manifest.fileids('cooking')
+
+    def test_open_saves_and_loads(self):
+        """
+        Test that opening the manifest persists it and reloads it fresh
+        """
+        manifest = CorpusManifest.open(self.root, DOC_PATTERN, CAT_PATTERN)
+        self.assertTrue(manifest.persisted)
+        self.assertTrue(os.path.exists(os.path.join(self.root, MANIFEST)))
+
+        loaded = CorpusManifest(self.root, DOC_PATTERN, CAT_PATTERN)
+        self.assertTrue(loaded.load())
+        self.assertFalse(loaded.stale())
+        self.assertEqual(loaded.fileids(), manifest.fileids())
+
+    def test_stale(self):
+        """
+        Test that adding a document or category makes the manifest stale
+        """
+        manifest = CorpusManifest.open(self.root, DOC_PATTERN, CAT_PATTERN)
+        make_corpus(self.root, {'cooking/d4.json': {'title': 'Cook'}})
+        self.assertTrue(manifest.stale())
+
+        manifest = CorpusManifest.open(self.root, DOC_PATTERN, CAT_PATTERN)
+        self.assertIn('cooking/d4.json', manifest)
+        self.assertFalse(manifest.stale())
+
+    def test_validate(self):
+        """
+        Test that validate detects documents edited in place
+        """
+        manifest = CorpusManifest.open(self.root, DOC_PATTERN, CAT_PATTERN)
+        self.assertEqual(manifest.validate(), [])
+
+        with open(os.path.join(self.root, 'books', 'a1.json'), 'a') as f:
+            f.write('\n\n')
+        self.assertEqual(manifest.validate(), ['books/a1.json'])
+
+    def test_unwritable_root(self):
+        """
+        Test that the manifest falls back to the cache if the root is unwritable
+        """
+        # A directory in place of the manifest makes saving it fail, even as root
+        os.mkdir(os.path.join(self.root, MANIFEST))
+        cache = tempfile.mkdtemp()
+        environ = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = cache
+
+        try:
+            manifest = CorpusManifest.open(self.root, DOC_PATTERN, CAT_PATTERN)
+            self.assertTrue(manifest.persisted)
+            self.assertEqual(manifest.path, cache_path(self.root))
+            self.assertTrue(manifest.path.startswith(cache))
+
+            loaded = CorpusManifest.open(self.root, DOC_PATTERN, CAT_PATTERN)
+            self.assertEqual(loaded.path, manifest.path)
+            self.assertEqual(loaded.fileids(), manifest.fileids())
+        finally:
+            if environ is None:
+                del os.environ['XDG_CACHE_HOME']
+            else:
+                os.environ['XDG_CACHE_HOME'] = environ
+            shutil.rmtree(cache)
+
+    def test_pickle(self):
+        """
+        Test that a manifest is pickled without reloading it from disk
+        """
+        manifest = CorpusManifest.open(self.root, DOC_PATTERN, CAT_PATTERN)
+        os.remove(manifest.path)
+
+        loaded = pickle.loads(pickle.dumps(manifest))
+        self.assertEqual(loaded.fileids(), manifest.fileids())
+        self.assertEqual(loaded.category('books/a1.json'), 'books')
+        self.assertFalse(os.path.exists(manifest.path))
+
+    def test_reader(self):
+        """
+        Test that the corpus reader resolves fileids from the manifest
+        """
+        corpus = BaleenCorpusReader(self.root)
+        nomani = BaleenCorpusReader(self.root, manifest=False)
+
+        self.assertIsNotNone(corpus._manifest)
+        self.assertIsNone(nomani._manifest)
+
+        self.assertEqual(corpus.fileids(), nomani.fileids())
+        self.assertEqual(corpus.categories(), nomani.categories())
+        self.assertEqual(
+            corpus.fileids(categories='books'), nomani.fileids(categories='books')
+        )
+        self.assertEqual(
+            corpus.categories(fileids='books/a1.json'),
+            nomani.categories(fileids='books/a1.json')
+        )
+        self.assertEqual(list(corpus.sizes()), list(nomani.sizes()))
+        self.assertEqual(
+            [doc['title'] for doc in corpus.docs(categories='books')],
+            ['A Book', 'B Book']
+        )
@@ -0,0 +1,142 @@
+# tests.test_partition
+# Tests for partitioning the corpus across hosts and merging the shards.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_partition.py [] benjamin@bengfort.com $
+
+"""
+Tests for partitioning the corpus across hosts and merging the shards.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from tests import make_corpus
+from tests.test_incremental import DOCS, SimplePreprocessor
+from minke.corpus import BaleenCorpusReader
+from minke.incremental import OutputManifest, OUTPUTS
+from minke.partition import parse_shard, shard_name, partition, merge
+
+
+##########################################################################
+## Partition Tests
+##########################################################################
+
+class PartitionTests(unittest.TestCase):
+    """
+    Test the deterministic partitioning of fileids.
+    """
+
+    FILEIDS = ["doc{:03d}.json".format(idx) for idx in range(200)]
+
+    def test_parse_shard(self):
+        """
+        Test parsing i/N shard specifications
+        """
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        self.assertEqual(parse_shard((1, 1)), (1, 1))
+        for shard in ("0/4", "5/4", "2", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(shard)
+
+        self.assertEqual(shard_name(OUTPUTS, (2, 4)), ".outputs.2-of-4.sqlite")
+        self.assertEqual(shard_name(OUTPUTS, None), OUTPUTS)
+
+    def test_hash_partition(self):
+        """
+        Test that hash shards are disjoint, complete, and stable
+        """
+        shards = [partition(self.FILEIDS, (idx, 3)) for idx in (1, 2, 3)]
+        self.assertEqual(sorted(sum(shards, [])), self.FILEIDS)
+        self.assertTrue(all(len(shard) > 40 for shard in shards))
+
+        # The assignment of a document does not depend on the others
+        subset = self.FILEIDS[::7]
+        self.assertEqual(
+            partition(subset, (2, 3)), [f for f in shards[1] if f in subset]
+        )
+
+    def test_size_partition(self):
+        """
+        Test that size balanced shards have nearly equal sizes
+        """
+        sizes = [(idx * 7919) % 1000 + 1 for idx in range(len(self.FILEIDS))]
+        lookup = dict(zip(self.FILEIDS, sizes))
+
+        shards = [
+            partition(self.FILEIDS, (idx, 4), 'size', sizes) for idx in range(1, 5)
+        ]
+        self.assertEqual(sorted(sum(shards, [])), self.FILEIDS)
+
+        totals = [sum(lookup[fileid] for fileid in shard) for shard in shards]
+        self.assertLessEqual(max(totals) - min(totals), max(sizes))
+
+        with self.assertRaises(ValueError):
+            partition(self.FILEIDS, (1, 4), 'size')
+
+
+##########################################################################
+## Merge Tests
+##########################################################################
+
+class ShardedPreprocessingTests(unittest.TestCase):
+    """
+    Test preprocessing shards on separate hosts and merging them.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, 'source')
+        make_corpus(self.source, DOCS)
+        self.corpus = BaleenCorpusReader(self.source, cache=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def transform(self, target, shard=None, **kwargs):
+        transformer = SimplePreprocessor(self.corpus, target, shard=shard, **kwargs)
+        return [path for path in transformer.transform() if path]
+
+    def test_shared_target(self):
+        """
+        Test shards written to the same target merge into one manifest
+        """
+        target = os.path.join(self.root, 'target')
+        for partition in ('hash', 'size'):
+            written = []
+            for idx in (1, 2, 3):
+                written.extend(self.transform(
+                    target, "{}/3".format(idx), partition=partition, overwrite=True
+                ))
+            self.assertEqual(len(written), len(DOCS))
+            self.assertEqual(len(set(written)), len(DOCS))
+
+        copied, merged = merge(target)
+        self.assertEqual((copied, merged), (0, len(DOCS)))
+
+        # The merged manifest is complete for an incremental run
+        self.assertEqual(self.transform(target, incremental=True), [])
+
+    def test_separate_targets(self):
+        """
+        Test shards written to separate targets are copied and merged
+        """
+        targets = [os.path.join(self.root, name) for name in ('one', 'two')]
+        self.transform(targets[0], "1/2")
+        self.transform(targets[1], "2/2")
+
+        copied, merged = merge(targets[0], targets[1:])
+        self.assertEqual(merged, len(DOCS))
+        self.assertGreater(copied, 0)
+
+        manifest = OutputManifest(os.path.join(targets[0], OUTPUTS))
+        self.assertEqual(len(manifest), len(DOCS))
+        self.assertEqual(self.transform(targets[0], incremental=True), [])
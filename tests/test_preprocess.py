@@ -0,0 +1,494 @@
+# tests.test_preprocess
+# Tests for the corpus preprocessors.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_preprocess.py [] benjamin@bengfort.com $
+
+"""
+Tests for the corpus preprocessors.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import re
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from tests import make_corpus
+from minke.exceptions import MinkeError
+from minke.corpus import BaleenCorpusReader
+from minke.corpus import BaleenPickledCorpusReader
+from minke.preprocess import Preprocessor
+from minke.preprocess import ParallelPreprocessor
+from minke.preprocess import ParallelShardedPreprocessor
+from minke.preprocess import ProgressParallelPreprocessor
+from minke.preprocess import PipelinePreprocessor
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+DOCS = {
+    "{}/{:04x}.json".format(cat, idx): {
+        'title': 'Document {}'.format(idx),
+        'content': '<p>Document number {} of the corpus.</p>'.format(idx),
+    }
+    for idx, cat in enumerate(['books', 'news', 'tech'] * 8)
+}
+
+DOCS['news/0bad.json'] = {'content': '<p>This document will explode.</p>'}
+
+PARAS = {
+    'news/long.json': {
+        'title': 'A longer document',
+        'content': (
+            '<p>The first paragraph. It has two sentences.</p>'
+            '<p>The second paragraph has one.</p>'
+            '<p>The third! Has three. Short sentences.</p>'
+        ),
+    },
+}
+
+
+def simple_tokenize(preprocessor, fileid):
+    """
+    Whitespace tokenizes and tags every word as a noun, since the punkt and
+    tagger models are not required to test the mechanics of preprocessing.
+    """
+    for paragraph in preprocessor.corpus.paras(fileids=fileid):
+        if 'explode' in paragraph:
+            raise ValueError("Could not tokenize '{}'".format(fileid))
+        yield [[(word, 'NN') for word in paragraph.split()]]
+
+
+def simple_load(preprocessor):
+    """
+    Counts the number of times the models are loaded instead of loading them.
+    """
+    preprocessor.loads = getattr(preprocessor, 'loads', 0) + 1
+    return preprocessor
+
+
+class SimpleSentenceTokenizer(object):
+    """
+    Splits paragraphs into sentences after every period or exclamation mark.
+    """
+
+    def tokenize(self, paragraph):
+        return [sent for sent in re.split(r'(?<=[.!]) ', paragraph) if sent]
+
+
+class SimpleTagger(object):
+    """
+    Tags capitalized words as proper nouns and counts the calls to tag.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def tag(self, tokens):
+        self.calls += 1
+        return [(token, 'NNP' if token.istitle() else 'NN') for token in tokens]
+
+    def tag_sents(self, sentences):
+        self.calls += 1
+        return [
+            [(token, 'NNP' if token.istitle() else 'NN') for token in tokens]
+            for tokens in sentences
+        ]
+
+
+def simple_models(preprocessor):
+    """
+    Loads the simple sentence tokenizer and tagger instead of the nltk models.
+    """
+    if preprocessor.tagger is None:
+        preprocessor.sent_tokenizer = SimpleSentenceTokenizer()
+        preprocessor.tagger = SimpleTagger()
+    return preprocessor
+
+
+class SimplePreprocessor(Preprocessor):
+    load = simple_models
+
+
+class SimplePipelinePreprocessor(PipelinePreprocessor):
+    """
+    Fails to tag the bad document with the simple models.
+    """
+
+    load = simple_models
+
+    def tagged(self, paragraphs):
+        if any('explode' in paragraph for paragraph in paragraphs):
+            raise ValueError("Could not tag the paragraphs")
+        return super(SimplePipelinePreprocessor, self).tagged(paragraphs)
+
+
+class CrashingPipelinePreprocessor(PipelinePreprocessor):
+    """
+    Kills the tag process on the bad document, like the OOM killer would.
+    """
+
+    load = simple_models
+
+    def tagged(self, paragraphs):
+        if any('explode' in paragraph for paragraph in paragraphs):
+            os._exit(3)
+        return super(CrashingPipelinePreprocessor, self).tagged(paragraphs)
+
+
+class SimpleParallelPreprocessor(ParallelPreprocessor):
+    load = simple_load
+    tokenize = simple_tokenize
+
+
+class SimpleParallelShardedPreprocessor(ParallelShardedPreprocessor):
+    load = simple_load
+    tokenize = simple_tokenize
+
+
+class SimpleProgressParallelPreprocessor(ProgressParallelPreprocessor):
+    load = simple_load
+    tokenize = simple_tokenize
+
+
+class CachedParallelPreprocessor(ParallelPreprocessor):
+    load = simple_models
+
+
+class WorkerParallelPreprocessor(ParallelPreprocessor):
+    """
+    Returns the worker process id and the number of times it loaded models.
+    """
+
+    load = simple_load
+
+    def process(self, fileid):
+        return os.getpid(), self.loads
+
+
+class OrderParallelPreprocessor(ParallelPreprocessor):
+    """
+    Returns the fileid to record the order in which documents are processed.
+    """
+
+    load = simple_load
+
+    def process(self, fileid):
+        return fileid
+
+
+class CrashingParallelPreprocessor(ParallelPreprocessor):
+    """
+    Kills the worker process on the bad document, like the OOM killer would.
+    """
+
+    load = simple_load
+
+    def process(self, fileid):
+        if fileid == 'news/0bad.json':
+            os._exit(3)
+        return fileid
+
+
+##########################################################################
+## Preprocessor Tests
+##########################################################################
+
+class PreprocessorTests(unittest.TestCase):
+    """
+    Test the sequential preprocessor.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, 'source')
+        self.target = os.path.join(self.root, 'target')
+
+        make_corpus(self.source, PARAS)
+        self.corpus = BaleenCorpusReader(self.source, cache=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_batch_tokenize(self):
+        """
+        Test that batch tagging a document is identical to tagging sentences
+        """
+        single = SimplePreprocessor(self.corpus, self.target, batch=False)
+        batch = SimplePreprocessor(self.corpus, self.target, batch=True)
+
+        expected = list(single.tokenize('news/long.json'))
+        self.assertEqual(list(batch.tokenize('news/long.json')), expected)
+        self.assertEqual([len(para) for para in expected], [2, 1, 3])
+
+        # The batch preprocessor tags the whole document in one call
+        self.assertEqual(single.tagger.calls, 6)
+        self.assertEqual(batch.tagger.calls, 1)
+
+    def test_sentence_cache(self):
+        """
+        Test that repeated sentences are tagged once from the cache
+        """
+        for batch in (False, True):
+            cached = SimplePreprocessor(
+                self.corpus, self.target, batch=batch, sentence_cache=10
+            )
+            expected = list(cached.tokenize('news/long.json'))
+            calls = cached.tagger.calls
+            self.assertEqual(cached.cache_stats(), (0, 6))
+            self.assertEqual(len(cached.sentences), 6)
+
+            # The tagger is not called for a document it has seen
+            self.assertEqual(list(cached.tokenize('news/long.json')), expected)
+            self.assertEqual(cached.cache_stats(), (6, 6))
+            self.assertEqual(cached.tagger.calls, calls)
+
+            uncached = SimplePreprocessor(self.corpus, self.target, batch=batch)
+            self.assertEqual(list(uncached.tokenize('news/long.json')), expected)
+            self.assertEqual(uncached.cache_stats(), (0, 0))
+
+
+class ParallelPreprocessorTests(unittest.TestCase):
+    """
+    Test the streaming parallel preprocessors.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, 'source')
+        self.target = os.path.join(self.root, 'target')
+
+        make_corpus(self.source, DOCS)
+        self.corpus = BaleenCorpusReader(self.source, cache=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_streaming(self):
+        """
+        Test that results stream back and failures are reported per fileid
+        """
+        transformer = SimpleParallelPreprocessor(
+            self.corpus, self.target, tasks=2, chunksize=2, window=1
+        )
+        self.assertEqual(transformer.window, 4)
+
+        results = list(transformer.transform())
+        self.assertEqual(len(results), len(DOCS) - 1)
+        self.assertTrue(all(os.path.exists(path) for path in results))
+
+        self.assertEqual(len(transformer.errors), 1)
+        fileid, error = transformer.errors[0]
+        self.assertEqual(fileid, 'news/0bad.json')
+        self.assertIn("ValueError: Could not tokenize", error)
+
+        # Existing documents are skipped on the second run
+        results = list(transformer.transform())
+        self.assertEqual(results.count(None), len(DOCS) - 1)
+
+    def test_sentence_cache(self):
+        """
+        Test that the sentence cache statistics of every worker are reported
+        """
+        transformer = CachedParallelPreprocessor(
+            self.corpus, self.target, tasks=2, chunksize=2, sentence_cache=100
+        )
+        self.assertEqual(len(list(transformer.transform())), len(DOCS))
+        self.assertEqual(transformer.cache_stats(), (0, len(DOCS)))
+        self.assertLessEqual(len(transformer.cached), 2)
+
+    def test_abandoned(self):
+        """
+        Test that the pool shuts down if the transform is not consumed
+        """
+        transformer = SimpleParallelPreprocessor(
+            self.corpus, self.target, tasks=2, window=2
+        )
+        results = transformer.transform()
+        self.assertIsNotNone(next(results))
+        results.close()
+
+    def test_sharded(self):
+        """
+        Test that parallel results are written to a sharded store
+        """
+        transformer = SimpleParallelShardedPreprocessor(
+            self.corpus, self.target, tasks=2
+        )
+        written = [fileid for fileid in transformer.transform() if fileid]
+        self.assertEqual(len(written), len(DOCS) - 1)
+
+        corpus = BaleenPickledCorpusReader(self.target)
+        self.assertEqual(sorted(corpus.fileids()), sorted(written))
+        self.assertEqual(
+            list(corpus.docs(fileids='books/0000.pickle')),
+            [[[[('Document', 'NN'), ('number', 'NN'), ('0', 'NN'),
+                ('of', 'NN'), ('the', 'NN'), ('corpus.', 'NN')]]]]
+        )
+
+    def test_progress(self):
+        """
+        Test that the progress bar counts failed documents
+        """
+        transformer = SimpleProgressParallelPreprocessor(
+            self.corpus, self.target, tasks=2
+        )
+        results = list(transformer.transform())
+        self.assertEqual(len(results), len(DOCS) - 1)
+        self.assertEqual(transformer.pbar.n, len(DOCS))
+
+    def test_dead_worker(self):
+        """
+        Test that a worker dying raises an error instead of hanging
+        """
+        transformer = CrashingParallelPreprocessor(
+            self.corpus, self.target, tasks=2
+        )
+        with self.assertRaises(MinkeError):
+            list(transformer.transform())
+
+    def test_largest_first(self):
+        """
+        Test that the largest documents are submitted to the pool first
+        """
+        sizes = dict(zip(self.corpus.fileids(), self.corpus.sizes()))
+        transformer = OrderParallelPreprocessor(
+            self.corpus, self.target, tasks=1, chunksize=1
+        )
+        results = list(transformer.transform())
+        self.assertEqual(len(results), len(DOCS))
+        self.assertEqual(
+            [sizes[fileid] for fileid in results],
+            sorted(sizes.values(), reverse=True)
+        )
+
+        transformer = OrderParallelPreprocessor(
+            self.corpus, self.target, tasks=1, chunksize=1, schedule='ordered'
+        )
+        self.assertEqual(list(transformer.transform()), self.corpus.fileids())
+
+    def test_chunks(self):
+        """
+        Test that large documents are sent alone and small ones in chunks
+        """
+        transformer = SimpleParallelPreprocessor(
+            self.corpus, self.target, tasks=2, chunksize=4, chunk_bytes=1000
+        )
+        documents = [('a', 5000), ('b', 1000), ('c', 600), ('d', 500)]
+        documents += [(str(idx), 10) for idx in range(6)]
+        self.assertEqual(list(transformer.chunks(documents)), [
+            ['a'], ['b'], ['c', 'd'], ['0', '1', '2', '3'], ['4', '5'],
+        ])
+
+    def test_max_tasks(self):
+        """
+        Test that workers are replaced after their maximum number of chunks
+        """
+        transformer = WorkerParallelPreprocessor(
+            self.corpus, self.target, tasks=2, chunksize=1, max_tasks=1
+        )
+        results = list(transformer.transform())
+        self.assertEqual(len(results), len(DOCS))
+        self.assertEqual(len(set(pid for pid, _ in results)), len(DOCS))
+
+    def test_memory_limit(self):
+        """
+        Test that a worker over the memory limit is replaced mid chunk
+        """
+        transformer = WorkerParallelPreprocessor(
+            self.corpus, self.target, tasks=2, chunksize=4, memory_limit=1
+        )
+        results = list(transformer.transform())
+        self.assertEqual(len(results), len(DOCS))
+        self.assertEqual(transformer.errors, [])
+
+        # Every worker exits after its first document and requeues the rest
+        self.assertEqual(len(set(pid for pid, _ in results)), len(DOCS))
+        self.assertEqual(transformer.recycled, len(DOCS))
+        self.assertEqual(sorted(transformer.peaks), sorted(pid for pid, _ in results))
+        self.assertTrue(all(peak > 1 for peak in transformer.peaks.values()))
+
+    def test_initializer(self):
+        """
+        Test that each worker loads the models once before processing
+        """
+        transformer = WorkerParallelPreprocessor(
+            self.corpus, self.target, tasks=2, chunksize=3
+        )
+        results = list(transformer.transform())
+        self.assertEqual(len(results), len(DOCS))
+        self.assertEqual(set(loads for _, loads in results), {1})
+        self.assertLessEqual(len(set(pid for pid, _ in results)), 2)
+        self.assertFalse(hasattr(transformer, 'loads'))
+
+
+class PipelinePreprocessorTests(unittest.TestCase):
+    """
+    Test the staged pipeline preprocessor.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, 'source')
+        self.target = os.path.join(self.root, 'target')
+
+        make_corpus(self.source, DOCS)
+        self.corpus = BaleenCorpusReader(self.source, cache=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_pipeline(self):
+        """
+        Test that the pipeline writes the same documents as the preprocessor
+        """
+        transformer = SimplePipelinePreprocessor(
+            self.corpus, self.target, parse_tasks=2, tag_tasks=2, queue_size=2
+        )
+        results = list(transformer.transform())
+        self.assertEqual(len(results), len(DOCS) - 1)
+        self.assertEqual(
+            [fileid for fileid, _ in transformer.errors], ['news/0bad.json']
+        )
+        self.assertIn("ValueError: Could not tag", transformer.errors[0][1])
+
+        # Every stage saw every document, including the failure
+        stats = transformer.stats()
+        self.assertEqual([stage['stage'] for stage in stats], ['read', 'parse', 'tag', 'write'])
+        self.assertTrue(all(stage['processed'] == len(DOCS) for stage in stats))
+
+        serial = SimplePreprocessor(self.corpus, self.target)
+        for fileid in ('books/0000.json', 'tech/0017.json'):
+            with open(serial.abspath(fileid), 'rb') as f:
+                self.assertEqual(pickle.load(f), list(serial.tokenize(fileid)))
+
+    def test_abandoned(self):
+        """
+        Test that the pipeline shuts down if the transform is not consumed
+        """
+        transformer = SimplePipelinePreprocessor(
+            self.corpus, self.target, parse_tasks=1, tag_tasks=1, queue_size=1
+        )
+        results = transformer.transform()
+        self.assertIsNotNone(next(results))
+        results.close()
+
+    def test_dead_worker(self):
+        """
+        Test that a stage process dying raises an error instead of hanging
+        """
+        transformer = CrashingPipelinePreprocessor(
+            self.corpus, self.target, parse_tasks=1, tag_tasks=2
+        )
+        with self.assertRaises(MinkeError):
+            list(transformer.transform())
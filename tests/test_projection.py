@@ -0,0 +1,194 @@
+# tests.test_projection
+# Tests for the streaming JSON field projection.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_projection.py [] benjamin@bengfort.com $
+
+"""
+Tests for the streaming JSON field projection.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import json
+import time
+import unittest
+
+from io import StringIO
+from minke.projection import FieldProjector
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+DOCUMENT = {
+    '_id': {'$oid': '5713ae7dc180e44b0b4c4ab1'},
+    'content': u'<p>Escaped \\"quotes\\" and {braces} [brackets] caf\xe9</p>' * 500,
+    'feed': {'$oid': 'feed01', 'tags': [1, {'nested': '}'}]},
+    'title': u'A "quoted" title',
+    'pubdate': {'$date': 1461000000000},
+    'score': -1.5e3,
+    'active': True,
+    'summary': None,
+}
+
+FIELDS = [
+    'title', 'feed.$oid', 'pubdate.$date', 'score', 'active', 'summary',
+    'feed', 'missing.field', '_id',
+]
+
+
+def lookup(document, field):
+    """
+    Returns the value of the dotted field path in a decoded document, or
+    raises a KeyError if any part of the path is missing.
+    """
+    value = document
+    for key in field.split('.'):
+        if not isinstance(value, dict):
+            raise KeyError(field)
+        value = value[key]
+    return value
+
+
+class CountingStream(StringIO):
+    """
+    Counts the number of characters read from the stream.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(CountingStream, self).__init__(*args, **kwargs)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        data = super(CountingStream, self).read(size)
+        self.consumed += len(data)
+        return data
+
+
+##########################################################################
+## Projection Tests
+##########################################################################
+
+class FieldProjectorTests(unittest.TestCase):
+    """
+    Test the streaming field projection.
+    """
+
+    def expected(self, document, fields):
+        found = {}
+        for field in fields:
+            try:
+                found[field] = lookup(document, field)
+            except KeyError:
+                continue
+        return found
+
+    def test_projection(self):
+        """
+        Test that projected fields match the decoded document
+        """
+        for indent in (None, 2):
+            data = json.dumps(DOCUMENT, indent=indent)
+            for block_size in (1, 7, 8192):
+                projector = FieldProjector(FIELDS, block_size=block_size)
+                self.assertEqual(
+                    projector.project_string(data),
+                    self.expected(DOCUMENT, FIELDS)
+                )
+
+    def test_early_stop(self):
+        """
+        Test that reading stops once every field has been found
+        """
+        data = json.dumps(
+            {'title': 'first', 'feed': {'$oid': 'f'}, 'content': 'x' * 100000}
+        )
+        stream = CountingStream(data)
+
+        projector = FieldProjector(['title', 'feed.$oid'], block_size=1024)
+        self.assertEqual(
+            projector.project(stream), {'title': 'first', 'feed.$oid': 'f'}
+        )
+        self.assertEqual(stream.consumed, 1024)
+
+    def test_malformed(self):
+        """
+        Test that truncated and non-object documents raise ValueError
+        """
+        projector = FieldProjector(['title'])
+        with self.assertRaises(ValueError):
+            projector.project_string('{"content": "unterminated')
+        with self.assertRaises(ValueError):
+            projector.project_string('["title"]')
+
+    def test_escapes_across_blocks(self):
+        """
+        Test that strings with escapes are skipped across block boundaries
+        """
+        document = {
+            'content': u'\\"\u00e9\\\\\n"' * 300, 'feed': {'$oid': u'\\"'},
+            'title': u'last',
+        }
+        data = json.dumps(document)
+        for block_size in range(1, 12):
+            projector = FieldProjector(['title', 'feed.$oid'], block_size=block_size)
+            self.assertEqual(
+                projector.project_string(data),
+                {'title': u'last', 'feed.$oid': u'\\"'}
+            )
+
+    def test_raw_fields(self):
+        """
+        Test that raw fields return the JSON text without decoding the content
+        """
+        data = json.dumps(DOCUMENT)
+        projector = FieldProjector(['content', 'title'], block_size=7, raw=['content'])
+        self.assertFalse(projector.decode)
+        self.assertEqual(
+            projector.project_string(data),
+            {'content': json.dumps(DOCUMENT['content']), 'title': DOCUMENT['title']}
+        )
+
+        with self.assertRaises(ValueError):
+            FieldProjector(['title'], raw=['content'])
+
+    def test_bulk_fields(self):
+        """
+        Test that requesting the content decodes the whole document
+        """
+        fields = ['content', 'feed.$oid', 'missing']
+        projector = FieldProjector(fields, block_size=7)
+        self.assertTrue(projector.decode)
+        self.assertEqual(
+            projector.project_string(json.dumps(DOCUMENT)),
+            self.expected(DOCUMENT, fields)
+        )
+
+    def test_benchmark(self):
+        """
+        Test that projecting fields after a large content is comparable to json
+        """
+        # Fields after the content are the worst case for the projector
+        html = u'<a href=\\"/link\\" class=\\"x\\">caf\xe9</a> ' * 50000
+        data = u'{"content": "%s", "title": "last"}' % html
+
+        def best(func, repeat=5):
+            timings = []
+            for _ in range(repeat):
+                started = time.time()
+                func()
+                timings.append(time.time() - started)
+            return min(timings)
+
+        projector = FieldProjector(['title'])
+        self.assertEqual(projector.project_string(data), {'title': 'last'})
+
+        projected = best(lambda: projector.project_string(data))
+        decoded = best(lambda: json.load(StringIO(data)))
+        self.assertLess(projected, decoded * 3)
@@ -0,0 +1,184 @@
+# tests.test_quarantine
+# Tests for the per-document budgets and the quarantine log.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_quarantine.py [] benjamin@bengfort.com $
+
+"""
+Tests for the per-document budgets and the quarantine log.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from tests import make_corpus
+from tests.test_preprocess import DOCS, simple_load, simple_tokenize
+from minke.exceptions import DocumentTimeout
+from minke.corpus import BaleenCorpusReader
+from minke.preprocess import Preprocessor, ParallelPreprocessor
+from minke.quarantine import Quarantine, time_limit
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+SLOW = 'books/0000.json'
+LARGE = 'tech/0002.json'
+
+
+def slow_tokenize(preprocessor, fileid):
+    """
+    Spins on the slow document as a pathological page would in readability.
+    """
+    if fileid == SLOW:
+        started = time.time()
+        while time.time() - started < 5:
+            pass
+    return simple_tokenize(preprocessor, fileid)
+
+
+class SlowPreprocessor(Preprocessor):
+    load = simple_load
+    tokenize = slow_tokenize
+
+
+class SlowParallelPreprocessor(ParallelPreprocessor):
+    load = simple_load
+    tokenize = slow_tokenize
+
+
+##########################################################################
+## Quarantine Tests
+##########################################################################
+
+class TimeLimitTests(unittest.TestCase):
+    """
+    Test interrupting a block that runs past its time limit.
+    """
+
+    def test_time_limit(self):
+        """
+        Test that the time limit interrupts a long running block
+        """
+        started = time.time()
+        with self.assertRaises(DocumentTimeout):
+            with time_limit(0.1):
+                while True:
+                    pass
+        self.assertLess(time.time() - started, 2)
+
+        # No limit or a block that completes in time is not interrupted
+        with time_limit(None):
+            time.sleep(0.01)
+        with time_limit(0.2):
+            time.sleep(0.01)
+        time.sleep(0.3)
+
+
+class QuarantineTests(unittest.TestCase):
+    """
+    Test quarantining documents over the time and size limits.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, 'source')
+        self.target = os.path.join(self.root, 'target')
+
+        docs = dict(DOCS)
+        docs[LARGE] = {'content': '<p>{}</p>'.format(' '.join(['large'] * 500))}
+        make_corpus(self.source, docs)
+        self.corpus = BaleenCorpusReader(self.source, cache=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_quarantine(self):
+        """
+        Test that outliers and failures are quarantined and the run continues
+        """
+        transformer = SlowPreprocessor(
+            self.corpus, self.target, time_limit=0.5, size_limit=1024
+        )
+
+        started = time.time()
+        results = list(transformer.transform())
+        self.assertLess(time.time() - started, 4)
+        self.assertEqual(len(results), len(DOCS) - 3)
+
+        records = {
+            record['fileid']: record
+            for record in transformer.quarantine.records()
+        }
+        self.assertEqual(records[SLOW]['reason'], 'time')
+        self.assertGreaterEqual(records[SLOW]['elapsed'], 0.5)
+        self.assertEqual(records[LARGE]['reason'], 'size')
+        self.assertGreater(records[LARGE]['size'], 1024)
+        self.assertEqual(records['news/0bad.json']['reason'], 'error')
+        self.assertIn('Could not tokenize', records['news/0bad.json']['message'])
+
+        # The journal records the quarantined documents as failed
+        self.assertEqual(
+            set(transformer.journal.failed), {SLOW, LARGE, 'news/0bad.json'}
+        )
+
+        summary = transformer.quarantined()
+        self.assertEqual(sorted(summary), ['error', 'size', 'time'])
+        self.assertEqual(summary['time']['documents'], 1)
+        self.assertEqual(summary['size']['max_size'], records[LARGE]['size'])
+
+        # Starting the job over starts a new quarantine log
+        transformer = SlowPreprocessor(self.corpus, self.target, overwrite=True)
+        list(transformer.transform(fileids=['news/0bad.json']))
+        self.assertEqual(len(transformer.quarantine), 1)
+
+    def test_parallel_quarantine(self):
+        """
+        Test that the time limit is enforced in the worker processes
+        """
+        transformer = SlowParallelPreprocessor(
+            self.corpus, self.target, tasks=2, time_limit=0.5
+        )
+
+        started = time.time()
+        results = list(transformer.transform())
+        self.assertLess(time.time() - started, 4)
+        self.assertEqual(len(results), len(DOCS) - 2)
+
+        failed = dict(transformer.errors)
+        self.assertEqual(sorted(failed), [SLOW, 'news/0bad.json'])
+        self.assertIn("DocumentTimeout", failed[SLOW])
+        self.assertEqual(
+            sorted(transformer.quarantined()), ['error', 'time']
+        )
+
+    def test_records(self):
+        """
+        Test that the last record of a document is reported
+        """
+        log = Quarantine(os.path.join(self.root, 'quarantine.log'))
+        log.add('a', 'time', 'too slow', 2.0, 100)
+        log.add('b', 'size', 'too big', 0.0, 4000)
+        log.add('a', 'error', 'broken', 1.0, 100)
+
+        with open(log.path, 'a') as f:
+            f.write('{"fileid": "c", "rea')
+
+        self.assertEqual(len(log), 2)
+        summary = log.summary()
+        self.assertEqual(summary['error']['max_elapsed'], 1.0)
+        self.assertEqual(summary['size']['median_size'], 4000)
+        self.assertNotIn('time', summary)
+
+        log.reset()
+        self.assertEqual(log.records(), [])
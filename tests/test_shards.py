@@ -0,0 +1,129 @@
+# tests.test_shards
+# Tests for the sharded container format.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_shards.py [] benjamin@bengfort.com $
+
+"""
+Tests for the sharded container format.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from minke.shards import ShardWriter, ShardReader, SHARD_INDEX
+from minke.corpus import BaleenPickledCorpusReader
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+def make_document(idx):
+    """
+    Creates a document of paragraphs of sentences of tagged tokens.
+    """
+    return [[[("token{}".format(idx), "NN"), (".", ".")]] * (idx + 1)]
+
+
+##########################################################################
+## Shards Tests
+##########################################################################
+
+class ShardsTests(unittest.TestCase):
+    """
+    Test the shard writer and reader.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.docs = {
+            "{}/{:04x}.pickle".format(cat, idx): make_document(idx)
+            for idx, cat in enumerate(['books', 'news'] * 10)
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, segment_size=512):
+        with ShardWriter(self.root, segment_size) as writer:
+            for fileid in sorted(self.docs):
+                writer.write(fileid, self.docs[fileid])
+        return writer
+
+    def test_roundtrip(self):
+        """
+        Test that documents can be streamed and seeked from segments
+        """
+        writer = self.write()
+        self.assertGreater(len(writer.segments), 1)
+
+        reader = ShardReader(self.root)
+        self.assertEqual(reader.fileids(), sorted(self.docs))
+
+        for fileid, doc in self.docs.items():
+            self.assertEqual(reader.read(fileid), doc)
+
+        streamed = list(reader.documents())
+        self.assertEqual(len(streamed), len(self.docs))
+        self.assertEqual(
+            sorted(map(repr, streamed)), sorted(map(repr, self.docs.values()))
+        )
+
+    def test_rebuild_index(self):
+        """
+        Test that the index can be rebuilt from the segment offset tables
+        """
+        self.write()
+        os.remove(os.path.join(self.root, SHARD_INDEX))
+
+        reader = ShardReader(self.root)
+        self.assertEqual(reader.fileids(), sorted(self.docs))
+        self.assertEqual(reader.read('news/0005.pickle'), self.docs['news/0005.pickle'])
+
+    def test_append(self):
+        """
+        Test that reopening a writer appends new segments to the store
+        """
+        writer = self.write()
+        segments = len(writer.segments)
+
+        with ShardWriter(self.root) as writer:
+            self.assertIn('books/0000.pickle', writer)
+            writer.write('books/0000.pickle', make_document(42))
+            writer.write('cooking/0abc.pickle', make_document(1))
+
+        reader = ShardReader(self.root)
+        self.assertEqual(len(reader.segments), segments + 1)
+        self.assertEqual(reader.read('books/0000.pickle'), make_document(42))
+        self.assertIn('cooking/0abc.pickle', reader.fileids())
+
+    def test_reader(self):
+        """
+        Test that the pickled corpus reader reads from a sharded store
+        """
+        self.write()
+        corpus = BaleenPickledCorpusReader(self.root)
+
+        self.assertEqual(corpus.fileids(), sorted(self.docs))
+        self.assertEqual(corpus.categories(), ['books', 'news'])
+        self.assertEqual(
+            list(corpus.docs(fileids='books/0002.pickle')),
+            [self.docs['books/0002.pickle']]
+        )
+        self.assertEqual(
+            len(list(corpus.words(categories='news'))),
+            sum(2 * (idx + 1) for idx in range(1, 20, 2))
+        )
+
+        self.assertIsNone(corpus.catalog)
+        with self.assertRaises(TypeError):
+            corpus.select(feed='f1')
@@ -0,0 +1,111 @@
+# tests.test_tagger
+# Tests for the vectorized part of speech tagger.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_tagger.py [] benjamin@bengfort.com $
+
+"""
+Tests for the vectorized part of speech tagger.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import nltk
+import random
+import unittest
+
+from tests.test_preprocess import DOCS, PARAS
+from nltk.tag.perceptron import PerceptronTagger
+from minke.preprocess import Preprocessor
+from minke.tagger import VectorizedPerceptronTagger
+
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+WORDS = {
+    'DT': ['the', 'a', 'every'],
+    'JJ': ['big', 'small', 'old', 'well-known'],
+    'NN': ['dog', 'corpus', 'model', 'sentence', '2016', '42'],
+    'VBZ': ['reads', 'tags', 'runs'],
+    'IN': ['of', 'in', 'on'],
+}
+
+
+def tagged_sentence(rng):
+    """
+    Generates a random tagged sentence from a tiny grammar.
+    """
+    sentence = []
+    for _ in range(rng.randint(1, 3)):
+        for tag in ('DT', 'JJ', 'NN', 'VBZ', 'IN'):
+            sentence.append((rng.choice(WORDS[tag]), tag))
+    sentence.append(('.', '.'))
+    return sentence
+
+
+##########################################################################
+## Tagger Tests
+##########################################################################
+
+class VectorizedTaggerTests(unittest.TestCase):
+    """
+    Test that the vectorized tagger matches the nltk perceptron tagger.
+    """
+
+    def test_trained_parity(self):
+        """
+        Test parity with a perceptron tagger trained on a tiny grammar
+        """
+        rng = random.Random(42)
+        random.seed(42)
+        tagger = PerceptronTagger(load=False)
+        tagger.train([tagged_sentence(rng) for _ in range(100)], nr_iter=3)
+        vectorized = VectorizedPerceptronTagger(tagger)
+
+        # Unknown words are scored by the weights rather than the tag dict
+        sents = [
+            [word for word, _ in tagged_sentence(rng)] + ['Unknown', 'co-op', '1999']
+            for _ in range(50)
+        ]
+        sents.extend([[], ['dog']])
+
+        self.assertEqual(
+            vectorized.tag_sents(sents), [tagger.tag(sent) for sent in sents]
+        )
+        self.assertEqual(vectorized.tag(sents[0]), tagger.tag(sents[0]))
+
+    def test_pretrained_parity(self):
+        """
+        Test parity with nltk.pos_tag on the fixtures
+        """
+        try:
+            vectorized = VectorizedPerceptronTagger()
+        except LookupError:
+            self.skipTest("the averaged perceptron tagger model is not installed")
+
+        documents = list(DOCS.values()) + list(PARAS.values())
+        sents = [
+            nltk.wordpunct_tokenize(sent)
+            for doc in documents
+            for sent in doc['content'].replace('<p>', ' ').replace('</p>', ' ').split('. ')
+        ]
+
+        self.assertEqual(
+            vectorized.tag_sents(sents), [nltk.pos_tag(sent) for sent in sents]
+        )
+
+    def test_backend(self):
+        """
+        Test selecting the tagger backend of the preprocessor
+        """
+        transformer = Preprocessor(None, tagger='vectorized')
+        self.assertEqual(transformer.signature()[1]['tagger'], 'vectorized')
+
+        with self.assertRaises(ValueError):
+            Preprocessor(None, tagger='unknown')
@@ -0,0 +1,99 @@
+# tests.test_utils.test_sketches
+# Tests for the approximate counting sketches.
+#
+# Copyright (C) 2016 District Data Labs
+# For license information, see LICENSE.txt
+#
+# ID: test_sketches.py [] benjamin@bengfort.com $
+
+"""
+Tests for the approximate counting sketches.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import pickle
+import unittest
+
+from minke.utils.sketches import stable_hash
+from minke.utils.sketches import HyperLogLog, CountMinSketch, VocabularySketch
+from minke.utils.statistics import zscore, stratified_total
+
+
+##########################################################################
+## Sketch Tests
+##########################################################################
+
+class SketchTests(unittest.TestCase):
+    """
+    Test the cardinality and frequency sketches.
+    """
+
+    def test_stable_hash(self):
+        """
+        Test that the hash is stable across processes and types
+        """
+        self.assertEqual(stable_hash("token"), stable_hash(b"token"))
+        self.assertEqual(stable_hash("token"), 0xe8b6cbfea18da094)
+
+    def test_hyperloglog(self):
+        """
+        Test the cardinality estimate and merging of HyperLogLog
+        """
+        left, right = HyperLogLog(), HyperLogLog()
+        for idx in range(30000):
+            left.add("token{}".format(idx))
+            right.add("token{}".format(idx + 20000))
+
+        self.assertLess(abs(len(left) - 30000), 30000 * 0.03)
+        self.assertLess(abs(len(left.merge(right)) - 50000), 50000 * 0.03)
+
+        # Small cardinalities use linear counting and are nearly exact
+        small = HyperLogLog()
+        for word in "the cat sat on the mat".split():
+            small.add(word)
+        self.assertEqual(len(small), 5)
+
+    def test_count_min(self):
+        """
+        Test that count-min estimates never undercount
+        """
+        sketch = CountMinSketch(width=256)
+        for idx in range(1000):
+            sketch.add("token{}".format(idx % 100), idx % 7)
+
+        for idx in range(100):
+            exact = sum(jdx % 7 for jdx in range(idx, 1000, 100))
+            self.assertGreaterEqual(sketch.query("token{}".format(idx)), exact)
+
+    def test_vocabulary(self):
+        """
+        Test that heavy hitters survive merging and pickling
+        """
+        left, right = VocabularySketch(k=3), VocabularySketch(k=3)
+        left.update(["a"] * 50 + ["b"] * 10 + ["x{}".format(i) for i in range(500)])
+        right.update(["b"] * 50 + ["c"] * 30 + ["y{}".format(i) for i in range(500)])
+
+        merged = pickle.loads(pickle.dumps(left)).merge(right)
+        self.assertEqual(
+            [token for token, _ in merged.most_common()], ["b", "a", "c"]
+        )
+        self.assertEqual(merged["b"], 60)
+        self.assertLess(abs(len(merged) - 1003), 1003 * 0.03)
+
+    def test_stratified_total(self):
+        """
+        Test the stratified estimate of a population total
+        """
+        self.assertAlmostEqual(zscore(0.95), 1.95996, places=4)
+
+        # A census of every stratum has no sampling error
+        total, low, high = stratified_total([(2, [1, 3]), (3, [4, 4, 4])])
+        self.assertEqual((total, low, high), (16.0, 16.0, 16.0))
+
+        total, low, high = stratified_total([(10, [1, 3]), (30, [4, 4, 4])])
+        self.assertEqual(total, 140.0)
+        self.assertLess(low, total)
+        self.assertGreater(high, total)
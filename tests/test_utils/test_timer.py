@@ -46,3 +46,14 @@ class TimerTests(unittest.TestCase):
         data = t.serialize()
         for key in ('started', 'finished', 'elapsed'):
             self.assertIn(key, data)
+
+    def test_process_timer(self):
+        """
+        Test that the process timer counts CPU time rather than sleeping
+        """
+        with Timer(wall_clock=False) as t:
+            time.sleep(0.2)
+            sum(range(100000))
+
+        self.assertGreater(t.elapsed, 0.0)
+        self.assertLess(t.elapsed, 0.2)